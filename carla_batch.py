@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Batched actor management for CARLA.
+Spawns NPC vehicles (with autopilot) and tears actors down through single
+apply_batch_sync round trips instead of one RPC per actor.
+"""
+
+import random
+import time
+import carla
+
+SpawnActor = carla.command.SpawnActor
+SetAutopilot = carla.command.SetAutopilot
+FutureActor = carla.command.FutureActor
+DestroyActor = carla.command.DestroyActor
+
+TWO_WHEELER_TAGS = ('bicycle', 'motorcycle', 'bike')
+
+
+def vehicle_blueprint_pool(blueprint_library, exclude_two_wheelers=True):
+    """Filter the vehicle blueprints once; optionally drop bicycles and motorcycles."""
+    blueprints = list(blueprint_library.filter('vehicle.*'))
+    if exclude_two_wheelers:
+        blueprints = [bp for bp in blueprints
+                      if not any(tag in bp.id.lower() for tag in TWO_WHEELER_TAGS)]
+    return blueprints
+
+
+class BatchSpawner:
+    """Spawns NPC vehicles in batches."""
+
+    def __init__(self, client, world, tm_port=8000, blueprints=None, exclude_two_wheelers=True,
+                 blueprint_library=None):
+        """
+        client: carla.Client object
+        world: carla.World object
+        tm_port: Traffic Manager port the NPC autopilots register with
+        blueprints: Pre-filtered blueprint pool (built from the library if None); it is
+        copied, so a shared pool (e.g. WorldCatalog's) is never modified
+        blueprint_library: Library to copy the blueprints from (fetched from the world if None)
+        """
+        self.client = client
+        self.world = world
+        self.tm_port = tm_port
+        library = blueprint_library if blueprint_library is not None else world.get_blueprint_library()
+        if blueprints is None:
+            self.blueprints = vehicle_blueprint_pool(library, exclude_two_wheelers)
+        else:
+            # find() returns a copy; attributes are set on these per spawn
+            self.blueprints = [library.find(bp.id) for bp in blueprints]
+        self.errors = []  # (spawn point, error message) from the last spawn call
+
+    def _prepare_blueprint(self, rng):
+        bp = rng.choice(self.blueprints)
+        # SpawnActor copies the blueprint attributes; the pool is this spawner's own copy
+        if bp.has_attribute('color'):
+            bp.set_attribute('color', rng.choice(bp.get_attribute('color').recommended_values))
+        if bp.has_attribute('driver_id'):
+            bp.set_attribute('driver_id', rng.choice(bp.get_attribute('driver_id').recommended_values))
+        bp.set_attribute('role_name', 'autopilot')
+        return bp
+
+    def spawn_npcs(self, spawn_points, num_vehicles, autopilot=True, do_tick=False, rng=random):
+        """
+        Spawn up to num_vehicles NPCs at the given spawn points.
+        Each round issues all SpawnActor(+SetAutopilot) commands as one batch;
+        spawn points that fail (usually occupied) are replaced from the remaining
+        points in a follow-up batch.
+        Returns the list of spawned actors; failures are kept in self.errors.
+        """
+        self.errors = []
+        remaining = list(spawn_points)
+        actor_ids = []
+
+        while len(actor_ids) < num_vehicles and remaining:
+            wanted = num_vehicles - len(actor_ids)
+            batch_points, remaining = remaining[:wanted], remaining[wanted:]
+
+            batch = []
+            for sp in batch_points:
+                cmd = SpawnActor(self._prepare_blueprint(rng), sp)
+                if autopilot:
+                    cmd = cmd.then(SetAutopilot(FutureActor, True, self.tm_port))
+                batch.append(cmd)
+
+            for sp, response in zip(batch_points, self.client.apply_batch_sync(batch, do_tick)):
+                if response.error:
+                    self.errors.append((sp, response.error))
+                else:
+                    actor_ids.append(response.actor_id)
+
+        # One call to resolve every spawned id into an actor handle
+        return list(self.world.get_actors(actor_ids)) if actor_ids else []
+
+    def report_errors(self, max_lines=5):
+        if not self.errors:
+            return
+        print(f"   ⚠️ {len(self.errors)} spawn commands failed:")
+        for sp, err in self.errors[:max_lines]:
+            print(f"      {sp.location}: {err}")
+        if len(self.errors) > max_lines:
+            print(f"      ... and {len(self.errors) - max_lines} more")
+
+
+def destroy_actors(client, world, actors=(), sensors=(), do_tick=False):
+    """
+    Stop sensors, then destroy sensors and actors with one batched command.
+    In synchronous mode pass do_tick=True so the destruction is simulated
+    before the actor count is verified.
+    Returns a report dict with requested/destroyed/failed/leaked counts, the
+    world actor count before and after, and the time taken in seconds.
+    """
+    start_time = time.time()
+    report = {"requested": 0, "destroyed": 0, "failed": 0, "leaked": 0,
+              "actors_before": 0, "actors_after": 0, "seconds": 0.0, "errors": []}
+
+    # Stop the sensor streams first so no callback fires on a dying actor
+    for sensor in sensors:
+        if sensor is None:
+            continue
+        try:
+            if sensor.is_listening:
+                sensor.stop()
+        except RuntimeError as e:
+            report["errors"].append(f"stop {sensor.id}: {e}")
+
+    # Sensors are destroyed before the vehicles they are attached to
+    ids, seen = [], set()
+    for actor in list(sensors) + list(actors):
+        if actor is not None and actor.id not in seen:
+            seen.add(actor.id)
+            ids.append(actor.id)
+    report["requested"] = len(ids)
+    if not ids:
+        return report
+
+    report["actors_before"] = len(world.get_actors())
+    for actor_id, response in zip(ids, client.apply_batch_sync([DestroyActor(i) for i in ids], do_tick)):
+        if response.error:
+            report["failed"] += 1
+            report["errors"].append(f"destroy {actor_id}: {response.error}")
+        else:
+            report["destroyed"] += 1
+
+    # Verify: none of the requested actors should still exist on the server
+    report["leaked"] = len(world.get_actors(ids))
+    report["actors_after"] = len(world.get_actors())
+    report["seconds"] = time.time() - start_time
+    return report
+
+
+def clear_dynamic_actors(client, world, do_tick=False):
+    """Destroy every sensor, vehicle and walker in the world with one batched command."""
+    actors = world.get_actors()
+    sensors = list(actors.filter("sensor.*"))
+    others = list(actors.filter("vehicle.*")) + list(actors.filter("walker.*"))
+    return destroy_actors(client, world, actors=others, sensors=sensors, do_tick=do_tick)
+
+
+def print_teardown_report(report):
+    print(f"   🗑️ Removed {report['destroyed']}/{report['requested']} actors "
+          f"in {report['seconds']*1000:.0f} ms "
+          f"(world actors: {report['actors_before']} → {report['actors_after']})")
+    if report["leaked"]:
+        print(f"   ⚠️ {report['leaked']} actors still alive after teardown")
+    for err in report["errors"][:5]:
+        print(f"   ⚠️ {err}")
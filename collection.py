@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unattended data collection helpers.
+The ego drives itself through the traffic manager in a synchronous world, so
+collection is no longer paced by a human on the keyboard: the loop ticks as
+fast as the server simulates. CollectionBudget stops the run after a frame or
+simulated/wall time budget and reports simulated seconds per wall second.
+"""
+
+import json
+import os
+import time
+
+
+def enable_ego_autopilot(ego, tm, speed_difference=None, auto_lane_change=True):
+    """
+    Hand the ego vehicle to the traffic manager.
+    speed_difference: Percentage below the speed limit for the ego (None = TM global setting)
+    The control the TM applies each tick is read back with ego.get_control()
+    (client-side, part of the tick's actor state), not recorded by us.
+    """
+    ego.set_autopilot(True, tm.get_port())
+    tm.auto_lane_change(ego, auto_lane_change)
+    if speed_difference is not None:
+        tm.vehicle_percentage_speed_difference(ego, speed_difference)
+
+
+class CollectionBudget:
+    """
+    Frame / time budget for a collection run.
+    Call step(state) once per tick; it returns False once any budget is used up.
+    """
+
+    def __init__(self, max_frames=0, max_sim_seconds=0.0, max_wall_seconds=0.0):
+        """
+        max_frames: Stop after this many ticks (0 = no limit)
+        max_sim_seconds: Stop after this much simulated time (0 = no limit)
+        max_wall_seconds: Stop after this much wall-clock time (0 = no limit)
+        """
+        self.max_frames = max_frames
+        self.max_sim_seconds = max_sim_seconds
+        self.max_wall_seconds = max_wall_seconds
+        self.frames = 0
+        self.sim_start = None
+        self.sim_time = None
+        self.wall_start = None
+        self.wall_time = None
+        self.stats_written = None  # time.time() of the last write_stats()
+
+    def step(self, state):
+        """Count one tick of the WorldStateCache `state`. Returns True while within budget."""
+        now = time.perf_counter()
+        elapsed = state.timestamp.elapsed_seconds
+        if self.wall_start is None:
+            self.wall_start, self.sim_start = now, elapsed
+        self.wall_time, self.sim_time = now, elapsed
+        self.frames += 1
+        return not self.exhausted()
+
+    @property
+    def sim_seconds(self):
+        return self.sim_time - self.sim_start if self.sim_start is not None else 0.0
+
+    @property
+    def wall_seconds(self):
+        return self.wall_time - self.wall_start if self.wall_start is not None else 0.0
+
+    @property
+    def realtime_factor(self):
+        """Simulated seconds per wall-clock second."""
+        return self.sim_seconds / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def exhausted(self):
+        return bool((self.max_frames and self.frames >= self.max_frames) or
+                    (self.max_sim_seconds and self.sim_seconds >= self.max_sim_seconds) or
+                    (self.max_wall_seconds and self.wall_seconds >= self.max_wall_seconds))
+
+    def to_dict(self):
+        return {"frames": self.frames, "sim_seconds": self.sim_seconds,
+                "wall_seconds": self.wall_seconds, "realtime_factor": self.realtime_factor}
+
+    def write_stats(self, path, **extra):
+        """
+        Write the budget counters (plus `extra`) as JSON, atomically.
+        The orchestrator reads this file for throughput and as a heartbeat.
+        """
+        data = dict(self.to_dict(), time=time.time(), pid=os.getpid(), **extra)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        self.stats_written = data["time"]
+
+    def write_stats_every(self, path, interval, **extra):
+        """
+        write_stats() if the last write is at least `interval` seconds old. Paced by wall
+        time rather than frames, so the heartbeat keeps coming when ticks are slow.
+        """
+        if self.stats_written is None or time.time() - self.stats_written >= interval:
+            self.write_stats(path, **extra)
+
+    def report(self):
+        if not self.frames:
+            print("🤖 Collection: no frames")
+            return
+        print(f"🤖 Collection: {self.frames} frames, {self.sim_seconds:.1f} s simulated in "
+              f"{self.wall_seconds:.1f} s wall ({self.realtime_factor:.2f} sim-s per wall-s, "
+              f"{self.frames / max(self.wall_seconds, 1e-6):.1f} ticks/s)")
@@ -8,6 +8,10 @@ Phase 1: Connection, vehicle spawn, and 3rd person spectator view
 Phase 2: Keyboard control for the vehicle
 """
 
+import sys
+if "--fake-carla" in sys.argv:  # offline runs without a simulator; installed before carla is imported
+    import fake_carla
+    fake_carla.install()
 import carla
 import pygame
 import time
@@ -18,13 +22,40 @@ import numpy as np
 import threading
 import queue
 from computer_vision import ComputerVisionProcessor
+from startup import StartupOrchestrator, StartupTimeline
+from carla_batch import BatchSpawner, clear_dynamic_actors, destroy_actors, print_teardown_report
+from world_state import WorldStateCache
+from rpc_stats import RPCStats
+from world_catalog import WorldCatalog, load_or_reuse_world
+from traffic import (TrafficConfig, TrafficBudgetManager, configure_traffic_manager,
+                     sample_vehicle_behaviors, apply_vehicle_behaviors)
+from collection import CollectionBudget, enable_ego_autopilot
 
 class CARLADataRecorder:
-    def __init__(self, host='localhost', port=2000, timeout=5.0):
+    def __init__(self, host='localhost', port=2000, timeout=5.0, rpc_stats=None,
+                 force_reload=False, clear_actors=False, traffic_config=None, npc_budget=0,
+                 autopilot=False, collection_budget=None):
         """Initialize the CARLA data recorder."""
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.force_reload = force_reload  # Reload Town04 even if it is already running
+        self.clear_actors = clear_actors  # Destroy leftover actors when reusing the world
+        
+        # Traffic manager settings for the NPCs (the world runs asynchronously here)
+        self.traffic_config = traffic_config if traffic_config else TrafficConfig(synchronous=False)
+        self.npc_budget = npc_budget  # NPCs to keep near the player vehicle (0 = off)
+        self.traffic_budget = None
+        self.tm = None
+        
+        # Unattended collection: the player vehicle drives via the TM in a
+        # synchronous world, ticked as fast as the server allows
+        self.autopilot = autopilot
+        self.collection = collection_budget if collection_budget else CollectionBudget()
+        self.original_settings = None  # Restored on cleanup when we switched to synchronous mode
+        
+        # Counts/times every simulator call and drops redundant writes
+        self.rpc = rpc_stats if rpc_stats else RPCStats()
         
         # CARLA objects
         self.client = None
@@ -32,17 +63,20 @@ class CARLADataRecorder:
         self.vehicle = None
         self.spectator = None
         self.npc_vehicles = []  # List to track spawned NPCs
+        self.state = None  # Per-tick snapshot cache (created on connect)
+        self.catalog = None  # Map, spawn points and blueprint pools (created on connect)
         
         print("🚀 CARLA Data Recorder - Phase 2")
         print("Phase 1: Connection + Vehicle Spawn + 3rd Person View")
         print("Phase 2: Keyboard Control (WASD)")
         print("=" * 50)
         
-        # Initialize pygame for keyboard input
-        pygame.init()
-        self.display = pygame.display.set_mode((400, 300))
-        pygame.display.set_caption("CARLA Vehicle Control - WASD to drive")
-        self.clock = pygame.time.Clock()
+        # Pygame window (created by init_window during startup)
+        self.display = None
+        self.clock = None
+        
+        # Startup timeline (per-phase timings up to the first processed frame)
+        self.timeline = StartupTimeline()
         
         # Control inputs
         self.throttle = 0.0
@@ -82,8 +116,8 @@ class CARLADataRecorder:
         # Vision system status
         self.vision_active = False
         
-        # Initialize Computer Vision Processor
-        self.cv_processor = ComputerVisionProcessor()
+        # Computer Vision Processor (loaded by load_vision_model during startup)
+        self.cv_processor = None
         
         print(f"📹 Camera Configuration:")
         print(f"   Front Camera: {'ENABLED' if self.front_camera_enabled else 'DISABLED'}")
@@ -93,22 +127,45 @@ class CARLADataRecorder:
         print(f"   Rear Camera:  {'ENABLED' if self.rear_camera_enabled else 'DISABLED'}")
         print("=" * 50)
     
+    def init_window(self):
+        """Initialize pygame for keyboard input (must run on the main thread)."""
+        pygame.init()
+        self.display = pygame.display.set_mode((400, 300))
+        pygame.display.set_caption("CARLA Vehicle Control - WASD to drive")
+        self.clock = pygame.time.Clock()
+        return True
+    
+    def load_vision_model(self):
+        """Load the computer vision model and run a warm-up inference."""
+        self.cv_processor = ComputerVisionProcessor()
+        self.cv_processor.warm_up((600, 800, 3))
+        return True
+    
     def connect_to_carla(self):
         """Connect to CARLA server with proper error handling."""
         try:
+            start_time = time.time()
             print(f"🔗 Attempting to connect to CARLA at {self.host}:{self.port}...")
-            self.client = carla.Client(self.host, self.port)
+            self.client = self.rpc.wrap(carla.Client(self.host, self.port), "Client")
             self.client.set_timeout(self.timeout)
 
             try:
-                print("🌍 Loading Town04...")
-                self.world = self.client.load_world('Town04')
-                print("✅ Loaded Town04")
+                self.world, self.catalog, reused = load_or_reuse_world(
+                    self.client, 'Town04', force_reload=self.force_reload)
+                if reused:
+                    print("♻️ Town04 already running, reusing it")
+                    if self.clear_actors:
+                        print_teardown_report(clear_dynamic_actors(self.client, self.world))
+                else:
+                    print("✅ Loaded Town04")
             except Exception as e:
                 print(f"⚠️ Failed to load Town04 ({e}), using current world instead")
                 self.world = self.client.get_world()
+                self.catalog = WorldCatalog(self.world)
 
-            print(f"📍 Current map: {self.world.get_map().name}")
+            print(f"📍 Current map: {self.catalog.map_name}")
+            print(f"⏱️ Connected in {(time.time() - start_time)*1000:.0f} ms")
+            self.state = WorldStateCache(self.world)
             return True
         except Exception as e:
             print(f"❌ Connection failed: {e}")
@@ -120,20 +177,17 @@ class CARLADataRecorder:
             print("\n🚗 Spawning vehicle...")
             
             # Get blueprint library
-            blueprint_library = self.world.get_blueprint_library()
-            print(f"   📚 Available blueprints: {len(blueprint_library)}")
-            
-            # Choose Tesla Model 3
-            vehicle_blueprints = blueprint_library.filter('vehicle.tesla.model3')
-            if not vehicle_blueprints:
-                print("❌ Tesla Model 3 not found, trying any vehicle...")
-                vehicle_blueprints = blueprint_library.filter('vehicle.*')
+            print(f"   📚 Available blueprints: {len(self.catalog.blueprint_library)}")
             
-            vehicle_bp = vehicle_blueprints[0]
+            # Choose Tesla Model 3 (the catalog falls back to any car if it is missing)
+            vehicle_bp = self.catalog.ego_blueprint
+            if vehicle_bp.id != self.catalog.ego_blueprint_id:
+                print("❌ Tesla Model 3 not found, using another vehicle...")
             print(f"   🏎️ Selected vehicle: {vehicle_bp.id}")
+            vehicle_bp.set_attribute('role_name', 'hero')  # Hybrid physics is centred on the hero
             
             # Get spawn points
-            spawn_points = self.world.get_map().get_spawn_points()
+            spawn_points = self.catalog.spawn_points
             print(f"   📍 Available spawn points: {len(spawn_points)}")
             
             if not spawn_points:
@@ -153,8 +207,12 @@ class CARLADataRecorder:
             # Enable physics for the vehicle
             self.vehicle.set_simulate_physics(True)
             
-            # Wait a moment for the vehicle to settle
-            time.sleep(0.5)
+            # Wait for the server to simulate a frame with the vehicle in it;
+            # a synchronous world (e.g. reused from a sem_main run) only advances when ticked
+            if self.world.get_settings().synchronous_mode:
+                self.world.tick()
+            else:
+                self.world.wait_for_tick()
             
             return True
             
@@ -225,8 +283,8 @@ class CARLADataRecorder:
             return
         
         try:
-            # Get current vehicle transform
-            vehicle_transform = self.vehicle.get_transform()
+            # Get current vehicle transform (from this tick's snapshot)
+            vehicle_transform = self.state.transform(self.vehicle)
             vehicle_location = vehicle_transform.location
             vehicle_rotation = vehicle_transform.rotation
             
@@ -255,64 +313,37 @@ class CARLADataRecorder:
             print(f"⚠️ Failed to update spectator view: {e}")
     
     def spawn_npc_vehicles(self, num_vehicles=20):
-        """Spawn NPC vehicles around the map."""
+        """Spawn NPC vehicles around the map in a single batched round trip."""
         try:
             print(f"\n🚦 Spawning {num_vehicles} NPC vehicles...")
             
-            # Get blueprint library
-            blueprint_library = self.world.get_blueprint_library()
-            
-            # Get all vehicle blueprints (excluding bicycles and motorcycles for simplicity)
-            vehicle_blueprints = blueprint_library.filter('vehicle.*')
-            vehicle_blueprints = [bp for bp in vehicle_blueprints if 
-                                'bicycle' not in bp.id.lower() and 
-                                'motorcycle' not in bp.id.lower() and
-                                'bike' not in bp.id.lower()]
-            
-            print(f"   🚗 Available vehicle types: {len(vehicle_blueprints)}")
+            # Vehicle blueprints (excluding bicycles and motorcycles for simplicity)
+            tm = self.tm = configure_traffic_manager(self.client, self.traffic_config)
+            spawner = BatchSpawner(self.client, self.world, self.traffic_config.tm_port,
+                                   blueprints=self.catalog.car_blueprints,
+                                   blueprint_library=self.catalog.blueprint_library)
+            print(f"   🚗 Available vehicle types: {len(spawner.blueprints)}")
             
             # Get spawn points
-            spawn_points = self.world.get_map().get_spawn_points()
+            spawn_points = self.catalog.spawn_points
             print(f"   📍 Available spawn points: {len(spawn_points)}")
             
             # Limit number of vehicles to available spawn points (leave one for player)
             max_vehicles = min(num_vehicles, len(spawn_points) - 1)
             
-            # Skip the first spawn point (used for player vehicle)
-            available_spawn_points = spawn_points[1:max_vehicles + 1]
+            # Skip the first spawn point (used for player vehicle); failed points
+            # are retried from the rest of the list
+            spawned = spawner.spawn_npcs(spawn_points[1:], max_vehicles,
+                                         rng=random.Random(self.traffic_config.seed))
+            self.npc_vehicles.extend(spawned)
+            apply_vehicle_behaviors(tm, spawned, self.traffic_config,
+                                    *sample_vehicle_behaviors(spawned, self.traffic_config))
+            spawned_count = len(spawned)
+            spawner.report_errors()
             
-            # Spawn vehicles
-            spawned_count = 0
-            for spawn_point in available_spawn_points:
-                try:
-                    # Choose random vehicle blueprint
-                    vehicle_bp = random.choice(vehicle_blueprints)
-                    
-                    # Set random color if vehicle supports it
-                    if vehicle_bp.has_attribute('color'):
-                        color = random.choice(vehicle_bp.get_attribute('color').recommended_values)
-                        vehicle_bp.set_attribute('color', color)
-                    
-                    # Set autopilot attribute
-                    if vehicle_bp.has_attribute('driver_id'):
-                        driver_id = random.choice(vehicle_bp.get_attribute('driver_id').recommended_values)
-                        vehicle_bp.set_attribute('driver_id', driver_id)
-                    
-                    # Spawn the vehicle
-                    npc_vehicle = self.world.spawn_actor(vehicle_bp, spawn_point)
-                    
-                    if npc_vehicle:
-                        # Enable autopilot for NPC
-                        npc_vehicle.set_autopilot(True)
-                        
-                        # Add to our tracking list
-                        self.npc_vehicles.append(npc_vehicle)
-                        spawned_count += 1
-                        
-                except Exception as spawn_error:
-                    # Skip this spawn point if there's an error (probably occupied)
-                    print(f"   ⚠️ Failed to spawn at point {spawn_point.location}: {spawn_error}")
-                    continue
+            if self.npc_budget > 0:
+                self.traffic_budget = TrafficBudgetManager(self.client, spawn_points, budget=self.npc_budget,
+                                                           seed=self.traffic_config.seed)
             
             print(f"✅ Successfully spawned {spawned_count} NPC vehicles!")
             print(f"   🤖 All NPCs have autopilot enabled")
@@ -388,8 +419,7 @@ class CARLADataRecorder:
         try:
             print("\n📹 Setting up camera system...")
             
-            blueprint_library = self.world.get_blueprint_library()
-            camera_bp = blueprint_library.find('sensor.camera.rgb')
+            camera_bp = self.catalog.camera_blueprint('sensor.camera.rgb')
             
             # Set camera attributes for better top view
             camera_bp.set_attribute('image_size_x', '800')  # Increased resolution
@@ -500,6 +530,7 @@ class CARLADataRecorder:
         # Process with computer vision
         processed_image = self.cv_processor.process_front_view(cv_image)
         self.current_front_image = processed_image
+        self.timeline.mark_first_frame()
         
         if not self.front_image_queue.full():
             self.front_image_queue.put((image.timestamp, processed_image))
@@ -518,6 +549,7 @@ class CARLADataRecorder:
         # Process with computer vision
         processed_image = self.cv_processor.process_side_view(cv_image, "left")
         self.current_left_image = processed_image
+        self.timeline.mark_first_frame()
         
         if not self.left_image_queue.full():
             self.left_image_queue.put((image.timestamp, processed_image))
@@ -536,6 +568,7 @@ class CARLADataRecorder:
         # Process with computer vision
         processed_image = self.cv_processor.process_side_view(cv_image, "right")
         self.current_right_image = processed_image
+        self.timeline.mark_first_frame()
         
         if not self.right_image_queue.full():
             self.right_image_queue.put((image.timestamp, processed_image))
@@ -554,6 +587,7 @@ class CARLADataRecorder:
         # Process with computer vision - Top view gets advanced processing
         processed_image = self.cv_processor.process_top_view(cv_image)
         self.current_top_image = processed_image
+        self.timeline.mark_first_frame()
         
         if not self.top_image_queue.full():
             self.top_image_queue.put((image.timestamp, processed_image))
@@ -572,6 +606,7 @@ class CARLADataRecorder:
         # Process with computer vision
         processed_image = self.cv_processor.process_rear_view(cv_image)
         self.current_rear_image = processed_image
+        self.timeline.mark_first_frame()
         
         if not self.rear_image_queue.full():
             self.rear_image_queue.put((image.timestamp, processed_image))
@@ -618,9 +653,8 @@ class CARLADataRecorder:
     def check_vehicle_status(self):
         """Check vehicle status for debugging."""
         if self.vehicle:
-            velocity = self.vehicle.get_velocity()
-            speed = (velocity.x**2 + velocity.y**2 + velocity.z**2)**0.5
-            location = self.vehicle.get_location()
+            speed = self.state.speed(self.vehicle)
+            location = self.state.location(self.vehicle)
             
             # Only print if there's some movement or control input
             if speed > 0.1 or self.throttle > 0 or self.brake > 0:
@@ -640,6 +674,7 @@ class CARLADataRecorder:
                 print(f"🎮 Controls: T:{self.throttle:.2f} S:{self.steer:.2f} B:{self.brake:.2f} R:{self.reverse}")
             
             self.vehicle.apply_control(control)
+            self.state.record_control(self.vehicle, control)
     
     def process_keyboard_input(self):
         """Process keyboard input for vehicle control."""
@@ -731,16 +766,61 @@ class CARLADataRecorder:
         
         pygame.display.flip()
     
+    def enable_autopilot_collection(self):
+        """Switch to a synchronous world and hand the player vehicle to the traffic manager."""
+        try:
+            self.original_settings = self.world.get_settings()
+            settings = self.world.get_settings()
+            settings.synchronous_mode = True
+            settings.fixed_delta_seconds = 0.05
+            self.world.apply_settings(settings)
+            
+            self.traffic_config.synchronous = True
+            if self.tm is None:
+                self.tm = configure_traffic_manager(self.client, self.traffic_config)
+            else:
+                self.tm.set_synchronous_mode(True)
+            enable_ego_autopilot(self.vehicle, self.tm)
+            print("🤖 Autopilot collection: synchronous world, no frame pacing")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to enable autopilot collection: {e}")
+            return False
+    
+    def read_applied_control(self):
+        """Read back the control the autopilot applied this tick."""
+        control = self.vehicle.get_control()
+        self.throttle, self.steer, self.brake = control.throttle, control.steer, control.brake
+        self.reverse = control.reverse
+        self.state.record_control(self.vehicle, control)
+    
     def run_phase2(self, num_npcs=15):
         """Run Phase 2: Phase 1 + Keyboard control."""
         print("\n🚀 Starting Phase 2...")
         
-        # Step 1: Run Phase 1 setup
-        if not self.connect_to_carla():
+        # Step 1: Connect/load the world, load the vision model and open the
+        # control window concurrently (they don't depend on each other)
+        startup = StartupOrchestrator(self.timeline)
+        results = startup.run(
+            background={
+                "connect + load world": self.connect_to_carla,
+                "vision model + warm-up": self.load_vision_model,
+            },
+            foreground={
+                "pygame window": self.init_window,
+            })
+        
+        if not results["connect + load world"]:
             print("\n❌ Phase 2 failed at connection step")
             return False
         
-        if not self.spawn_vehicle():
+        if not results["vision model + warm-up"] or not results["pygame window"]:
+            print("\n❌ Phase 2 failed at vision/window initialization step")
+            return False
+        
+        with self.timeline.phase("spawn vehicle"):
+            spawned = self.spawn_vehicle()
+        if not spawned:
             print("\n❌ Phase 2 failed at vehicle spawn step")
             return False
         
@@ -749,14 +829,17 @@ class CARLADataRecorder:
             return False
         
         # Step 3: Setup camera system
-        if not self.setup_cameras():
+        with self.timeline.phase("cameras"):
+            cameras_ready = self.setup_cameras()
+        if not cameras_ready:
             print("\n❌ Phase 2 failed at camera setup step")
             return False
         
         # Step 4: Spawn NPC vehicles
         if num_npcs > 0:
             print(f"\n🚦 Setting up {num_npcs} NPC vehicles for realistic environment...")
-            npc_success = self.spawn_npc_vehicles(num_vehicles=num_npcs)
+            with self.timeline.phase("NPC vehicles"):
+                npc_success = self.spawn_npc_vehicles(num_vehicles=num_npcs)
             if not npc_success:
                 print("⚠️ Warning: Failed to spawn NPCs, continuing without them")
         else:
@@ -764,13 +847,19 @@ class CARLADataRecorder:
         
         # Step 5: Clean environment automatically
         print(f"\n🌲 Automatically cleaning environment for optimal detection...")
-        cleanup_success = self.clean_environment()
+        with self.timeline.phase("clean environment"):
+            cleanup_success = self.clean_environment()
         if cleanup_success:
             print(f"✅ Environment cleaned! All vegetation removed for clear camera views.")
         else:
             print(f"⚠️ Environment cleanup had some issues, but continuing...")
         
+        if self.autopilot and not self.enable_autopilot_collection():
+            print("\n❌ Phase 2 failed at autopilot setup step")
+            return False
+        
         print("\n✅ Phase 1 setup complete!")
+        self.catalog.report()
         print("\n🎮 Starting Phase 2: Keyboard Control + Multi-Camera System")
         print("\n📋 Controls:")
         print("   W - Throttle forward")
@@ -825,7 +914,13 @@ class CARLADataRecorder:
         
         try:
             running = True
+            timeline_reported = False
             while running:
+                # Report the startup timeline once the first frame is processed
+                if not timeline_reported and self.timeline.first_frame is not None:
+                    self.timeline.report()
+                    timeline_reported = True
+                
                 # Handle pygame events
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
@@ -893,14 +988,28 @@ class CARLADataRecorder:
                             )
                             print("🔧 Applied preset: Increased sensitivity (smaller zones)")
                 
-                # Process continuous keyboard input
-                self.process_keyboard_input()
+                # Advance the synchronous world (autopilot collection)
+                if self.autopilot:
+                    self.world.tick()
+                
+                # Refresh the per-tick world state shared by the readers below
+                self.state.update()
                 
-                # Apply controls to vehicle
-                self.apply_control()
+                # Recycle NPCs that drifted away from the player vehicle
+                if self.traffic_budget:
+                    self.traffic_budget.update(self.state, self.vehicle)
                 
-                # Check vehicle status (for debugging)
-                self.check_vehicle_status()
+                if self.autopilot:
+                    self.read_applied_control()
+                else:
+                    # Process continuous keyboard input
+                    self.process_keyboard_input()
+                    
+                    # Apply controls to vehicle
+                    self.apply_control()
+                    
+                    # Check vehicle status (for debugging)
+                    self.check_vehicle_status()
                 
                 # Update spectator view to follow vehicle
                 self.update_spectator_view()
@@ -912,8 +1021,15 @@ class CARLADataRecorder:
                 # Display control information
                 self.display_control_info()
                 
-                # Control update rate
-                self.clock.tick(60)  # 60 FPS for smooth control
+                # Control update rate (unpaced when collecting on autopilot)
+                if not self.autopilot:
+                    self.clock.tick(60)  # 60 FPS for smooth control
+                self.rpc.tick()
+                
+                # Frame / time budget
+                if not self.collection.step(self.state):
+                    print("\n🏁 Collection budget reached")
+                    running = False
                 
         except KeyboardInterrupt:
             print("\n🛑 Phase 2 stopped by user")
@@ -961,7 +1077,9 @@ class CARLADataRecorder:
         try:
             while True:
                 # Keep updating spectator view
+                self.state.update()
                 self.update_spectator_view()
+                self.rpc.tick()
                 time.sleep(0.1)  # 10 FPS update
                 
         except KeyboardInterrupt:
@@ -978,38 +1096,36 @@ class CARLADataRecorder:
             cv2.destroyAllWindows()
             print("   👁️ Camera windows closed")
         
-        # Destroy cameras
-        cameras_to_destroy = [
-            (self.front_camera, self.front_camera_enabled, "Front"),
-            (self.left_camera, self.left_camera_enabled, "Left"),
-            (self.right_camera, self.right_camera_enabled, "Right"),
-            (self.top_camera, self.top_camera_enabled, "Top"),
-            (self.rear_camera, self.rear_camera_enabled, "Rear")
-        ]
+        # Stop cameras, then destroy cameras, NPCs and the player vehicle in one batch
+        cameras = [camera for camera, enabled in [
+            (self.front_camera, self.front_camera_enabled),
+            (self.left_camera, self.left_camera_enabled),
+            (self.right_camera, self.right_camera_enabled),
+            (self.top_camera, self.top_camera_enabled),
+            (self.rear_camera, self.rear_camera_enabled)
+        ] if camera and enabled]
+        
+        if self.client and self.world:
+            print(f"   📷 {len(cameras)} cameras, 🚦 {len(self.npc_vehicles)} NPC vehicles, "
+                  f"🚗 {'1' if self.vehicle else '0'} player vehicle")
+            try:
+                report = destroy_actors(self.client, self.world,
+                                        actors=self.npc_vehicles + ([self.vehicle] if self.vehicle else []),
+                                        sensors=cameras)
+                print_teardown_report(report)
+            except RuntimeError as e:
+                print(f"   ⚠️ Teardown failed: {e}")
+        self.npc_vehicles.clear()
+        self.vehicle = None
         
-        for camera, enabled, name in cameras_to_destroy:
-            if camera and enabled:
-                try:
-                    camera.destroy()
-                    print(f"   📷 {name} camera destroyed")
-                except:
-                    pass
-        
-        # Destroy NPC vehicles
-        if self.npc_vehicles:
-            print(f"   🚦 Destroying {len(self.npc_vehicles)} NPC vehicles...")
-            for npc in self.npc_vehicles:
-                try:
-                    if npc.is_alive:
-                        npc.destroy()
-                except:
-                    pass  # Vehicle might already be destroyed
-            self.npc_vehicles.clear()
-        
-        # Destroy player vehicle
-        if self.vehicle:
-            self.vehicle.destroy()
-            print("   🚗 Player vehicle destroyed")
+        # Back to asynchronous mode so the server doesn't wait for our ticks
+        if self.original_settings and self.world:
+            try:
+                if self.tm:
+                    self.tm.set_synchronous_mode(False)
+                self.world.apply_settings(self.original_settings)
+            except RuntimeError as e:
+                print(f"   ⚠️ Could not restore world settings: {e}")
         
         pygame.quit()
         print("   🎮 Pygame cleaned up")
@@ -1024,10 +1140,31 @@ def main():
     parser.add_argument('--phase', type=int, choices=[1, 2], default=2, help='Run specific phase (1 or 2, default: 2)')
     parser.add_argument('--no-npcs', action='store_true', help='Disable NPC vehicle spawning')
     parser.add_argument('--num-npcs', type=int, default=15, help='Number of NPC vehicles to spawn (default: 15)')
+    parser.add_argument('--rpc-report', action='store_true', help='Print per-call-site simulator RPC statistics on exit')
+    parser.add_argument('--force-reload', action='store_true', help='Reload Town04 even if the server is already running it')
+    parser.add_argument('--clear-actors', action='store_true', help='Destroy leftover actors when reusing the running world')
+    parser.add_argument('--seed', type=int, default=0, help='Traffic manager / behavior seed (default: 0)')
+    parser.add_argument('--high-density', action='store_true', help='Hybrid physics around the player vehicle for large NPC counts')
+    parser.add_argument('--speed-offset', default='0,0', metavar='LOW,HIGH', help='Range of the per-NPC percentage below the speed limit (default: 0,0)')
+    parser.add_argument('--lane-change-probability', type=float, default=1.0, help='Fraction of NPCs allowed to change lanes on their own (default: 1.0)')
+    parser.add_argument('--npc-budget', type=int, default=0, help='Keep this many NPCs near the player vehicle (default: 0 = off)')
+    parser.add_argument('--autopilot', action='store_true', help='Unattended collection: drive via the traffic manager in synchronous mode, no frame pacing')
+    parser.add_argument('--max-frames', type=int, default=0, help='Stop after this many frames (default: 0 = no limit)')
+    parser.add_argument('--max-sim-seconds', type=float, default=0.0, help='Stop after this much simulated time (default: 0 = no limit)')
+    parser.add_argument('--max-wall-seconds', type=float, default=0.0, help='Stop after this much wall-clock time (default: 0 = no limit)')
+    parser.add_argument('--fake-carla', action='store_true', help='Run against the in-process fake simulator (fake_carla.py) instead of a CARLA server')
     
     args = parser.parse_args()
     
-    recorder = CARLADataRecorder(args.host, args.port, args.timeout)
+    traffic_config = TrafficConfig(seed=args.seed, synchronous=False, hybrid_physics=args.high_density,
+                                   speed_offset=tuple(float(v) for v in args.speed_offset.split(',')),
+                                   lane_change_probability=args.lane_change_probability)
+    recorder = CARLADataRecorder(args.host, args.port, args.timeout,
+                                 force_reload=args.force_reload, clear_actors=args.clear_actors,
+                                 traffic_config=traffic_config, npc_budget=args.npc_budget,
+                                 autopilot=args.autopilot,
+                                 collection_budget=CollectionBudget(args.max_frames, args.max_sim_seconds,
+                                                                    args.max_wall_seconds))
     
     try:
         spawn_npcs = not args.no_npcs
@@ -1050,6 +1187,11 @@ def main():
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
     finally:
+        if args.rpc_report:
+            recorder.rpc.report()
+        if recorder.traffic_budget:
+            recorder.traffic_budget.report()
+        recorder.collection.report()
         recorder.cleanup()
 
 if __name__ == '__main__':
@@ -0,0 +1,1392 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for the `carla` Python API, for offline runs and
+benchmarks on machines without a simulator or GPU.
+Provides Client/World/Actor/Transform/VehicleControl, batch commands,
+synchronous and asynchronous ticking, a traffic manager driving vehicles
+along a straight multi-lane road, and camera sensors that render synthetic
+semantic (CityScapes tags), instance and RGB frames with vehicle boxes
+projected through the full camera extrinsic and intrinsics.
+
+Install it before anything imports carla:
+    import fake_carla
+    fake_carla.install()
+"""
+
+import fnmatch
+import gzip
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+VERSION = "0.9.15-fake"
+
+# Road layout: straight lanes along x; lanes 0-1 drive towards +x, 2-3 towards -x
+ROAD_LENGTH = 1000.0
+LANE_WIDTH = 3.5
+LANE_HEADINGS = (0.0, 0.0, 180.0, 180.0)
+SPAWN_SPACING = 20.0
+SPEED_LIMIT = 60.0 / 3.6  # m/s
+WHEELBASE = 2.9
+MAX_STEER = math.radians(35.0)
+
+# Semantic tags (CARLA 0.9.14+) and their CityScapes palette colors (RGB)
+TAGS = {"unlabeled": 0, "road": 1, "sidewalk": 2, "terrain": 10, "sky": 11,
+        "car": 14, "truck": 15, "bus": 16, "motorcycle": 18, "bicycle": 19, "roadline": 24}
+CITYSCAPES_PALETTE = {
+    0: (0, 0, 0), 1: (128, 64, 128), 2: (244, 35, 232), 3: (70, 70, 70), 4: (102, 102, 156),
+    5: (190, 153, 153), 6: (153, 153, 153), 7: (250, 170, 30), 8: (220, 220, 0), 9: (107, 142, 35),
+    10: (152, 251, 152), 11: (70, 130, 180), 12: (220, 20, 60), 13: (255, 0, 0), 14: (0, 0, 142),
+    15: (0, 0, 70), 16: (0, 60, 100), 17: (0, 80, 100), 18: (0, 0, 230), 19: (119, 11, 32),
+    20: (110, 190, 160), 21: (170, 120, 50), 22: (55, 90, 80), 23: (45, 60, 150), 24: (157, 234, 50),
+    25: (81, 0, 81), 26: (150, 100, 100), 27: (230, 150, 140), 28: (180, 165, 180),
+}
+RGB_COLORS = {0: (0, 0, 0), 1: (80, 80, 85), 2: (150, 150, 150), 10: (80, 115, 60),
+              11: (135, 180, 235), 24: (235, 235, 235)}
+
+# Vehicle blueprints: id -> (base type, semantic tag, half extents x, y, z)
+VEHICLES = {
+    "vehicle.tesla.model3": ("car", 14, (2.40, 1.05, 0.75)),
+    "vehicle.audi.a2": ("car", 14, (1.85, 0.90, 0.77)),
+    "vehicle.lincoln.mkz_2020": ("car", 14, (2.45, 1.05, 0.72)),
+    "vehicle.nissan.patrol": ("car", 14, (2.30, 0.95, 0.93)),
+    "vehicle.carlamotors.carlacola": ("truck", 15, (2.60, 1.30, 1.30)),
+    "vehicle.mitsubishi.fusorosa": ("bus", 16, (5.10, 1.95, 1.90)),
+    "vehicle.yamaha.yzf": ("motorcycle", 18, (1.10, 0.43, 0.62)),
+    "vehicle.gazelle.omafiets": ("bicycle", 19, (0.92, 0.16, 0.55)),
+}
+VEHICLE_COLORS = ["255,255,255", "17,37,103", "200,20,20", "30,30,30", "120,120,120", "220,180,40"]
+CAMERAS = ("sensor.camera.rgb", "sensor.camera.semantic_segmentation",
+           "sensor.camera.instance_segmentation")
+
+
+# ==============================================================================
+# -- Geometry ------------------------------------------------------------------
+# ==============================================================================
+
+class Vector3D:
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other):
+        return type(self)(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return type(self)(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, k):
+        return type(self)(self.x * k, self.y * k, self.z * k)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        return isinstance(other, Vector3D) and (self.x, self.y, self.z) == (other.x, other.y, other.z)
+
+    def __hash__(self):
+        return hash((self.x, self.y, self.z))
+
+    def length(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def distance(self, other):
+        return (self - other).length()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(x={self.x:.6f}, y={self.y:.6f}, z={self.z:.6f})"
+
+
+class Location(Vector3D):
+    pass
+
+
+class Rotation:
+    def __init__(self, pitch=0.0, yaw=0.0, roll=0.0):
+        self.pitch, self.yaw, self.roll = float(pitch), float(yaw), float(roll)
+
+    def matrix(self):
+        """3x3 rotation matrix (UE4 convention, as carla.Transform.get_matrix)."""
+        cp, sp = math.cos(math.radians(self.pitch)), math.sin(math.radians(self.pitch))
+        cy, sy = math.cos(math.radians(self.yaw)), math.sin(math.radians(self.yaw))
+        cr, sr = math.cos(math.radians(self.roll)), math.sin(math.radians(self.roll))
+        return np.array([
+            [cp * cy, cy * sp * sr - sy * cr, -cy * sp * cr - sy * sr],
+            [cp * sy, sy * sp * sr + cy * cr, -sy * sp * cr + cy * sr],
+            [sp, -cp * sr, cp * cr]])
+
+    def get_forward_vector(self):
+        return Vector3D(*self.matrix()[:, 0])
+
+    def get_right_vector(self):
+        return Vector3D(*self.matrix()[:, 1])
+
+    def get_up_vector(self):
+        return Vector3D(*self.matrix()[:, 2])
+
+    def __eq__(self, other):
+        return isinstance(other, Rotation) and \
+            (self.pitch, self.yaw, self.roll) == (other.pitch, other.yaw, other.roll)
+
+    def __repr__(self):
+        return f"Rotation(pitch={self.pitch:.6f}, yaw={self.yaw:.6f}, roll={self.roll:.6f})"
+
+
+class Transform:
+    def __init__(self, location=None, rotation=None):
+        self.location = location if location is not None else Location()
+        self.rotation = rotation if rotation is not None else Rotation()
+
+    def get_matrix(self):
+        m = np.eye(4)
+        m[:3, :3] = self.rotation.matrix()
+        m[:3, 3] = (self.location.x, self.location.y, self.location.z)
+        return m.tolist()
+
+    def get_inverse_matrix(self):
+        return np.linalg.inv(np.array(self.get_matrix())).tolist()
+
+    def transform(self, point):
+        p = self.rotation.matrix() @ np.array([point.x, point.y, point.z])
+        return Location(p[0] + self.location.x, p[1] + self.location.y, p[2] + self.location.z)
+
+    def get_forward_vector(self):
+        return self.rotation.get_forward_vector()
+
+    def get_right_vector(self):
+        return self.rotation.get_right_vector()
+
+    def get_up_vector(self):
+        return self.rotation.get_up_vector()
+
+    def __eq__(self, other):
+        return isinstance(other, Transform) and \
+            self.location == other.location and self.rotation == other.rotation
+
+    def __repr__(self):
+        return f"Transform({self.location!r}, {self.rotation!r})"
+
+
+def _compose(parent, child):
+    """World transform of `child` given relative to `parent`."""
+    m = np.array(parent.get_matrix()) @ np.array(child.get_matrix())
+    return _from_matrix(m)
+
+
+def _from_matrix(m):
+    r = m[:3, :3]
+    pitch = math.degrees(math.asin(max(-1.0, min(1.0, r[2, 0]))))
+    yaw = math.degrees(math.atan2(r[1, 0], r[0, 0]))
+    roll = math.degrees(math.atan2(-r[2, 1], r[2, 2]))
+    return Transform(Location(*m[:3, 3]), Rotation(pitch, yaw, roll))
+
+
+class BoundingBox:
+    def __init__(self, location=None, extent=None, rotation=None):
+        self.location = location if location is not None else Location()
+        self.extent = extent if extent is not None else Vector3D()
+        self.rotation = rotation if rotation is not None else Rotation()
+
+    def get_local_vertices(self):
+        e, c = self.extent, self.location
+        return [Location(c.x + sx * e.x, c.y + sy * e.y, c.z + sz * e.z)
+                for sx in (-1, 1) for sy in (-1, 1) for sz in (-1, 1)]
+
+    def get_world_vertices(self, transform):
+        return [transform.transform(v) for v in self.get_local_vertices()]
+
+
+# ==============================================================================
+# -- Small value types ---------------------------------------------------------
+# ==============================================================================
+
+class VehicleControl:
+    def __init__(self, throttle=0.0, steer=0.0, brake=0.0, hand_brake=False, reverse=False,
+                 manual_gear_shift=False, gear=0):
+        self.throttle = throttle
+        self.steer = steer
+        self.brake = brake
+        self.hand_brake = hand_brake
+        self.reverse = reverse
+        self.manual_gear_shift = manual_gear_shift
+        self.gear = gear
+
+    def __eq__(self, other):
+        return isinstance(other, VehicleControl) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return (f"VehicleControl(throttle={self.throttle:.6f}, steer={self.steer:.6f}, "
+                f"brake={self.brake:.6f}, hand_brake={self.hand_brake}, reverse={self.reverse})")
+
+
+class WeatherParameters:
+    FIELDS = {"cloudiness": 5.0, "precipitation": 0.0, "precipitation_deposits": 0.0,
+              "wind_intensity": 10.0, "sun_azimuth_angle": -1.0, "sun_altitude_angle": 45.0,
+              "fog_density": 2.0, "fog_distance": 0.75, "fog_falloff": 0.1, "wetness": 0.0,
+              "scattering_intensity": 1.0, "mie_scattering_scale": 0.03,
+              "rayleigh_scattering_scale": 0.0331, "dust_storm": 0.0}
+
+    def __init__(self, **kwargs):
+        for name, default in self.FIELDS.items():
+            setattr(self, name, float(kwargs.get(name, default)))
+
+
+WeatherParameters.ClearNoon = WeatherParameters()
+
+
+class WorldSettings:
+    def __init__(self, synchronous_mode=False, fixed_delta_seconds=None, no_rendering_mode=False):
+        self.synchronous_mode = synchronous_mode
+        self.fixed_delta_seconds = fixed_delta_seconds
+        self.no_rendering_mode = no_rendering_mode
+
+    def copy(self):
+        return WorldSettings(self.synchronous_mode, self.fixed_delta_seconds, self.no_rendering_mode)
+
+
+class Timestamp:
+    def __init__(self, frame, elapsed_seconds, delta_seconds):
+        self.frame = frame
+        self.frame_count = frame
+        self.elapsed_seconds = elapsed_seconds
+        self.delta_seconds = delta_seconds
+        self.platform_timestamp = time.time()
+
+
+class ColorConverter:
+    Raw = "Raw"
+    CityScapesPalette = "CityScapesPalette"
+    Depth = "Depth"
+    LogarithmicDepth = "LogarithmicDepth"
+
+
+class AttachmentType:
+    Rigid = "Rigid"
+    SpringArm = "SpringArm"
+
+
+class IMUMeasurement:
+    def __init__(self, frame=0, timestamp=0.0, transform=None):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.transform = transform
+        self.accelerometer = Vector3D()
+        self.gyroscope = Vector3D()
+        self.compass = 0.0
+
+
+class Image:
+    """Camera frame; raw_data is BGRA like the real sensor."""
+
+    def __init__(self, frame, timestamp, transform, fov, array, semantic=False):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.transform = transform
+        self.fov = fov
+        self.height, self.width = array.shape[:2]
+        self._array = array
+        self._semantic = semantic
+
+    @property
+    def raw_data(self):
+        return self._array.tobytes()
+
+    def convert(self, color_converter):
+        if color_converter == ColorConverter.CityScapesPalette and self._semantic:
+            tags = self._array[:, :, 2]
+            self._array = _PALETTE_BGRA[tags]
+            self._semantic = False
+
+
+_PALETTE_BGRA = np.zeros((256, 4), dtype=np.uint8)
+for _tag, (_r, _g, _b) in CITYSCAPES_PALETTE.items():
+    _PALETTE_BGRA[_tag] = (_b, _g, _r, 255)
+
+
+# ==============================================================================
+# -- Blueprints ----------------------------------------------------------------
+# ==============================================================================
+
+class ActorAttribute:
+    def __init__(self, id, value, recommended_values=()):
+        self.id = id
+        self.value = str(value)
+        self.recommended_values = list(recommended_values)
+
+    def as_str(self):
+        return self.value
+
+    def as_int(self):
+        return int(self.value)
+
+    def as_float(self):
+        return float(self.value)
+
+    def as_bool(self):
+        return self.value.lower() == "true"
+
+    def __str__(self):
+        return self.value
+
+
+class ActorBlueprint:
+    def __init__(self, id, tags=(), attributes=None):
+        self.id = id
+        self.tags = list(tags)
+        self._attributes = {}
+        for name, (value, recommended) in (attributes or {}).items():
+            self._attributes[name] = ActorAttribute(name, value, recommended)
+
+    def has_tag(self, tag):
+        return tag in self.tags
+
+    def has_attribute(self, name):
+        return name in self._attributes
+
+    def get_attribute(self, name):
+        return self._attributes[name]
+
+    def set_attribute(self, name, value):
+        if name not in self._attributes:
+            raise IndexError(f"blueprint {self.id} has no attribute {name}")
+        self._attributes[name].value = str(value)
+
+    def copy(self):
+        bp = ActorBlueprint(self.id, self.tags)
+        bp._attributes = {name: ActorAttribute(name, attr.value, attr.recommended_values)
+                          for name, attr in self._attributes.items()}
+        return bp
+
+    def _copy_attributes(self):
+        return {name: attr.value for name, attr in self._attributes.items()}
+
+    def __iter__(self):
+        return iter(self._attributes.values())
+
+    def __repr__(self):
+        return f"ActorBlueprint(id={self.id})"
+
+
+class BlueprintLibrary:
+    def __init__(self, blueprints):
+        self._blueprints = list(blueprints)
+
+    # Like the real library, filter() and find() hand out copies
+    def filter(self, pattern):
+        return BlueprintLibrary(bp.copy() for bp in self._blueprints if fnmatch.fnmatch(bp.id, pattern)
+                                or any(fnmatch.fnmatch(tag, pattern) for tag in bp.tags))
+
+    def find(self, id):
+        for bp in self._blueprints:
+            if bp.id == id:
+                return bp.copy()
+        raise IndexError(f"blueprint '{id}' not found")
+
+    def __getitem__(self, index):
+        return self._blueprints[index]
+
+    def __len__(self):
+        return len(self._blueprints)
+
+    def __iter__(self):
+        return iter(self._blueprints)
+
+
+def _build_blueprints():
+    blueprints = []
+    for type_id, (base_type, _, _) in VEHICLES.items():
+        blueprints.append(ActorBlueprint(type_id, tags=type_id.split(".")[1:] + [base_type], attributes={
+            "role_name": ("autopilot", ["autopilot", "scenario", "ego", "hero"]),
+            "color": (VEHICLE_COLORS[0], VEHICLE_COLORS),
+            "base_type": (base_type, []),
+            "number_of_wheels": ("2" if base_type in ("motorcycle", "bicycle") else "4", []),
+        }))
+    for type_id in CAMERAS:
+        blueprints.append(ActorBlueprint(type_id, tags=["sensor", "camera"], attributes={
+            "image_size_x": ("800", []), "image_size_y": ("600", []), "fov": ("90", []),
+            "sensor_tick": ("0.0", []), "role_name": ("front", []),
+        }))
+    blueprints.append(ActorBlueprint("sensor.other.imu", tags=["sensor"], attributes={
+        "sensor_tick": ("0.0", []), "role_name": ("imu", [])}))
+    return blueprints
+
+
+# ==============================================================================
+# -- Actors --------------------------------------------------------------------
+# ==============================================================================
+
+class Actor:
+    def __init__(self, server, actor_id, type_id, attributes, parent=None):
+        self._server = server
+        self.id = actor_id
+        self.type_id = type_id
+        self.attributes = attributes
+        self.parent = parent
+        self.semantic_tags = []
+
+    @property
+    def is_alive(self):
+        return self.id in self._server.actors
+
+    def _state(self):
+        state = self._server.actors.get(self.id)
+        if state is None:
+            raise RuntimeError(f"trying to operate on a destroyed actor; an actor's function was "
+                               f"called, but the actor is already destroyed (id {self.id})")
+        return state
+
+    def get_transform(self):
+        return self._server.world_transform(self.id)
+
+    def get_location(self):
+        return self.get_transform().location
+
+    def get_velocity(self):
+        return self._state().velocity()
+
+    def get_angular_velocity(self):
+        return Vector3D()
+
+    def get_acceleration(self):
+        return Vector3D()
+
+    def set_transform(self, transform):
+        self._server.set_transform(self.id, transform)
+
+    def set_location(self, location):
+        tf = self.get_transform()
+        self.set_transform(Transform(location, tf.rotation))
+
+    def set_target_velocity(self, velocity):
+        self._server.set_target_velocity(self.id, velocity)
+
+    def set_simulate_physics(self, enabled=True):
+        self._state().physics = enabled
+
+    def destroy(self):
+        return self._server.destroy(self.id)
+
+    def get_world(self):
+        return self._server.world
+
+    def __eq__(self, other):
+        return isinstance(other, Actor) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Actor(id={self.id}, type={self.type_id})"
+
+
+class Vehicle(Actor):
+    def __init__(self, server, actor_id, type_id, attributes, parent=None):
+        super().__init__(server, actor_id, type_id, attributes, parent)
+        _, tag, extent = VEHICLES[type_id]
+        self.bounding_box = BoundingBox(Location(0.0, 0.0, extent[2]), Vector3D(*extent))
+        self.semantic_tags = [tag]
+
+    def apply_control(self, control):
+        self._server.apply_control(self.id, control)
+
+    def get_control(self):
+        return self._state().control
+
+    def set_autopilot(self, enabled=True, tm_port=8000):
+        self._server.set_autopilot(self.id, enabled, tm_port)
+
+    def get_speed_limit(self):
+        return SPEED_LIMIT * 3.6
+
+
+class Sensor(Actor):
+    def __init__(self, server, actor_id, type_id, attributes, parent=None):
+        super().__init__(server, actor_id, type_id, attributes, parent)
+        self.callback = None
+
+    @property
+    def is_listening(self):
+        return self.callback is not None
+
+    def listen(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        self.callback = None
+
+
+class ActorList:
+    def __init__(self, actors):
+        self._actors = list(actors)
+
+    def filter(self, pattern):
+        return ActorList(a for a in self._actors if fnmatch.fnmatch(a.type_id, pattern))
+
+    def find(self, actor_id):
+        for actor in self._actors:
+            if actor.id == actor_id:
+                return actor
+        return None
+
+    def __getitem__(self, index):
+        return self._actors[index]
+
+    def __len__(self):
+        return len(self._actors)
+
+    def __iter__(self):
+        return iter(self._actors)
+
+
+class ActorSnapshot:
+    def __init__(self, actor_id, transform, velocity):
+        self.id = actor_id
+        self._transform = transform
+        self._velocity = velocity
+
+    def get_transform(self):
+        return self._transform
+
+    def get_velocity(self):
+        return self._velocity
+
+    def get_angular_velocity(self):
+        return Vector3D()
+
+    def get_acceleration(self):
+        return Vector3D()
+
+
+class WorldSnapshot:
+    def __init__(self, episode_id, timestamp, actor_snapshots):
+        self.id = episode_id
+        self.timestamp = timestamp
+        self.frame = timestamp.frame
+        self._actors = actor_snapshots
+
+    def find(self, actor_id):
+        return self._actors.get(actor_id)
+
+    def has_actor(self, actor_id):
+        return actor_id in self._actors
+
+    def __iter__(self):
+        return iter(self._actors.values())
+
+    def __len__(self):
+        return len(self._actors)
+
+
+# ==============================================================================
+# -- Server-side state ---------------------------------------------------------
+# ==============================================================================
+
+class _ActorState:
+    def __init__(self, actor, transform):
+        self.actor = actor
+        self.x, self.y, self.z = transform.location.x, transform.location.y, transform.location.z
+        self.pitch, self.yaw, self.roll = transform.rotation.pitch, transform.rotation.yaw, transform.rotation.roll
+        self.speed = 0.0  # signed, along the heading
+        self.control = VehicleControl()
+        self.physics = True
+        self.autopilot_port = None
+        self.lane = None
+        self.relative = None  # transform relative to the parent (sensors)
+        self.last_emit = None  # sensor: elapsed seconds of the last frame
+
+    def transform(self):
+        return Transform(Location(self.x, self.y, self.z), Rotation(self.pitch, self.yaw, self.roll))
+
+    def velocity(self):
+        yaw = math.radians(self.yaw)
+        return Vector3D(self.speed * math.cos(yaw), self.speed * math.sin(yaw), 0.0)
+
+
+def lane_center(lane):
+    return lane * LANE_WIDTH
+
+
+def nearest_lane(y):
+    return int(min(range(len(LANE_HEADINGS)), key=lambda k: abs(y - lane_center(k))))
+
+
+def _wrap_angle(deg):
+    return (deg + 180.0) % 360.0 - 180.0
+
+
+class Map:
+    def __init__(self, name):
+        self.name = name
+
+    def get_spawn_points(self):
+        points = []
+        for lane, heading in enumerate(LANE_HEADINGS):
+            for x in np.arange(SPAWN_SPACING, ROAD_LENGTH - SPAWN_SPACING, SPAWN_SPACING):
+                points.append(Transform(Location(float(x), lane_center(lane), 0.5), Rotation(yaw=heading)))
+        return points
+
+    def get_topology(self):
+        return []
+
+
+class TrafficManager:
+    def __init__(self, port):
+        self.port = port
+        self.synchronous = False
+        self.seed = 0
+        self.global_speed_difference = 30.0  # TM default: 30% below the limit
+        self.global_distance = 2.5
+        self.speed_difference = {}
+        self.lane_change = {}
+        self.hybrid_physics = False
+        self.hybrid_radius = 50.0
+
+    def get_port(self):
+        return self.port
+
+    def set_synchronous_mode(self, enabled=True):
+        self.synchronous = enabled
+
+    def set_random_device_seed(self, seed):
+        self.seed = seed
+
+    def set_hybrid_physics_mode(self, enabled=True):
+        self.hybrid_physics = enabled
+
+    def set_hybrid_physics_radius(self, radius):
+        self.hybrid_radius = radius
+
+    def set_global_distance_to_leading_vehicle(self, distance):
+        self.global_distance = distance
+
+    def global_percentage_speed_difference(self, percentage):
+        self.global_speed_difference = percentage
+
+    def vehicle_percentage_speed_difference(self, actor, percentage):
+        self.speed_difference[actor.id] = percentage
+
+    def distance_to_leading_vehicle(self, actor, distance):
+        pass
+
+    def auto_lane_change(self, actor, enabled):
+        self.lane_change[actor.id] = enabled
+
+    def random_left_lanechange_percentage(self, actor, percentage):
+        pass
+
+    def random_right_lanechange_percentage(self, actor, percentage):
+        pass
+
+    def ignore_lights_percentage(self, actor, percentage):
+        pass
+
+    def target_speed(self, actor_id):
+        diff = self.speed_difference.get(actor_id, self.global_speed_difference)
+        return SPEED_LIMIT * (1.0 - diff / 100.0)
+
+
+class FakeServer:
+    """Simulation state behind one host:port."""
+
+    def __init__(self, port):
+        self.port = port
+        self.lock = threading.RLock()
+        self.frame_cond = threading.Condition(self.lock)
+        self.blueprints = BlueprintLibrary(_build_blueprints())
+        self.traffic_managers = {}
+        self.recording = None  # (path, frames) while the recorder runs
+        self.replay = None
+        self.world = None
+        self.load("Carla/Maps/Town04")
+        self._ticker = threading.Thread(target=self._async_loop, name=f"fake-carla-{port}", daemon=True)
+        self._ticker.start()
+
+    def load(self, map_name):
+        with self.lock:
+            self.episode_id = getattr(self, "episode_id", 0) + 1
+            self.map = Map(map_name if "/" in map_name else f"Carla/Maps/{map_name}")
+            self.settings = getattr(self, "settings", WorldSettings()).copy()
+            self.weather = WeatherParameters()
+            self.actors = {}
+            self.next_id = 1
+            self.frame = getattr(self, "frame", 0)
+            self.elapsed = 0.0
+            self.spectator = self._add(Actor, "spectator", {}, Transform(Location(0, 0, 50)))
+            self.snapshot = self._take_snapshot(self.settings.fixed_delta_seconds or 0.0)
+            self.world = World(self)
+            return self.world
+
+    def _add(self, cls, type_id, attributes, transform, parent=None):
+        actor = cls(self, self.next_id, type_id, attributes, parent)
+        self.next_id += 1
+        self.actors[actor.id] = _ActorState(actor, transform)
+        return actor
+
+    # -- Actor operations ------------------------------------------------------
+
+    def spawn(self, blueprint, transform, attach_to=None):
+        with self.lock:
+            type_id = blueprint.id
+            attributes = blueprint._copy_attributes()
+            if type_id.startswith("vehicle."):
+                if self._occupied(transform.location):
+                    raise RuntimeError("Spawn failed because of collision at spawn position")
+                actor = self._add(Vehicle, type_id, attributes,
+                                  Transform(Location(transform.location.x, transform.location.y, 0.0),
+                                            Rotation(yaw=transform.rotation.yaw)))
+            elif type_id.startswith("sensor."):
+                actor = self._add(Sensor, type_id, attributes, transform, parent=attach_to)
+                self.actors[actor.id].relative = transform if attach_to is not None else None
+            else:
+                raise RuntimeError(f"Cannot spawn '{type_id}' in the fake server")
+            return actor
+
+    def _occupied(self, location, clearance=2.0):
+        for state in self.actors.values():
+            if isinstance(state.actor, Vehicle) and \
+                    math.hypot(state.x - location.x, state.y - location.y) < clearance:
+                return True
+        return False
+
+    def destroy(self, actor_id):
+        with self.lock:
+            return self.actors.pop(actor_id, None) is not None
+
+    def world_transform(self, actor_id):
+        with self.lock:
+            state = self.actors.get(actor_id)
+            if state is None:
+                raise RuntimeError(f"actor {actor_id} not found")
+            if state.relative is not None and state.actor.parent is not None:
+                parent = self.actors.get(state.actor.parent.id)
+                if parent is not None:
+                    return _compose(parent.transform(), state.relative)
+            return state.transform()
+
+    def set_transform(self, actor_id, transform):
+        with self.lock:
+            state = self.actors.get(actor_id)
+            if state is None:
+                raise RuntimeError(f"actor {actor_id} not found")
+            loc, rot = transform.location, transform.rotation
+            if isinstance(state.actor, Vehicle):
+                state.x, state.y, state.z, state.yaw = loc.x, loc.y, 0.0, rot.yaw
+                if state.autopilot_port is not None:
+                    state.lane = nearest_lane(state.y)
+            else:
+                state.x, state.y, state.z = loc.x, loc.y, loc.z
+                state.pitch, state.yaw, state.roll = rot.pitch, rot.yaw, rot.roll
+
+    def set_target_velocity(self, actor_id, velocity):
+        with self.lock:
+            state = self.actors.get(actor_id)
+            if state is None:
+                raise RuntimeError(f"actor {actor_id} not found")
+            fwd = state.velocity() if state.speed else None
+            speed = math.hypot(velocity.x, velocity.y)
+            if fwd is not None and fwd.x * velocity.x + fwd.y * velocity.y < 0:
+                speed = -speed
+            state.speed = speed
+
+    def apply_control(self, actor_id, control):
+        with self.lock:
+            state = self.actors.get(actor_id)
+            if state is None:
+                raise RuntimeError(f"actor {actor_id} not found")
+            state.control = control
+
+    def set_autopilot(self, actor_id, enabled, tm_port):
+        with self.lock:
+            state = self.actors.get(actor_id)
+            if state is None:
+                raise RuntimeError(f"actor {actor_id} not found")
+            state.autopilot_port = tm_port if enabled else None
+            state.lane = nearest_lane(state.y) if enabled else None
+            self.traffic_manager(tm_port)
+
+    def traffic_manager(self, port):
+        with self.lock:
+            if port not in self.traffic_managers:
+                self.traffic_managers[port] = TrafficManager(port)
+            return self.traffic_managers[port]
+
+    # -- Simulation ------------------------------------------------------------
+
+    def _async_loop(self):
+        while True:
+            with self.lock:
+                sync = self.settings.synchronous_mode
+                delta = self.settings.fixed_delta_seconds or 0.05
+            if sync:
+                time.sleep(0.01)
+                continue
+            time.sleep(delta)
+            with self.lock:
+                if self.settings.synchronous_mode:
+                    continue
+            self.tick()
+
+    def tick(self):
+        with self.lock:
+            delta = self.settings.fixed_delta_seconds or 0.05
+            self.frame += 1
+            self.elapsed += delta
+            if self.replay:
+                self._replay_step()
+            else:
+                self._step_vehicles(delta)
+            self.snapshot = self._take_snapshot(delta)
+            if self.recording:
+                self._record_frame()
+            sensors = [(s.actor, s) for s in self.actors.values() if isinstance(s.actor, Sensor)]
+            frame, elapsed = self.frame, self.elapsed
+            self.frame_cond.notify_all()
+
+        # Sensor callbacks run outside the lock, like the real client's sensor threads
+        for sensor, state in sensors:
+            callback = sensor.callback
+            if callback is None or sensor.type_id not in CAMERAS:
+                continue
+            sensor_tick = float(sensor.attributes.get("sensor_tick", 0.0))
+            if state.last_emit is not None and elapsed - state.last_emit < sensor_tick - 1e-6:
+                continue
+            state.last_emit = elapsed
+            try:
+                image = render(self, sensor, frame, elapsed)
+            except RuntimeError:
+                continue  # destroyed while rendering
+            callback(image)
+        return frame
+
+    def _step_vehicles(self, dt):
+        vehicles = [s for s in self.actors.values() if isinstance(s.actor, Vehicle) and s.physics]
+        if not vehicles:
+            return
+        xs = np.array([s.x for s in vehicles])
+        ys = np.array([s.y for s in vehicles])
+        lanes = np.array([s.lane if s.lane is not None else nearest_lane(s.y) for s in vehicles])
+        for i, state in enumerate(vehicles):
+            if state.autopilot_port is not None:
+                state.control = self._autopilot_control(state, i, xs, ys, lanes)
+            self._integrate(state, dt)
+
+    def _autopilot_control(self, state, index, xs, ys, lanes):
+        tm = self.traffic_manager(state.autopilot_port)
+        heading = LANE_HEADINGS[state.lane]
+        direction = 1.0 if heading == 0.0 else -1.0
+        target = tm.target_speed(state.actor.id)
+
+        # Leader in the same lane: keep the TM's distance plus a one-second gap
+        ahead = (xs - state.x) * direction
+        same_lane = (lanes == state.lane) & (ahead > 0.1)
+        same_lane[index] = False
+        if same_lane.any():
+            gap = ahead[same_lane].min() - 5.0
+            safe = tm.global_distance + max(state.speed, 0.0) * 1.0
+            if gap < safe:
+                target = min(target, max(0.0, state.speed * gap / max(safe, 1e-3)))
+
+        error = target - state.speed
+        throttle = float(np.clip(0.5 * error, 0.0, 1.0))
+        brake = float(np.clip(-0.3 * error, 0.0, 1.0))
+
+        # Lane keeping: lateral offset to the right of the lane centre and heading error
+        lateral = (state.y - lane_center(state.lane)) * direction
+        yaw_error = math.radians(_wrap_angle(state.yaw - heading))
+        steer = float(np.clip(-0.15 * lateral - 1.2 * yaw_error, -1.0, 1.0))
+        return VehicleControl(throttle=throttle, steer=steer, brake=brake)
+
+    def _integrate(self, state, dt):
+        c = state.control
+        accel = (4.0 * c.throttle) * (-1.0 if c.reverse else 1.0) - 0.05 * state.speed
+        stopping = 8.0 * c.brake + (10.0 if c.hand_brake else 0.0)
+        speed = state.speed + accel * dt
+        if stopping:
+            step = stopping * dt
+            speed = 0.0 if abs(speed) <= step else speed - math.copysign(step, speed)
+        state.speed = speed
+        state.yaw = _wrap_angle(state.yaw + math.degrees(
+            speed / WHEELBASE * math.tan(c.steer * MAX_STEER)) * dt)
+        yaw = math.radians(state.yaw)
+        state.x += speed * math.cos(yaw) * dt
+        state.y += speed * math.sin(yaw) * dt
+        # The road wraps around at its ends
+        if state.autopilot_port is not None:
+            state.x %= ROAD_LENGTH
+
+    def _take_snapshot(self, delta):
+        actors = {}
+        for actor_id, state in self.actors.items():
+            transform = self.world_transform(actor_id) if state.relative is not None else state.transform()
+            actors[actor_id] = ActorSnapshot(actor_id, transform, state.velocity())
+        return WorldSnapshot(self.episode_id, Timestamp(self.frame, self.elapsed, delta), actors)
+
+    # -- Recorder / replayer ---------------------------------------------------
+
+    @staticmethod
+    def log_path(name):
+        if os.path.isabs(name):
+            return name
+        folder = os.path.join(tempfile.gettempdir(), "fake_carla")
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, name)
+
+    def start_recorder(self, name, additional_data=False):
+        with self.lock:
+            self.recording = (self.log_path(name), [])
+            return f"Recording on file: {self.recording[0]}"
+
+    def stop_recorder(self):
+        with self.lock:
+            if not self.recording:
+                return
+            path, frames = self.recording
+            self.recording = None
+        with gzip.open(path, "wt") as f:
+            json.dump({"map": self.map.name, "delta": self.settings.fixed_delta_seconds or 0.05,
+                       "frames": frames}, f)
+
+    def _record_frame(self):
+        vehicles = {}
+        for actor_id, state in self.actors.items():
+            if isinstance(state.actor, Vehicle):
+                vehicles[actor_id] = [state.actor.type_id, state.actor.attributes.get("role_name", ""),
+                                      state.x, state.y, state.yaw, state.speed]
+        self.recording[1].append({"elapsed": self.elapsed, "vehicles": vehicles})
+
+    def replay_file(self, name, start, duration, follow_id=0, replay_sensors=False):
+        path = self.log_path(name)
+        with gzip.open(path, "rt") as f:
+            log = json.load(f)
+        with self.lock:
+            for actor_id in [i for i, s in self.actors.items() if isinstance(s.actor, Vehicle)]:
+                self.actors.pop(actor_id)
+            frames = log["frames"]
+            t0 = frames[0]["elapsed"] if frames else 0.0
+            first = next((i for i, fr in enumerate(frames) if fr["elapsed"] - t0 >= start), len(frames))
+            last = len(frames) if duration <= 0 else \
+                next((i for i, fr in enumerate(frames) if fr["elapsed"] - t0 >= start + duration), len(frames))
+            self.replay = {"frames": frames[first:last], "index": 0, "actors": {}}
+            # Actors appear at the start pose right away; the first tick plays the start frame
+            self._replay_step()
+            self.replay["index"] = 0
+        return f"Replaying file '{path}' ({last - first} frames)"
+
+    def _replay_step(self):
+        replay = self.replay
+        if replay["index"] >= len(replay["frames"]):
+            return
+        frame = replay["frames"][replay["index"]]
+        replay["index"] += 1
+        for logged_id, (type_id, role, x, y, yaw, speed) in frame["vehicles"].items():
+            actor_id = replay["actors"].get(logged_id)
+            if actor_id is None or actor_id not in self.actors:
+                bp = self.blueprints.find(type_id)
+                attributes = bp._copy_attributes()
+                attributes["role_name"] = role
+                actor = self._add(Vehicle, type_id, attributes, Transform(Location(x, y, 0.0), Rotation(yaw=yaw)))
+                actor_id = replay["actors"][logged_id] = actor.id
+            state = self.actors[actor_id]
+            state.x, state.y, state.yaw, state.speed = x, y, yaw, speed
+
+    def stop_replayer(self, keep_actors=False):
+        with self.lock:
+            if self.replay and not keep_actors:
+                for actor_id in self.replay["actors"].values():
+                    self.actors.pop(actor_id, None)
+            self.replay = None
+
+
+# ==============================================================================
+# -- Rendering -----------------------------------------------------------------
+# ==============================================================================
+
+_RAY_CACHE = {}
+
+
+def _camera_rays(width, height, fov):
+    """Unit-depth ray directions in camera space (x forward, y right, z up) per pixel."""
+    key = (width, height, fov)
+    if key not in _RAY_CACHE:
+        f = width / (2.0 * math.tan(math.radians(fov) / 2.0))
+        u, v = np.meshgrid(np.arange(width) + 0.5, np.arange(height) + 0.5)
+        _RAY_CACHE[key] = np.stack([np.ones_like(u), (u - width / 2.0) / f, -(v - height / 2.0) / f], axis=-1)
+    return _RAY_CACHE[key]
+
+
+ROAD_MIN = -LANE_WIDTH / 2
+ROAD_MAX = ROAD_MIN + len(LANE_HEADINGS) * LANE_WIDTH
+SIDEWALK_WIDTH = 3.0
+_CROSS_STEP = 0.04  # lateral resolution of the road cross-section lookup (m)
+
+
+def _cross_section():
+    """Lateral tag profiles of the road: (solid, in the gap of the dashed lines)."""
+    y = ROAD_MIN - SIDEWALK_WIDTH + (np.arange(int(round(
+        (ROAD_MAX - ROAD_MIN + 2 * SIDEWALK_WIDTH) / _CROSS_STEP))) + 0.5) * _CROSS_STEP
+    solid = np.full(y.shape, TAGS["sidewalk"], dtype=np.uint8)
+    solid[(y >= ROAD_MIN) & (y <= ROAD_MAX)] = TAGS["road"]
+    gap = solid.copy()
+    for k in range(len(LANE_HEADINGS) + 1):
+        line = np.abs(y - (ROAD_MIN + k * LANE_WIDTH)) < 0.08
+        solid[line] = TAGS["roadline"]
+        if k in (0, len(LANE_HEADINGS)):
+            gap[line] = TAGS["roadline"]  # outer lines are solid, inner ones dashed
+    return solid, gap
+
+
+_CROSS_SOLID, _CROSS_GAP = _cross_section()
+
+
+def _ground_tags(hit_x, hit_y):
+    index = np.floor((hit_y - (ROAD_MIN - SIDEWALK_WIDTH)) / _CROSS_STEP).astype(np.int64)
+    inside = (index >= 0) & (index < len(_CROSS_SOLID)) & (hit_x >= 0.0) & (hit_x <= ROAD_LENGTH)
+    index = np.clip(index, 0, len(_CROSS_SOLID) - 1)
+    tags = np.where((hit_x % 12.0) < 6.0, _CROSS_SOLID[index], _CROSS_GAP[index])
+    return np.where(inside, tags, np.uint8(TAGS["terrain"]))
+
+
+def _convex_hull(points):
+    pts = sorted(set(points))
+    if len(pts) < 3:
+        return pts
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in pts:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(pts):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+def _fill_hull(mask_shape, hull):
+    """Boolean mask (restricted to the hull's bounding box) of pixels inside a convex polygon."""
+    h, w = mask_shape
+    xs, ys = [p[0] for p in hull], [p[1] for p in hull]
+    x0, x1 = max(int(math.floor(min(xs))), 0), min(int(math.ceil(max(xs))), w - 1)
+    y0, y1 = max(int(math.floor(min(ys))), 0), min(int(math.ceil(max(ys))), h - 1)
+    if x0 > x1 or y0 > y1:
+        return None
+    px, py = np.meshgrid(np.arange(x0, x1 + 1) + 0.5, np.arange(y0, y1 + 1) + 0.5)
+    inside = np.ones(px.shape, dtype=bool)
+    for (ax, ay), (bx, by) in zip(hull, hull[1:] + hull[:1]):
+        inside &= (bx - ax) * (py - ay) - (by - ay) * (px - ax) >= 0
+    return (slice(y0, y1 + 1), slice(x0, x1 + 1)), inside
+
+
+def render(server, sensor, frame, elapsed):
+    width = int(sensor.attributes.get("image_size_x", 800))
+    height = int(sensor.attributes.get("image_size_y", 600))
+    fov = float(sensor.attributes.get("fov", 90.0))
+    with server.lock:
+        cam_tf = server.world_transform(sensor.id)
+        boxes = [(s.actor.id, s.actor.semantic_tags[0], s.actor.attributes.get("color", "0,0,0"),
+                  s.actor.bounding_box, s.transform())
+                 for s in server.actors.values() if isinstance(s.actor, Vehicle)]
+
+    rot = cam_tf.rotation.matrix()
+    cam_pos = np.array([cam_tf.location.x, cam_tf.location.y, cam_tf.location.z])
+    f = width / (2.0 * math.tan(math.radians(fov) / 2.0))
+
+    # Ground plane (z = 0) by ray casting; sky above the horizon
+    rays = _camera_rays(width, height, fov) @ rot.T
+    down = rays[..., 2] < -1e-6
+    t = np.where(down, -cam_pos[2] / np.where(down, rays[..., 2], -1.0), 0.0)
+    tags = np.where(down, _ground_tags(cam_pos[0] + t * rays[..., 0], cam_pos[1] + t * rays[..., 1]),
+                    TAGS["sky"]).astype(np.uint8)
+    instances = np.zeros((height, width), dtype=np.uint16)
+    depth = np.where(down, t, np.inf)
+
+    # Vehicles: 3D box corners through the camera extrinsic + pinhole, far to near
+    projected = []
+    for actor_id, tag, color, bbox, tf in boxes:
+        corners = np.array([[v.x, v.y, v.z] for v in bbox.get_world_vertices(tf)])
+        cam = (corners - cam_pos) @ rot  # world -> camera axes
+        if (cam[:, 0] <= 0.1).any():
+            continue
+        u = width / 2.0 + f * cam[:, 1] / cam[:, 0]
+        v = height / 2.0 - f * cam[:, 2] / cam[:, 0]
+        projected.append((cam[:, 0].mean(), actor_id, tag, color, list(zip(u.tolist(), v.tolist()))))
+    rgb_ids = {}
+    for distance, actor_id, tag, color, points in sorted(projected, reverse=True):
+        filled = _fill_hull((height, width), _convex_hull(points))
+        if filled is None:
+            continue
+        region, inside = filled
+        inside &= depth[region] > distance * 0.5
+        tags[region][inside] = tag
+        instances[region][inside] = actor_id
+        rgb_ids[actor_id] = color
+
+    kind = sensor.type_id.rsplit(".", 1)[-1]
+    bgra = np.zeros((height, width, 4), dtype=np.uint8)
+    bgra[..., 3] = 255
+    if kind == "semantic_segmentation":
+        bgra[..., 2] = tags
+    elif kind == "instance_segmentation":
+        bgra[..., 2] = tags
+        bgra[..., 1] = instances & 0xFF
+        bgra[..., 0] = instances >> 8
+    else:
+        lut = np.zeros((256, 3), dtype=np.uint8)
+        for tag, rgb in RGB_COLORS.items():
+            lut[tag] = rgb
+        rgb = lut[tags]
+        for actor_id, color in rgb_ids.items():
+            rgb[instances == actor_id] = [int(c) for c in color.split(",")]
+        bgra[..., :3] = rgb[..., ::-1]
+    return Image(frame, elapsed, cam_tf, fov, bgra, semantic=kind != "rgb")
+
+
+# ==============================================================================
+# -- Client / World ------------------------------------------------------------
+# ==============================================================================
+
+class World:
+    def __init__(self, server):
+        self._server = server
+        self.id = server.episode_id
+
+    def get_map(self):
+        return self._server.map
+
+    def get_blueprint_library(self):
+        return self._server.blueprints
+
+    def get_spectator(self):
+        return self._server.spectator
+
+    def get_settings(self):
+        return self._server.settings.copy()
+
+    def apply_settings(self, settings):
+        with self._server.lock:
+            self._server.settings = settings.copy()
+            return self._server.frame
+
+    def get_weather(self):
+        return self._server.weather
+
+    def set_weather(self, weather):
+        self._server.weather = weather
+
+    def get_snapshot(self):
+        return self._server.snapshot
+
+    def tick(self, seconds=10.0):
+        return self._server.tick()
+
+    def wait_for_tick(self, seconds=10.0):
+        server = self._server
+        with server.frame_cond:
+            frame = server.frame
+            if not server.frame_cond.wait_for(lambda: server.frame > frame, timeout=seconds):
+                raise RuntimeError("time-out of %dms while waiting for the simulator" % (seconds * 1000))
+            return server.snapshot
+
+    def on_tick(self, callback):
+        raise RuntimeError("on_tick is not supported by the fake server")
+
+    def get_actors(self, actor_ids=None):
+        with self._server.lock:
+            actors = [s.actor for s in self._server.actors.values()]
+        if actor_ids is not None:
+            wanted = set(actor_ids)
+            actors = [a for a in actors if a.id in wanted]
+        return ActorList(actors)
+
+    def get_actor(self, actor_id):
+        state = self._server.actors.get(actor_id)
+        return state.actor if state else None
+
+    def spawn_actor(self, blueprint, transform, attach_to=None, attachment_type=AttachmentType.Rigid):
+        return self._server.spawn(blueprint, transform, attach_to)
+
+    def try_spawn_actor(self, blueprint, transform, attach_to=None, attachment_type=AttachmentType.Rigid):
+        try:
+            return self._server.spawn(blueprint, transform, attach_to)
+        except RuntimeError:
+            return None
+
+
+class command:
+    """Batch commands (carla.command)."""
+
+    class Response:
+        def __init__(self, actor_id=0, error=""):
+            self.actor_id = actor_id
+            self.error = error
+
+        def has_error(self):
+            return bool(self.error)
+
+    FutureActor = 0
+
+    class _Command:
+        def __init__(self):
+            self.chain = []
+
+        def then(self, cmd):
+            self.chain.append(cmd)
+            return self
+
+    class SpawnActor(_Command):
+        def __init__(self, blueprint, transform, parent=None):
+            super().__init__()
+            self.blueprint, self.transform, self.parent = blueprint, transform, parent
+
+        def run(self, server):
+            parent = server.actors[self.parent].actor if self.parent else None
+            return server.spawn(self.blueprint, self.transform, parent).id
+
+    class DestroyActor(_Command):
+        def __init__(self, actor):
+            super().__init__()
+            self.actor_id = getattr(actor, "id", actor)
+
+        def run(self, server):
+            if not server.destroy(self.actor_id):
+                raise RuntimeError(f"actor {self.actor_id} not found")
+            return self.actor_id
+
+    class SetAutopilot(_Command):
+        def __init__(self, actor, enabled, tm_port=8000):
+            super().__init__()
+            self.actor_id, self.enabled, self.tm_port = getattr(actor, "id", actor), enabled, tm_port
+
+        def run(self, server):
+            server.set_autopilot(self.actor_id, self.enabled, self.tm_port)
+            return self.actor_id
+
+    class ApplyTransform(_Command):
+        def __init__(self, actor, transform):
+            super().__init__()
+            self.actor_id, self.transform = getattr(actor, "id", actor), transform
+
+        def run(self, server):
+            server.set_transform(self.actor_id, self.transform)
+            return self.actor_id
+
+    class ApplyTargetVelocity(_Command):
+        def __init__(self, actor, velocity):
+            super().__init__()
+            self.actor_id, self.velocity = getattr(actor, "id", actor), velocity
+
+        def run(self, server):
+            server.set_target_velocity(self.actor_id, self.velocity)
+            return self.actor_id
+
+    class ApplyTargetAngularVelocity(_Command):
+        def __init__(self, actor, angular_velocity):
+            super().__init__()
+            self.actor_id = getattr(actor, "id", actor)
+
+        def run(self, server):
+            if self.actor_id not in server.actors:
+                raise RuntimeError(f"actor {self.actor_id} not found")
+            return self.actor_id
+
+    class ApplyVehicleControl(_Command):
+        def __init__(self, actor, control):
+            super().__init__()
+            self.actor_id, self.control = getattr(actor, "id", actor), control
+
+        def run(self, server):
+            server.apply_control(self.actor_id, self.control)
+            return self.actor_id
+
+
+def _run_command(server, cmd):
+    """Run a command and its .then() chain; FutureActor resolves to the spawned id."""
+    actor_id = cmd.run(server)
+    for follow in cmd.chain:
+        if getattr(follow, "actor_id", None) == command.FutureActor:
+            follow.actor_id = actor_id
+        follow.run(server)
+    return actor_id
+
+
+class Client:
+    _servers = {}
+    _servers_lock = threading.Lock()
+
+    def __init__(self, host="localhost", port=2000, worker_threads=0):
+        self.host = host
+        self.port = port
+        self.timeout = 5.0
+        with Client._servers_lock:
+            if port not in Client._servers:
+                Client._servers[port] = FakeServer(port)
+            self._server = Client._servers[port]
+
+    def set_timeout(self, seconds):
+        self.timeout = seconds
+
+    def get_client_version(self):
+        return VERSION
+
+    def get_server_version(self):
+        return VERSION
+
+    def get_available_maps(self):
+        return [f"/Game/Carla/Maps/Town0{i}" for i in range(1, 8)]
+
+    def get_world(self):
+        return self._server.world
+
+    def load_world(self, map_name, reset_settings=True):
+        world = self._server.load(map_name.split("/")[-1])
+        if reset_settings:
+            self._server.settings = WorldSettings()
+        return world
+
+    def reload_world(self, reset_settings=True):
+        return self.load_world(self._server.map.name, reset_settings)
+
+    def get_trafficmanager(self, port=8000):
+        return self._server.traffic_manager(port)
+
+    def apply_batch(self, commands, do_tick=False):
+        self.apply_batch_sync(commands, do_tick)
+
+    def apply_batch_sync(self, commands, do_tick=False):
+        responses = []
+        with self._server.lock:
+            for cmd in commands:
+                try:
+                    responses.append(command.Response(actor_id=_run_command(self._server, cmd)))
+                except (RuntimeError, KeyError) as e:
+                    responses.append(command.Response(error=str(e)))
+        if do_tick:
+            self._server.tick()
+        return responses
+
+    def start_recorder(self, name, additional_data=False):
+        return self._server.start_recorder(name, additional_data)
+
+    def stop_recorder(self):
+        self._server.stop_recorder()
+
+    def replay_file(self, name, start, duration, follow_id=0, replay_sensors=False):
+        return self._server.replay_file(name, start, duration, follow_id, replay_sensors)
+
+    def stop_replayer(self, keep_actors=False):
+        self._server.stop_replayer(keep_actors)
+
+
+def install():
+    """Register this module as `carla` (call before anything imports carla)."""
+    module = sys.modules[__name__]
+    sys.modules["carla"] = module
+    sys.modules["carla.command"] = command
+    return module
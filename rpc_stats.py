@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Client→server call accounting for CARLA.
+Wraps the client, world, actors and traffic manager in thin proxies that count
+and time every call by call site and per tick, and drop redundant writes
+(unchanged vehicle controls, spectator moves below a threshold).
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Methods whose return values are proxied as well, so calls on them are counted
+WRAPPED_RETURNS = {
+    "get_world": "World",
+    "load_world": "World",
+    "reload_world": "World",
+    "get_spectator": "Actor",
+    "spawn_actor": "Actor",
+    "try_spawn_actor": "Actor",
+    "get_trafficmanager": "TrafficManager",
+}
+
+# Answered by the client library without a server round trip (snapshot / episode
+# state); the traffic manager runs in-process, so all of its calls are local too.
+CLIENT_LOCAL = {"get_snapshot", "get_transform", "get_location", "get_velocity",
+                "get_angular_velocity", "get_acceleration"}
+CLIENT_LOCAL_LABELS = {"TrafficManager"}
+
+
+def _control_key(control):
+    return (control.throttle, control.steer, control.brake, control.hand_brake,
+            control.reverse, control.manual_gear_shift, control.gear)
+
+
+def _unwrap(value):
+    return value._target if isinstance(value, RPCProxy) else value
+
+
+class RPCStats:
+    """Per-run and per-tick call statistics, keyed by (call site, method)."""
+
+    def __init__(self, spectator_threshold=0.05, rotation_threshold=0.5, suppress=True):
+        """
+        spectator_threshold: Skip spectator moves shorter than this (metres)
+        rotation_threshold: ...and rotations smaller than this (degrees)
+        suppress: Drop redundant writes (unchanged controls, tiny spectator moves)
+        """
+        self.spectator_threshold = spectator_threshold
+        self.rotation_threshold = rotation_threshold
+        self.suppress = suppress
+        self.sites = {}  # (site, method) -> [calls, total seconds, max seconds]
+        self.local_sites = {}  # same for client-local calls, kept out of the RPC totals
+        self.suppressed = {}  # method -> count
+        self.ticks = []  # (calls, seconds) per tick
+        self._tick_calls = 0
+        self._tick_time = 0.0
+        self._last_controls = {}  # actor id -> control key
+        self._last_transforms = {}  # actor id -> transform
+        # World.tick may run on a worker thread (TickPipeline) while the main thread records calls
+        self._lock = threading.Lock()
+
+    def wrap(self, obj, label):
+        return RPCProxy(obj, self, label) if obj is not None else None
+
+    def record(self, site, method, seconds, local=False):
+        with self._lock:
+            sites = self.local_sites if local else self.sites
+            entry = sites.get((site, method))
+            if entry is None:
+                entry = sites[(site, method)] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            if not local:
+                self._tick_calls += 1
+                self._tick_time += seconds
+
+    def tick(self):
+        """Close the current loop iteration's bucket."""
+        with self._lock:
+            self.ticks.append((self._tick_calls, self._tick_time))
+            self._tick_calls = 0
+            self._tick_time = 0.0
+
+    def should_skip(self, actor_id, method, args):
+        """True if this write would not change anything on the server."""
+        if not self.suppress or not args:
+            return False
+        if method == "apply_control":
+            key = _control_key(args[0])
+            if self._last_controls.get(actor_id) == key:
+                return self._count_suppressed(method)
+            self._last_controls[actor_id] = key
+        elif method == "set_transform":
+            new, last = args[0], self._last_transforms.get(actor_id)
+            if last is not None and \
+                    new.location.distance(last.location) < self.spectator_threshold and \
+                    abs(new.rotation.yaw - last.rotation.yaw) < self.rotation_threshold and \
+                    abs(new.rotation.pitch - last.rotation.pitch) < self.rotation_threshold and \
+                    abs(new.rotation.roll - last.rotation.roll) < self.rotation_threshold:
+                return self._count_suppressed(method)
+            self._last_transforms[actor_id] = new
+        return False
+
+    def _count_suppressed(self, method):
+        self.suppressed[method] = self.suppressed.get(method, 0) + 1
+        return True
+
+    def forget(self, actor_id):
+        """Drop the write history of an actor (e.g. after it was teleported or destroyed)."""
+        self._last_controls.pop(actor_id, None)
+        self._last_transforms.pop(actor_id, None)
+
+    def report(self, top=15):
+        total_calls = sum(e[0] for e in self.sites.values())
+        total_time = sum(e[1] for e in self.sites.values())
+        print("\n📡 Simulator call report:")
+        print(f"   {total_calls} calls, {total_time*1000:.1f} ms total round-trip time")
+        if self.ticks:
+            calls = [c for c, _ in self.ticks]
+            times = [t for _, t in self.ticks]
+            print(f"   Per tick ({len(self.ticks)} ticks): {sum(calls)/len(calls):.1f} calls avg, "
+                  f"{max(calls)} max, {sum(times)/len(times)*1000:.2f} ms avg")
+        if self.suppressed:
+            print("   Suppressed redundant writes: " +
+                  ", ".join(f"{m}={n}" for m, n in sorted(self.suppressed.items())))
+        rows = sorted(self.sites.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        for (site, method), (calls, seconds, worst) in rows:
+            share = seconds / total_time * 100 if total_time else 0.0
+            print(f"   {method:<38} {site:<40} {calls:7d} calls "
+                  f"{seconds*1000:9.1f} ms ({share:4.1f}%) max {worst*1000:.2f} ms")
+        if self.local_sites:
+            local_calls = sum(e[0] for e in self.local_sites.values())
+            local_time = sum(e[1] for e in self.local_sites.values())
+            print(f"   Client-local calls (not RPCs): {local_calls} calls, {local_time*1000:.1f} ms")
+            rows = sorted(self.local_sites.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+            for (site, method), (calls, seconds, worst) in rows:
+                print(f"   {method:<38} {site:<40} {calls:7d} calls {seconds*1000:9.1f} ms")
+
+
+class RPCProxy:
+    """Forwards attribute access to a CARLA object, timing every method call."""
+
+    __slots__ = ("_target", "_stats", "_label")
+
+    def __init__(self, target, stats, label):
+        self._target = target
+        self._stats = stats
+        self._label = label
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        stats, label = self._stats, self._label
+        method = f"{label}.{name}"
+        wrap_as = WRAPPED_RETURNS.get(name)
+        local = name in CLIENT_LOCAL or label in CLIENT_LOCAL_LABELS
+        target = self._target
+
+        def call(*args, **kwargs):
+            if name in ("apply_control", "set_transform") and \
+                    stats.should_skip(target.id, name, args):
+                return None
+            caller = sys._getframe(1)
+            site = f"{os.path.basename(caller.f_code.co_filename)}:{caller.f_code.co_name}"
+            args = [_unwrap(a) for a in args]
+            kwargs = {k: _unwrap(v) for k, v in kwargs.items()}
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            finally:
+                stats.record(site, method, time.perf_counter() - start, local)
+            return stats.wrap(result, wrap_as) if wrap_as else result
+
+        return call
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __bool__(self):
+        return self._target is not None
+
+    def __repr__(self):
+        return f"RPCProxy({self._target!r})"
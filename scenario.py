@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Deterministic scenario snapshots for reproducible benchmarks.
+A snapshot stores the seed, vehicle blueprints and colors, transforms,
+velocities, traffic manager parameters and weather in a small gzipped JSON
+file, and restores the whole scene with one batched spawn command.
+"""
+
+import gzip
+import json
+import carla
+from traffic import TrafficConfig, configure_traffic_manager, apply_vehicle_behaviors
+from world_catalog import map_basename
+
+SpawnActor = carla.command.SpawnActor
+SetAutopilot = carla.command.SetAutopilot
+ApplyTargetVelocity = carla.command.ApplyTargetVelocity
+FutureActor = carla.command.FutureActor
+
+SNAPSHOT_VERSION = 1
+
+WEATHER_FIELDS = (
+    "cloudiness", "precipitation", "precipitation_deposits", "wind_intensity",
+    "sun_azimuth_angle", "sun_altitude_angle", "fog_density", "fog_distance",
+    "fog_falloff", "wetness", "scattering_intensity", "mie_scattering_scale",
+    "rayleigh_scattering_scale", "dust_storm",
+)
+
+
+def transform_to_list(tf):
+    return [tf.location.x, tf.location.y, tf.location.z,
+            tf.rotation.pitch, tf.rotation.yaw, tf.rotation.roll]
+
+
+def list_to_transform(values):
+    x, y, z, pitch, yaw, roll = values
+    return carla.Transform(carla.Location(x=x, y=y, z=z), carla.Rotation(pitch=pitch, yaw=yaw, roll=roll))
+
+
+def weather_to_dict(weather):
+    return {name: getattr(weather, name) for name in WEATHER_FIELDS if hasattr(weather, name)}
+
+
+def dict_to_weather(values, base=None):
+    """WeatherParameters with `values` set; other fields come from `base` (default: constructor defaults)."""
+    weather = carla.WeatherParameters()
+    for name, value in dict(weather_to_dict(base) if base is not None else {}, **values).items():
+        if hasattr(weather, name):
+            setattr(weather, name, value)
+    return weather
+
+
+class ScenarioSnapshot:
+    """Everything needed to rebuild the same traffic load on the same map."""
+
+    def __init__(self, seed=0, map_name="", traffic=None, weather=None, ego=None, vehicles=None):
+        self.seed = seed
+        self.map_name = map_name
+        self.traffic = traffic or {}  # TrafficConfig fields
+        self.weather = weather or {}
+        self.ego = ego  # vehicle record (see _vehicle_record)
+        self.vehicles = vehicles or []
+
+    @staticmethod
+    def _vehicle_record(actor, transform, velocity, speed=None, lane_change=None):
+        record = {
+            "type_id": actor.type_id,
+            "color": actor.attributes.get("color"),
+            "transform": transform_to_list(transform),
+            "velocity": [velocity.x, velocity.y, velocity.z],
+        }
+        if speed and actor.id in speed:
+            record["speed_difference"] = speed[actor.id]
+        if lane_change and actor.id in lane_change:
+            record["auto_lane_change"] = lane_change[actor.id]
+        return record
+
+    @classmethod
+    def capture(cls, world, catalog, ego, vehicles, seed, traffic_config, behaviors=None, state=None):
+        """
+        Capture the current scene.
+        behaviors: (speed, lane_change) dicts of actor id -> value, as applied to the TM
+        state: WorldStateCache to read transforms/velocities from (falls back to the actors)
+        """
+        speed, lane_change = behaviors if behaviors else (None, None)
+
+        def record(actor):
+            tf = state.transform(actor) if state else actor.get_transform()
+            vel = state.velocity(actor) if state else actor.get_velocity()
+            return cls._vehicle_record(actor, tf, vel, speed, lane_change)
+
+        return cls(seed=seed,
+                   map_name=catalog.map_name,
+                   traffic=dict(vars(traffic_config)),
+                   weather=weather_to_dict(world.get_weather()),
+                   ego=record(ego) if ego else None,
+                   vehicles=[record(v) for v in vehicles])
+
+    def save(self, path):
+        data = {"version": SNAPSHOT_VERSION, "seed": self.seed, "map": self.map_name,
+                "traffic": self.traffic, "weather": self.weather,
+                "ego": self.ego, "vehicles": self.vehicles}
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported scenario snapshot version: {data.get('version')}")
+        return cls(seed=data["seed"], map_name=data["map"], traffic=data["traffic"],
+                   weather=data["weather"], ego=data["ego"], vehicles=data["vehicles"])
+
+    def _spawn_command(self, catalog, record, autopilot, tm_port, role_name):
+        bp = catalog.blueprint_library.find(record["type_id"])
+        if record.get("color") and bp.has_attribute("color"):
+            bp.set_attribute("color", record["color"])
+        bp.set_attribute("role_name", role_name)
+        cmd = SpawnActor(bp, list_to_transform(record["transform"]))
+        cmd = cmd.then(ApplyTargetVelocity(FutureActor, carla.Vector3D(*record["velocity"])))
+        if autopilot:
+            cmd = cmd.then(SetAutopilot(FutureActor, True, tm_port))
+        return cmd
+
+    def restore(self, client, world, catalog, do_tick=False, tm_port=None):
+        """
+        Rebuild the scene: weather, traffic manager and every vehicle in one batch.
+        tm_port: Override the saved traffic manager port (e.g. when several servers run side by side)
+        Returns (ego actor or None, NPC actors, traffic manager, TrafficConfig, behaviors).
+        """
+        if self.map_name and map_basename(catalog.map_name) != map_basename(self.map_name):
+            print(f"⚠️ Scenario was captured on {self.map_name}, restoring on {catalog.map_name}")
+
+        traffic_config = TrafficConfig(**self.traffic)
+        if tm_port is not None:
+            traffic_config.tm_port = tm_port
+        tm = configure_traffic_manager(client, traffic_config)
+        world.set_weather(dict_to_weather(self.weather))
+
+        records = ([self.ego] if self.ego else []) + self.vehicles
+        batch = [self._spawn_command(catalog, r, autopilot=r is not self.ego,
+                                     tm_port=traffic_config.tm_port,
+                                     role_name="hero" if r is self.ego else "autopilot")
+                 for r in records]
+        ids = []
+        for record, response in zip(records, client.apply_batch_sync(batch, do_tick)):
+            if response.error:
+                print(f"⚠️ Could not restore {record['type_id']}: {response.error}")
+                ids.append(None)
+            else:
+                ids.append(response.actor_id)
+
+        found = {a.id: a for a in world.get_actors([i for i in ids if i is not None])}
+        actors = [found.get(i) for i in ids]
+        ego = actors.pop(0) if self.ego else None
+        npcs = []
+        speed, lane_change = {}, {}
+        for record, actor in zip(self.vehicles, actors):
+            if actor is None:
+                continue
+            npcs.append(actor)
+            if "speed_difference" in record:
+                speed[actor.id] = record["speed_difference"]
+            if "auto_lane_change" in record:
+                lane_change[actor.id] = record["auto_lane_change"]
+        apply_vehicle_behaviors(tm, npcs, traffic_config, speed, lane_change)
+        return ego, npcs, tm, traffic_config, (speed, lane_change)
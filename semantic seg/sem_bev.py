@@ -0,0 +1,91 @@
+# sem_bev.py
+"""
+Ego-centric bird's-eye occupancy grid from the overhead semantic camera.
+The camera looks straight down from a fixed height and turns with the ego,
+so every pixel falls into the same grid cell on every frame: the
+pixel-to-cell index is computed once, and each tick the tag map is reduced
+to per-cell channel fractions with a single bincount. Tracked vehicles add
+their image motion as ego-relative velocity channels.
+"""
+import math
+import cv2
+import numpy as np
+from sem_labels import VEHICLE_CLASSES
+
+ROAD_TAG = 1
+ROAD_LINE_TAG = 24
+
+# Occupancy channels (fraction of the cell's pixels), then velocity channels (m/s, ego frame)
+OCCUPANCY_CHANNELS = list(VEHICLE_CLASSES) + ["Road", "RoadLine"]
+VELOCITY_CHANNELS = ["VelocityForward", "VelocityRight"]
+BEV_CHANNELS = OCCUPANCY_CHANNELS + VELOCITY_CHANNELS
+
+# CARLA tag -> occupancy channel + 1 (0 = not mapped)
+_CHANNEL_LUT = np.zeros(256, dtype=np.uint8)
+for _channel, _tag in enumerate(list(VEHICLE_CLASSES.values()) + [ROAD_TAG, ROAD_LINE_TAG], 1):
+    _CHANNEL_LUT[_tag] = _channel
+
+
+class BEVGrid:
+    def __init__(self, image_size=(800, 600), fov=90.0, camera_height=50.0, cell_size=0.5,
+                 grid_size=(128, 128), dt=0.05):
+        """
+        image_size: Overhead camera resolution (width, height) in pixels
+        fov: Horizontal field of view of the camera in degrees
+        camera_height: Camera height above the ground (m), as mounted by SpawnManager.setup_semantic_camera
+        cell_size: Grid cell edge (m)
+        grid_size: (rows, cols); rows run from ahead of the ego (row 0) to behind, cols from left to right
+        dt: Simulation step (s), converts track motion per frame to m/s
+        """
+        self.img_w, self.img_h = image_size
+        self.cell_size = cell_size
+        self.rows, self.cols = grid_size
+        self.dt = dt
+        # Ground meters per pixel of a camera looking straight down
+        self.meters_per_pixel = 2.0 * camera_height * math.tan(math.radians(fov) / 2.0) / self.img_w
+
+        # Pixel -> cell index, once; pixels outside the grid are dropped
+        v, u = np.mgrid[0:self.img_h, 0:self.img_w]
+        row, col = self.pixel_to_cell(u + 0.5, v + 0.5)
+        row, col = np.floor(row).astype(np.intp).ravel(), np.floor(col).astype(np.intp).ravel()
+        inside = (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        self.pixels = np.flatnonzero(inside)  # flat pixel indices covered by the grid
+        cells = row[inside] * self.cols + col[inside]
+        self.cell_pixels = np.maximum(np.bincount(cells, minlength=self.rows * self.cols), 1)
+        self._keys = cells * (len(OCCUPANCY_CHANNELS) + 1)  # bincount key of channel 0 per covered pixel
+
+    def pixel_to_cell(self, u, v):
+        """Image pixel coordinates -> fractional (row, col) grid coordinates."""
+        forward = (self.img_h / 2.0 - v) * self.meters_per_pixel
+        right = (u - self.img_w / 2.0) * self.meters_per_pixel
+        return self.rows / 2.0 - forward / self.cell_size, self.cols / 2.0 + right / self.cell_size
+
+    def occupancy(self, labels):
+        """(len(OCCUPANCY_CHANNELS), rows, cols) fraction of each cell's pixels per channel."""
+        n_channels = len(OCCUPANCY_CHANNELS)
+        channel = cv2.LUT(labels, _CHANNEL_LUT).ravel()[self.pixels]
+        counts = np.bincount(self._keys + channel, minlength=self.rows * self.cols * (n_channels + 1))
+        counts = counts.reshape(self.rows * self.cols, n_channels + 1)[:, 1:]
+        return (counts / self.cell_pixels[:, None]).T.reshape(n_channels, self.rows, self.cols)
+
+    def velocity(self, tracks):
+        """
+        (2, rows, cols) forward / right velocity (m/s, relative to the ego) painted
+        over the cells of each tracked box, from the Sort heading (pixels per update).
+        """
+        grid = np.zeros((2, self.rows, self.cols), dtype=np.float32)
+        scale = self.meters_per_pixel / self.dt
+        for x1, y1, x2, y2, _, _, heading in tracks:
+            dx, dy = heading
+            r1, c1 = self.pixel_to_cell(x1, y1)
+            r2, c2 = self.pixel_to_cell(x2, y2)
+            r1, c1 = max(int(math.floor(r1)), 0), max(int(math.floor(c1)), 0)
+            r2, c2 = min(int(math.ceil(r2)), self.rows), min(int(math.ceil(c2)), self.cols)
+            if r1 < r2 and c1 < c2:
+                grid[0, r1:r2, c1:c2] = -dy * scale
+                grid[1, r1:r2, c1:c2] = dx * scale
+        return grid
+
+    def build(self, labels, tracks=()):
+        """(len(BEV_CHANNELS), rows, cols) float32 grid of one frame."""
+        return np.concatenate([self.occupancy(labels).astype(np.float32), self.velocity(tracks)])
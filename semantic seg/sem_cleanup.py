@@ -1,44 +1,58 @@
 import time
 import pygame
+from carla_batch import clear_dynamic_actors, destroy_actors, print_teardown_report
 
 class CleanupManager:
-    def __init__(self, world, vehicle=None, semantic_camera=None,
-                 original_settings=None, vehicles=None, sensors=None):
+    def __init__(self, world, client, vehicle=None, semantic_camera=None,
+                 original_settings=None, vehicles=None, sensors=None, traffic_manager=None):
         self.world = world
+        self.client = client
+        self.traffic_manager = traffic_manager
         self.vehicle = vehicle
         self.semantic_camera = semantic_camera
         self.original_settings = original_settings
         self.vehicles = vehicles if vehicles else []
         self.sensors = sensors if sensors else []
 
+    def _sync_mode(self):
+        try:
+            return self.world.get_settings().synchronous_mode
+        except RuntimeError:
+            return False
+
     def cleanup(self):
         print("🧹 Cleanup")
 
-        for vehicle in self.vehicles + ([self.vehicle] if self.vehicle else []):
-            try:
-                vehicle.destroy()
-            except: pass
-
-        for sensor in self.sensors + ([self.semantic_camera] if self.semantic_camera else []):
-            try:
-                sensor.stop()
-                sensor.destroy()
-            except: pass
+        # Stop sensors, then destroy sensors and vehicles in one batch
+        report = None
+        try:
+            report = destroy_actors(
+                self.client, self.world,
+                actors=self.vehicles + ([self.vehicle] if self.vehicle else []),
+                sensors=self.sensors + ([self.semantic_camera] if self.semantic_camera else []),
+                do_tick=self._sync_mode())
+            print_teardown_report(report)
+        except RuntimeError as e:
+            # Still restore the settings below, or the server stays in synchronous mode
+            print(f"[CleanupManager] Teardown failed: {e}")
 
+        # Back to asynchronous mode so neither the server nor the TM waits for our ticks
         if self.original_settings:
             try:
+                if self.traffic_manager:
+                    self.traffic_manager.set_synchronous_mode(False)
                 self.world.apply_settings(self.original_settings)
-            except: pass
+            except RuntimeError as e:
+                print(f"[CleanupManager] Could not restore settings: {e}")
 
         pygame.quit()
         print("✅ Cleanup complete")
+        return report
 
     def clean_environment(self):
         print("🔄 Cleaning environment")
-        for filt in ["sensor.*", "vehicle.*", "walker.*"]:
-            for actor in self.world.get_actors().filter(filt):
-                try: actor.destroy()
-                except: pass
+        report = clear_dynamic_actors(self.client, self.world, do_tick=self._sync_mode())
+        print_teardown_report(report)
 
         st = self.world.get_settings()
         st.synchronous_mode = False
@@ -48,3 +62,4 @@ class CleanupManager:
         st.fixed_delta_seconds = 0.05
         self.world.apply_settings(st)
         print("✅ Environment cleaned")
+        return report
@@ -1,26 +1,45 @@
 import carla
 import time
+from world_catalog import load_or_reuse_world
+from carla_batch import clear_dynamic_actors, print_teardown_report
 
 class ConnectionManager:
-    def __init__(self, host="localhost", port=2000, town="Town04"):
+    def __init__(self, host="localhost", port=2000, town="Town04", rpc_stats=None,
+                 force_reload=False, clear_actors=False, no_rendering=False):
         self.host = host
         self.port = port
         self.town = town  # specify the map to load
+        self.rpc_stats = rpc_stats  # optional RPCStats wrapping client/world/actors
+        self.force_reload = force_reload  # reload the map even if the server already runs it
+        self.clear_actors = clear_actors  # destroy leftover actors when reusing a world
+        self.no_rendering = no_rendering  # server skips rendering (no camera sensors needed)
         self.max_retries = 5
-        self.retry_delay = 2.0
+        self.retry_delay = 0.5  # first backoff step, doubled per attempt
+        self.max_retry_delay = 8.0
         self.client = None
         self.world = None
         self.spectator = None
         self.original_settings = None
+        self.catalog = None  # map, spawn points and blueprint pools for the loaded map
+        self.connect_time = None  # seconds until connected
+        self.world_reused = False
 
     def connect(self) -> bool:
+        start = time.perf_counter()
         for attempt in range(1, self.max_retries + 1):
             try:
-                self.client = carla.Client(self.host, self.port)
-                self.client.set_timeout(10.0)
+                # Keep the client across retries; only the first attempt creates it
+                if self.client is None:
+                    self.client = carla.Client(self.host, self.port)
+                    if self.rpc_stats:
+                        self.client = self.rpc_stats.wrap(self.client, "Client")
+                    self.client.set_timeout(10.0)
 
-                # Load specified town
-                self.world = self.client.load_world(self.town)
+                # Load specified town, unless the server is already running it
+                self.world, self.catalog, self.world_reused = load_or_reuse_world(
+                    self.client, self.town, self.catalog, force_reload=self.force_reload)
+                if self.world_reused and self.clear_actors:
+                    print_teardown_report(clear_dynamic_actors(self.client, self.world))
 
                 # Save original settings
                 self.original_settings = self.world.get_settings()
@@ -29,15 +48,21 @@ class ConnectionManager:
                 settings = self.world.get_settings()
                 settings.synchronous_mode = True
                 settings.fixed_delta_seconds = 0.05
-                settings.no_rendering_mode = False
+                settings.no_rendering_mode = self.no_rendering
                 self.world.apply_settings(settings)
 
                 # Get spectator
                 self.spectator = self.world.get_spectator()
+
+                self.connect_time = time.perf_counter() - start
+                print(f"[ConnectionManager] Connected to {self.town} in {self.connect_time*1000:.0f} ms "
+                      f"({'reused running world' if self.world_reused else 'map loaded'})")
                 return True
             except Exception as e:
                 print(f"[ConnectionManager] Attempt {attempt} failed: {e}")
-                time.sleep(self.retry_delay)
+                if attempt < self.max_retries:
+                    # Capped exponential backoff
+                    time.sleep(min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay))
         return False
 
     def disconnect(self):
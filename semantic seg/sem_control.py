@@ -5,7 +5,7 @@ class ControlManager:
     def __init__(self):
         self.reverse = False
 
-    def process_keyboard(self, vehicle):
+    def process_keyboard(self, vehicle, state=None):
         keys = pygame.key.get_pressed()
         control = carla.VehicleControl()
         control.throttle = 0.6 if keys[pygame.K_w] else 0.0
@@ -16,6 +16,7 @@ class ControlManager:
         control.hand_brake = keys[pygame.K_SPACE]
         control.reverse = self.reverse
         vehicle.apply_control(control)
+        if state: state.record_control(vehicle, control)
 
     def handle_events(self, client):
         for event in pygame.event.get():
@@ -1,108 +1,233 @@
 # sem_detect.py
+import time
 import cv2
 import numpy as np
+from scipy.optimize import linear_sum_assignment
 from scipy.spatial import cKDTree
 import carla
-import math
+from world_state import WorldStateCache
+from sem_labels import CLASS_NAMES, VEHICLE_CLASSES, extract_blobs, extract_instance_blobs, labels_to_palette
+from sem_geometry import CameraProjector, box_corners, pose_arrays
+
+# One row per detected blob; actor_id is -1 (depth NaN) when no projected actor is close enough.
+# With an instance camera the actor id comes from the image and depth is not computed.
+DETECTION_DTYPE = np.dtype([
+    ("frame", np.int64),
+    ("x1", np.int32), ("y1", np.int32), ("x2", np.int32), ("y2", np.int32),
+    ("class_id", np.uint8),
+    ("area", np.int32),
+    ("actor_id", np.int32),
+    ("depth", np.float32),  # distance of the matched actor along the camera axis (m)
+])
+
+
+def associate(blob_centers, actor_centers, gate):
+    """
+    One-to-one assignment of blobs to projected actors, by center distance.
+    All candidate pairs within `gate` pixels come from one KD-tree query; the
+    minimum-cost assignment is then solved over the blobs and actors that have
+    at least one candidate, so no actor is claimed by two blobs.
+    Returns (matches (K, 2) as blob index, actor index, distances (K,),
+    unmatched blob indices, unmatched actor indices).
+    """
+    n_blobs, n_actors = len(blob_centers), len(actor_centers)
+    pairs = np.zeros((0, 2), dtype=np.intp)
+    distances = np.zeros(0)
+    if n_blobs and n_actors:
+        candidates = cKDTree(blob_centers).sparse_distance_matrix(
+            cKDTree(actor_centers), gate, output_type="ndarray")
+        if len(candidates):
+            rows, row_index = np.unique(candidates["i"], return_inverse=True)
+            cols, col_index = np.unique(candidates["j"], return_inverse=True)
+            # Pairs outside the gate cost more than any assignment of gated pairs
+            cost = np.full((len(rows), len(cols)), gate * (len(rows) + len(cols)) + 1.0)
+            cost[row_index, col_index] = candidates["v"]
+            r, c = linear_sum_assignment(cost)
+            inside = cost[r, c] <= gate
+            pairs = np.stack([rows[r[inside]], cols[c[inside]]], axis=1)
+            distances = cost[r[inside], c[inside]]
+    unmatched_blobs = np.setdiff1d(np.arange(n_blobs), pairs[:, 0])
+    unmatched_actors = np.setdiff1d(np.arange(n_actors), pairs[:, 1])
+    return pairs, distances, unmatched_blobs, unmatched_actors
+
 
 class SemanticDetector:
-    def __init__(self, world, ego_vehicle, camera_sensor, image_size=(800,600), fov=90.0, match_threshold_px=80):
+    def __init__(self, world, ego_vehicle, camera_sensor, image_size=(800,600), fov=90.0, match_threshold_px=80,
+                 state=None, min_blob_size=8, roi=None, scale=1):
         self.world = world
+        self.state = state  # WorldStateCache shared with the main loop
         self.ego_vehicle = ego_vehicle
         self.camera = camera_sensor
         self.img_w, self.img_h = image_size
         self.fov = fov
         self.match_threshold_px = match_threshold_px
-
-        fov_rad = math.radians(fov)
-        self.fx = self.img_w / (2 * math.tan(fov_rad / 2))
-        self.fy = self.fx
-        self.cx = self.img_w / 2
-        self.cy = self.img_h / 2
-
-        self.classes = {
-            "Car": np.array([0,0,142], dtype=np.uint8),
-            "Truck": np.array([0,0,70], dtype=np.uint8),
-            "Bus": np.array([0,60,100], dtype=np.uint8),
-            "Motorcycle": np.array([0,0,230], dtype=np.uint8)
-        }
-
-    def world_to_camera(self, world_point, cam_tf):
-        wp = np.array([world_point.x, world_point.y, world_point.z], dtype=float)
-        cam_loc = cam_tf.location
-        cam_pos = np.array([cam_loc.x, cam_loc.y, cam_loc.z], dtype=float)
-        R = np.eye(3)
-        t = -R @ cam_pos
-        return R @ wp + t
-
-    def camera_to_image(self, cam_coords):
-        x, y, z = cam_coords
-        if z <= 0.001: return None
-        u = (self.fx * x / z) + self.cx
-        v = (self.fy * y / z) + self.cy
-        return int(u), int(v), float(z)
-
-    def _project_actor(self, actor):
-        try:
-            bb = actor.bounding_box
-            bb_loc = actor.get_transform().transform(bb.location)
-            img_pt = self.camera_to_image(self.world_to_camera(bb_loc, self.camera.get_transform()))
-            if img_pt is None: return None
-            u, v, z = img_pt
-            if u<0 or u>=self.img_w or v<0 or v>=self.img_h: return None
-            return u,v,z
-        except:
-            return None
-
-    def detect_and_draw(self, frame):
-        if frame.shape[2]==4: frame=cv2.cvtColor(frame, cv2.COLOR_RGBA2RGB)
-        frame_out = frame.copy()
-        counts = {}
-
-        actors = self.world.get_actors().filter("vehicle.*")
-        actor_proj_points = []
-        actor_list = []
-
+        self.min_blob_size = min_blob_size  # blobs narrower or lower than this (px) are ignored
+        self.roi = roi  # (x, y, width, height) of the image searched for blobs, None = whole image
+        self.scale = scale  # labels are subsampled by this factor before blob extraction
+
+        self.projector = CameraProjector(self.img_w, self.img_h, fov)
+        self._boxes = {}  # actor id -> bounding box center + extent (actor frame), fetched once
+
+        self.classes = VEHICLE_CLASSES  # class name -> CARLA semantic tag
+
+    def bind_camera(self, camera):
+        """Project into `camera`; image size and FOV are taken from its attributes."""
+        self.camera = camera
+        attributes = camera.attributes
+        self.img_w = int(attributes.get("image_size_x", self.img_w))
+        self.img_h = int(attributes.get("image_size_y", self.img_h))
+        self.fov = float(attributes.get("fov", self.fov))
+        self.projector = CameraProjector(self.img_w, self.img_h, self.fov)
+
+    def box_geometry(self, actors):
+        """Bounding box centers and extents (N, 3) in the actor frame."""
         for actor in actors:
-            proj = self._project_actor(actor)
-            if proj:
-                u,v,_ = proj
-                actor_proj_points.append((u,v))
-                actor_list.append(actor)
-
-        kdtree = cKDTree(np.array(actor_proj_points)) if actor_proj_points else None
-
-        for cls_name, color in self.classes.items():
-            mask = cv2.inRange(frame, color, color)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3,3),np.uint8))
-            contours,_ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            counts[cls_name]=0
-
-            for cnt in contours:
-                x,y,w,h=cv2.boundingRect(cnt)
-                if w<8 or h<8: continue
-                cx,cy = x+w//2, y+h//2
-                counts[cls_name]+=1
-
-                box_color = (0,255,0) if cls_name=="Car" else \
-                            (255,0,0) if cls_name=="Truck" else \
-                            (0,255,255) if cls_name=="Bus" else (255,0,255)
-
-                matched_actor=None
-                if kdtree:
-                    dists, idxs = kdtree.query([(cx,cy)], k=3, distance_upper_bound=self.match_threshold_px)
-                    dists, idxs = dists[0], idxs[0]
-                    for dist, idx in zip(dists, idxs):
-                        if idx>=len(actor_list) or np.isinf(dist): continue
-                        matched_actor=actor_list[idx]
-                        break
-
-                if matched_actor:
-                    cv2.rectangle(frame_out,(x,y),(x+w,y+h),box_color,2)
-                    txt1=f"{cls_name} id:{matched_actor.id}"
-                    cv2.putText(frame_out,txt1,(x,y-5),cv2.FONT_HERSHEY_SIMPLEX,0.45,box_color,1)
-                else:
-                    cv2.rectangle(frame_out,(x,y),(x+w,y+h),box_color,1)
-                    cv2.putText(frame_out,cls_name,(x,y-5),cv2.FONT_HERSHEY_SIMPLEX,0.5,box_color,1)
-
+            if actor.id not in self._boxes:
+                bb = actor.bounding_box
+                self._boxes[actor.id] = (bb.location.x, bb.location.y, bb.location.z,
+                                         bb.extent.x, bb.extent.y, bb.extent.z)
+        geometry = np.array([self._boxes[actor.id] for actor in actors], dtype=float).reshape(-1, 6)
+        return geometry[:, :3], geometry[:, 3:]
+
+    def project_actors(self):
+        """
+        Project the 3D boxes of every vehicle in the current snapshot into the camera.
+        Poses come from the snapshot and the camera extrinsic is built once;
+        all corners go through one matrix product.
+        Returns (actor ids (N,), image boxes (N, 4) x1, y1, x2, y2, depths (N,)) of the
+        vehicles in view.
+        """
+        if self.state is None:
+            self.state = WorldStateCache(self.world)
+        pairs = self.state.vehicle_transforms() if self.camera else []
+        if not pairs:
+            return np.zeros(0, dtype=np.int32), np.zeros((0, 4)), np.zeros(0)
+
+        self.projector.set_pose(self.state.transform(self.camera))
+        actors, transforms = zip(*pairs)
+        locations, rotations = pose_arrays(transforms)
+        centers, extents = self.box_geometry(actors)
+        boxes, depths, visible = self.projector.project_boxes(
+            box_corners(locations, rotations, centers, extents))
+        actor_ids = np.array([actor.id for actor in actors], dtype=np.int32)
+        return actor_ids[visible], boxes[visible], depths[visible]
+
+    def match_actors(self, centers):
+        """
+        Projected vehicle (box center) of each blob center, assigned one-to-one within
+        match_threshold_px (see associate).
+        Returns (actor ids, depths); -1 / NaN where nothing is close enough.
+        """
+        actor_ids = np.full(len(centers), -1, dtype=np.int32)
+        depths = np.full(len(centers), np.nan, dtype=np.float32)
+        if not len(centers):
+            return actor_ids, depths
+        ids, boxes, actor_depths = self.project_actors()
+        if not len(ids):
+            return actor_ids, depths
+
+        box_centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+        matches, _, _, _ = associate(centers, box_centers, self.match_threshold_px)
+        actor_ids[matches[:, 0]] = ids[matches[:, 1]]
+        depths[matches[:, 0]] = actor_depths[matches[:, 1]]
+        return actor_ids, depths
+
+    def region(self, labels):
+        """
+        (bounds, view): the ROI of a full-resolution map as x0, y0, x1, y1 (clipped to
+        the image) and its view, subsampled by self.scale.
+        """
+        height, width = labels.shape[:2]
+        x0, y0, x1, y1 = 0, 0, width, height
+        if self.roi is not None:
+            x, y, roi_width, roi_height = self.roi
+            x0, y0 = max(int(x), 0), max(int(y), 0)
+            x1, y1 = min(x0 + int(roi_width), width), min(y0 + int(roi_height), height)
+            labels = labels[y0:y1, x0:x1]
+        if self.scale > 1:
+            labels = np.ascontiguousarray(labels[::self.scale, ::self.scale])  # nearest: tags stay exact
+        return np.array([x0, y0, x1, y1]), labels
+
+    def detect(self, labels, frame=-1, instances=None):
+        """
+        labels: CARLA tag map of a semantic frame (SensorHandler.semantic_labels)
+        instances: Actor id map of an instance segmentation frame; blobs are then split
+        and identified from the image, without projection or KD-tree matching
+        Only the ROI is searched, at 1/scale resolution; boxes and areas are
+        returned in full-resolution pixels.
+        Returns a DETECTION_DTYPE array with one row per vehicle blob.
+        """
+        bounds, labels = self.region(labels)
+        min_size = max(1, self.min_blob_size // self.scale)
+        if instances is not None:
+            boxes, class_ids, areas, actor_ids = extract_instance_blobs(
+                labels, self.region(instances)[1], min_size)
+        else:
+            # The 3x3 opening would erase vehicles that are only a few pixels wide once subsampled
+            boxes, class_ids, areas = extract_blobs(labels, min_size=min_size, open_mask=self.scale == 1)
+        # A subsampled pixel stands for scale x scale pixels, which may run past the ROI edge
+        boxes = np.clip(boxes * self.scale + bounds[[0, 1, 0, 1]], bounds[[0, 1, 0, 1]], bounds[[2, 3, 2, 3]])
+        areas = np.minimum(areas * self.scale ** 2, (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]))
+        detections = np.zeros(len(boxes), dtype=DETECTION_DTYPE)
+        detections["frame"] = frame
+        detections["x1"], detections["y1"], detections["x2"], detections["y2"] = boxes.T
+        detections["class_id"] = class_ids
+        detections["area"] = areas
+        if instances is not None:
+            detections["actor_id"] = actor_ids
+            detections["depth"] = np.nan
+        else:
+            centers = np.stack([(boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2], axis=1)
+            detections["actor_id"], detections["depth"] = self.match_actors(centers)
+        return detections
+
+    def profile_scales(self, labels, scales=(1, 2, 4), instances=None, repeats=20):
+        """
+        Time detect() on one frame at each processing scale (ROI unchanged).
+        Returns {scale: (ms per frame, detections)}.
+        """
+        profile = {}
+        current = self.scale
+        try:
+            for scale in scales:
+                self.scale = scale
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    detections = self.detect(labels, instances=instances)
+                profile[scale] = ((time.perf_counter() - start) / repeats * 1000, len(detections))
+        finally:
+            self.scale = current
+        return profile
+
+    def report_scales(self, labels, scales=(1, 2, 4), instances=None):
+        roi = f"ROI {self.roi[2]}x{self.roi[3]} at ({self.roi[0]}, {self.roi[1]})" if self.roi else "full image"
+        print(f"📏 Detection time per scale ({roi}):")
+        for scale, (ms, count) in self.profile_scales(labels, scales, instances).items():
+            print(f"   1/{scale}: {ms:.2f} ms, {count} detections")
+
+    def draw(self, frame_out, detections):
+        """Draw detections on an RGB image in place; returns per-class counts."""
+        counts = {cls_name: 0 for cls_name in self.classes}
+        for det in detections.tolist():
+            _, x1, y1, x2, y2, class_id, _, actor_id, _ = det
+            cls_name = CLASS_NAMES[class_id]
+            counts[cls_name]+=1
+
+            box_color = (0,255,0) if cls_name=="Car" else \
+                        (255,0,0) if cls_name=="Truck" else \
+                        (0,255,255) if cls_name=="Bus" else (255,0,255)
+
+            if actor_id >= 0:
+                cv2.rectangle(frame_out,(x1,y1),(x2,y2),box_color,2)
+                txt1=f"{cls_name} id:{actor_id}"
+                cv2.putText(frame_out,txt1,(x1,y1-5),cv2.FONT_HERSHEY_SIMPLEX,0.45,box_color,1)
+            else:
+                cv2.rectangle(frame_out,(x1,y1),(x2,y2),box_color,1)
+                cv2.putText(frame_out,cls_name,(x1,y1-5),cv2.FONT_HERSHEY_SIMPLEX,0.5,box_color,1)
+        return counts
+
+    def detect_and_draw(self, labels, instances=None):
+        """labels: CARLA tag map of a semantic frame (SensorHandler.semantic_labels)"""
+        frame_out = labels_to_palette(labels)
+        counts = self.draw(frame_out, self.detect(labels, instances=instances))
         return cv2.cvtColor(frame_out, cv2.COLOR_RGB2BGR), counts
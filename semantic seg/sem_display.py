@@ -3,34 +3,59 @@ import pygame
 import cv2
 import numpy as np
 from sem_detect import SemanticDetector
+from sem_pipeline import DetectionStage
 from sem_track import Sort
+from world_state import WorldStateCache
 import carla
 
 class DisplayManager:
-    def __init__(self, world, vehicle, sensors, img_size=(800,600)):
-        pygame.init()
-        self.display = pygame.display.set_mode(img_size)
-        pygame.display.set_caption("CARLA Semantic Feed")
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.Font(None, 36)
+    def __init__(self, world, vehicle, sensors, img_size=(800,600), state=None, stage=None, headless=False):
+        self.headless = headless  # no windows: frames are only detected and recorded
+        self.display = None
+        self.max_fps = 60  # frame pacing of the feed window (0 = unpaced)
+        if not headless:
+            pygame.init()
+            self.display = pygame.display.set_mode(img_size)
+            pygame.display.set_caption("CARLA Semantic Feed")
+            self.clock = pygame.time.Clock()
+            self.font = pygame.font.Font(None, 36)
 
         self.world = world
         self.vehicle = vehicle
+        self.state = state  # WorldStateCache, updated once per tick by the main loop
         self.semantic_sensor = sensors
         self.img_w, self.img_h = img_size
 
-        # Initialize SemanticDetector
-        self.detector = SemanticDetector(world, vehicle, None, image_size=img_size)
-
-        # Initialize SORT tracker
-        self.tracker = Sort(max_age=5, min_hits=1, iou_threshold=0.3)
+        # Detection + SORT tracking run once per sensor frame in the shared stage
+        self.stage = stage if stage else DetectionStage(
+            sensors, SemanticDetector(world, vehicle, None, image_size=img_size, state=state),
+            Sort(max_age=5, min_hits=1, iou_threshold=0.3))
+        self.detector = self.stage.detector
 
         # OpenCV window for bounding box visualization
-        cv2.namedWindow("Bounding Boxes", cv2.WINDOW_NORMAL)
-        cv2.resizeWindow("Bounding Boxes", self.img_w, self.img_h)
+        if not headless:
+            cv2.namedWindow("Bounding Boxes", cv2.WINDOW_NORMAL)
+            cv2.resizeWindow("Bounding Boxes", self.img_w, self.img_h)
+
+    def attach(self, world, vehicle, state=None):
+        """
+        Bind the display (and its detector) to the world, ego vehicle and
+        per-tick state cache once they exist, so the window can be created
+        before the world is loaded.
+        """
+        self.world = world
+        self.vehicle = vehicle
+        self.state = state if state else WorldStateCache(world)
+        self.detector.world = world
+        self.detector.ego_vehicle = vehicle
+        self.detector.state = self.state
+
+    def reset(self):
+        """Start tracking from scratch (new episode)."""
+        self.stage.reset()
 
     def update_spectator(self, vehicle, spectator):
-        vt = vehicle.get_transform()
+        vt = self.state.transform(vehicle)
         fwd = vt.get_forward_vector()
         sp_tf = carla.Transform(
             carla.Location(x=vt.location.x - 8*fwd.x,
@@ -54,77 +79,71 @@ class DisplayManager:
             self.display.blit(surf, (0, 0))
 
         pygame.display.flip()
-        self.clock.tick(60)
+        self.clock.tick(self.max_fps)
         return True
 
-    def draw_with_detection(self, recorder=None):
+    def draw_with_detection(self, recorder=None, semantic=None):
         """
-        Process semantic image, draw bounding boxes in OpenCV window.
-        Tracks vehicles across frames with SORT and shows heading vectors.
+        Show the current frame's tracked boxes in the OpenCV window.
+        Detection and SORT tracking come from the shared stage and run once
+        per sensor frame; a frame is drawn and recorded only when it is new.
+        semantic: Sensor frame handed over for this tick (default: the latest)
         """
-        semantic_image = self.semantic_sensor.semantic_image
-        bbox_image = None
-        detections = []
-
-        if semantic_image is not None:
-            # Prepare detections for SORT
-            for cls_name, color in self.detector.classes.items():
-                mask = cv2.inRange(semantic_image, color, color)
-                mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3,3),np.uint8))
-                contours,_ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                for cnt in contours:
-                    x,y,w,h = cv2.boundingRect(cnt)
-                    if w < 8 or h < 8: 
-                        continue
-                    detections.append([x, y, x+w, y+h, cls_name])
-
-            # Update tracker
-            tracked_objects = self.tracker.update(detections)
-
-            # Draw tracked boxes with heading arrows
-            bbox_image = semantic_image.copy()
-            for obj in tracked_objects:
-                x1, y1, x2, y2, obj_id, cls_name, heading = obj
-
-                # Choose color per class
-                color = (0,255,0) if cls_name=="Car" else \
-                        (255,0,0) if cls_name=="Truck" else \
-                        (0,255,255) if cls_name=="Bus" else (255,0,255)
-
-                # Draw bounding box
-                cv2.rectangle(bbox_image, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
-                cv2.putText(bbox_image, f"{cls_name} id:{obj_id}", (int(x1), int(y1)-5),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1)
-
-                # Draw heading arrow
-                cx = int((x1+x2)/2)
-                cy = int((y1+y2)/2)
-                dx, dy = heading
-                norm = np.linalg.norm([dx, dy])
-                if norm > 0:
-                    dx, dy = dx/norm*20, dy/norm*20  # normalize & scale for visibility
-                    cv2.arrowedLine(bbox_image, (cx, cy), (int(cx+dx), int(cy+dy)), (255,255,255), 2, tipLength=0.3)
-
-            # Show bounding box feed in OpenCV window
-            cv2.imshow("Bounding Boxes", cv2.cvtColor(bbox_image, cv2.COLOR_RGB2BGR))
-            cv2.waitKey(1)
+        result = self.stage.update(semantic)
+        semantic_image = result.palette if result.labels is not None else None
+        if semantic_image is None and result.frame is not None:
+            # Sensorless ground truth: boxes only, on a blank canvas
+            semantic_image = np.zeros((self.img_h, self.img_w, 3), dtype=np.uint8)
+
+        if semantic_image is not None and self.stage.fresh:
+            if not self.headless:
+                # Draw tracked boxes with heading arrows
+                bbox_image = semantic_image.copy()
+                for obj in result.tracks:
+                    x1, y1, x2, y2, obj_id, cls_name, heading = obj
+
+                    # Choose color per class
+                    color = (0,255,0) if cls_name=="Car" else \
+                            (255,0,0) if cls_name=="Truck" else \
+                            (0,255,255) if cls_name=="Bus" else (255,0,255)
+
+                    # Draw bounding box
+                    cv2.rectangle(bbox_image, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+                    cv2.putText(bbox_image, f"{cls_name} id:{obj_id}", (int(x1), int(y1)-5),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1)
+
+                    # Draw heading arrow
+                    cx = int((x1+x2)/2)
+                    cy = int((y1+y2)/2)
+                    dx, dy = heading
+                    norm = np.linalg.norm([dx, dy])
+                    if norm > 0:
+                        dx, dy = dx/norm*20, dy/norm*20  # normalize & scale for visibility
+                        cv2.arrowedLine(bbox_image, (cx, cy), (int(cx+dx), int(cy+dy)), (255,255,255), 2, tipLength=0.3)
+
+                # Show bounding box feed in OpenCV window
+                cv2.imshow("Bounding Boxes", cv2.cvtColor(bbox_image, cv2.COLOR_RGB2BGR))
 
             # Record if enabled
             if recorder:
-                vel = self.vehicle.get_velocity()
-                speed = np.linalg.norm([vel.x, vel.y, vel.z])
-                ctrl = self.vehicle.get_control()
+                speed = self.state.speed(self.vehicle)
+                ctrl = self.state.control(self.vehicle)
                 rec_img = cv2.resize(semantic_image, (800, 600)) \
                     if semantic_image.shape[0:2] != (600, 800) else semantic_image
                 recorder.record(rec_img, speed, ctrl.steer, ctrl.throttle, ctrl.brake)
+        if self.headless:
+            return True, result.tracks
+        if semantic_image is not None:
+            cv2.waitKey(1)
 
         # Show semantic feed in Pygame
         running = self.draw_pygame_feed(semantic_image)
-        return running, tracked_objects if semantic_image is not None else []
+        return running, result.tracks
 
     def close(self):
         """
         Cleanly close OpenCV windows
         """
-        cv2.destroyAllWindows()
+        if not self.headless:
+            cv2.destroyAllWindows()
         pygame.quit()
@@ -0,0 +1,91 @@
+# sem_episode.py
+import random
+import time
+import carla
+
+class EpisodeManager:
+    """
+    Resets the scene between episodes without destroying actors or reloading
+    the map: the ego and existing NPCs are teleported to fresh spawn points
+    with zero velocity, the traffic manager is re-seeded, the weather is
+    re-sampled (optional WeatherScheduler), sensor buffers are flushed and the
+    recorder rolls over to a new episode group.
+    """
+    def __init__(self, client, world, spawner, sensors, catalog, seed=0,
+                 display=None, recorder=None, rpc_stats=None, weather=None):
+        self.client = client
+        self.world = world
+        self.spawner = spawner
+        self.sensors = sensors
+        self.catalog = catalog
+        self.seed = seed
+        self.display = display
+        self.recorder = recorder
+        self.rpc_stats = rpc_stats
+        self.weather = weather  # WeatherScheduler or None (keep the map's weather)
+        self.episode = 0
+        self.turnover_times = []  # seconds per reset
+
+    def episode_metadata(self, episode):
+        """Apply this episode's conditions; returns them as recorder metadata."""
+        metadata = {"seed": self.seed + episode}
+        if self.weather:
+            metadata.update({f"weather/{k}": v for k, v in self.weather.apply(self.world, episode).items()})
+        return metadata
+
+    def start(self):
+        """Set up the conditions of the first episode (the actors are already in place)."""
+        metadata = self.episode_metadata(0)
+        if self.recorder:
+            self.recorder.set_metadata(metadata)
+        return metadata
+
+    def reset(self, episode):
+        start = time.perf_counter()
+        self.episode = episode
+        rng = random.Random(self.seed + episode)
+
+        # Fresh spawn points: ego first, NPCs on the rest
+        ego = self.spawner.vehicle
+        actors = [ego] + list(self.spawner.vehicles)
+        spawn_points = list(self.catalog.spawn_points)
+        rng.shuffle(spawn_points)
+
+        zero = carla.Vector3D(0.0, 0.0, 0.0)
+        batch = []
+        for actor, sp in zip(actors, spawn_points):
+            batch.append(carla.command.ApplyTransform(actor.id, sp))
+            batch.append(carla.command.ApplyTargetVelocity(actor.id, zero))
+            batch.append(carla.command.ApplyTargetAngularVelocity(actor.id, zero))
+        batch.append(carla.command.ApplyVehicleControl(ego.id, carla.VehicleControl()))
+        errors = [r.error for r in self.client.apply_batch_sync(batch, False) if r.error]
+        if len(actors) > len(spawn_points):
+            print(f"[EpisodeManager] Only {len(spawn_points)} spawn points for {len(actors)} vehicles")
+
+        # The ego's control was reset behind the RPC wrapper's back
+        if self.rpc_stats:
+            self.rpc_stats.forget(ego.id)
+
+        self.spawner.tm.set_random_device_seed(self.seed + episode)
+        metadata = self.episode_metadata(episode)
+
+        # Simulate the teleport, then drop any frame rendered before it
+        frame = self.world.tick()
+        self.sensors.flush(min_frame=frame)
+        if self.display:
+            self.display.reset()
+        if self.recorder:
+            self.recorder.new_episode(episode, metadata)
+
+        elapsed = time.perf_counter() - start
+        self.turnover_times.append(elapsed)
+        print(f"🔁 Episode {episode+1} reset in {elapsed*1000:.1f} ms "
+              f"({len(actors)} vehicles moved{f', {len(errors)} errors' if errors else ''})")
+        return elapsed
+
+    def report(self):
+        if not self.turnover_times:
+            return
+        times = [t * 1000 for t in self.turnover_times]
+        print(f"🔁 Episode turnover: {len(times)} resets, avg {sum(times)/len(times):.1f} ms, "
+              f"max {max(times):.1f} ms")
@@ -0,0 +1,98 @@
+# sem_geometry.py
+"""
+Batched camera geometry. Actor poses come from one WorldSnapshot, rotation
+matrices for all actors are built in one NumPy expression (same convention
+as carla.Transform.get_matrix), and the eight corners of every bounding box
+are projected through the full camera extrinsic and pinhole intrinsics at
+once.
+"""
+import math
+import numpy as np
+
+# Corner signs of a box around its center, as carla.BoundingBox.get_local_vertices
+BOX_CORNERS = np.array([[sx, sy, sz] for sx in (-1, 1) for sy in (-1, 1) for sz in (-1, 1)], dtype=float)
+
+
+def rotation_matrices(pitch, yaw, roll):
+    """(N, 3, 3) rotation matrices from angles in degrees (Unreal convention, as CARLA)."""
+    cp, sp = np.cos(np.radians(pitch)), np.sin(np.radians(pitch))
+    cy, sy = np.cos(np.radians(yaw)), np.sin(np.radians(yaw))
+    cr, sr = np.cos(np.radians(roll)), np.sin(np.radians(roll))
+    return np.stack([
+        np.stack([cp * cy, cy * sp * sr - sy * cr, -cy * sp * cr - sy * sr], axis=-1),
+        np.stack([cp * sy, sy * sp * sr + cy * cr, -sy * sp * cr + cy * sr], axis=-1),
+        np.stack([sp, -cp * sr, cp * cr], axis=-1)], axis=-2)
+
+
+def pose_arrays(transforms):
+    """Locations (N, 3) and rotation matrices (N, 3, 3) of a list of carla.Transform."""
+    poses = np.array([(t.location.x, t.location.y, t.location.z,
+                       t.rotation.pitch, t.rotation.yaw, t.rotation.roll) for t in transforms],
+                     dtype=float).reshape(-1, 6)
+    return poses[:, :3], rotation_matrices(poses[:, 3], poses[:, 4], poses[:, 5])
+
+
+def box_corners(locations, rotations, centers, extents):
+    """
+    World coordinates (N, 8, 3) of the corners of N bounding boxes.
+    centers / extents: (N, 3) box center offset and half size in the actor frame
+    """
+    local = centers[:, None, :] + extents[:, None, :] * BOX_CORNERS[None]
+    return np.einsum("nij,nkj->nki", rotations, local) + locations[:, None, :]
+
+
+class CameraProjector:
+    """Pinhole camera with the full extrinsic of a carla camera transform."""
+
+    def __init__(self, width, height, fov):
+        """
+        width, height: Image size in pixels
+        fov: Horizontal field of view in degrees
+        """
+        self.width = width
+        self.height = height
+        self.fov = fov
+        self.fx = self.fy = width / (2.0 * math.tan(math.radians(fov) / 2.0))
+        self.cx = width / 2.0
+        self.cy = height / 2.0
+        self.location = np.zeros(3)
+        self.rotation = np.eye(3)
+
+    def set_pose(self, transform, mount=None):
+        """
+        Camera pose for the frame (once per frame, from the snapshot).
+        mount: Optional camera transform relative to `transform` (a rigidly attached
+        camera that does not exist as a sensor)
+        """
+        location, rotation = pose_arrays([transform] if mount is None else [transform, mount])
+        self.location, self.rotation = location[0], rotation[0]
+        if mount is not None:
+            self.location = self.location + self.rotation @ location[1]
+            self.rotation = self.rotation @ rotation[1]
+
+    def to_camera(self, points):
+        """World points (..., 3) -> camera frame (..., 3) as (forward, right, up)."""
+        return (points - self.location) @ self.rotation
+
+    def project(self, points, near=0.1):
+        """World points (..., 3) -> pixel u, v and depth; u, v are meaningless where depth <= near."""
+        cam = self.to_camera(points)
+        depth = cam[..., 0]
+        safe = np.maximum(depth, near)
+        u = self.cx + self.fx * cam[..., 1] / safe
+        v = self.cy - self.fy * cam[..., 2] / safe
+        return u, v, depth
+
+    def project_boxes(self, corners, near=0.1):
+        """
+        Image-space boxes of (N, 8, 3) world box corners.
+        Returns (boxes (N, 4) x1, y1, x2, y2 clipped to the image, depth (N,) of the
+        box center, visible (N,) bool: fully in front of the camera and overlapping the image).
+        """
+        u, v, depth = self.project(corners, near)
+        in_front = (depth > near).all(axis=1)
+        boxes = np.stack([u.min(axis=1), v.min(axis=1), u.max(axis=1), v.max(axis=1)], axis=1)
+        visible = in_front & (boxes[:, 2] >= 0) & (boxes[:, 0] < self.width) & \
+            (boxes[:, 3] >= 0) & (boxes[:, 1] < self.height)
+        boxes = np.clip(boxes, 0, [self.width - 1, self.height - 1, self.width - 1, self.height - 1])
+        return boxes, depth.mean(axis=1), visible
@@ -0,0 +1,167 @@
+# sem_groundtruth.py
+"""
+Sensorless ground-truth boxes. Vehicle boxes are computed every tick from
+the actor bounding boxes and snapshot poses, projected through a virtual
+camera with the detector's intrinsics mounted where the semantic camera would
+be. No image is rendered or decoded, so the server can run in no-rendering
+mode. Boxes outside the view are culled; occlusion is approximated with a
+coarse depth-ordered raster of the projected box hulls.
+"""
+import math
+import time
+import cv2
+import numpy as np
+import carla
+from sem_detect import DETECTION_DTYPE
+from sem_geometry import box_corners, pose_arrays
+from sem_labels import VEHICLE_CLASSES, tag_class_ids
+from sem_pipeline import DetectionStage, FrameResult
+
+# Same mount as SpawnManager.setup_semantic_camera
+DEFAULT_MOUNT = carla.Transform(carla.Location(z=50), carla.Rotation(pitch=-90))
+
+
+class GroundTruthGenerator:
+    def __init__(self, detector, mount=None, max_distance=100.0, occlusion_scale=0, min_visible=0.1,
+                 include_ego=True):
+        """
+        detector: SemanticDetector providing the ego, world state, box cache and camera intrinsics
+        mount: Virtual camera transform relative to the ego (default: the semantic camera mount)
+        max_distance: Vehicles farther than this from the ego (m) are skipped before projection
+        occlusion_scale: Downscale factor of the occlusion raster (0 = no occlusion test)
+        min_visible: Boxes with a smaller unoccluded fraction are dropped (occlusion test only)
+        include_ego: Keep the ego's own box (the overhead camera sees it too)
+        """
+        self.detector = detector
+        self.mount = mount if mount is not None else DEFAULT_MOUNT
+        self.max_distance = max_distance
+        self.occlusion_scale = occlusion_scale
+        self.min_visible = min_visible
+        self.include_ego = include_ego
+        self._classes = {}  # actor id -> vehicle class id, from its semantic tags
+
+        # Statistics
+        self.frames = 0
+        self.vehicles = 0  # vehicles in range, before culling
+        self.boxes = 0
+        self.occluded = 0
+
+    def _class_ids(self, actors):
+        for actor in actors:
+            if actor.id not in self._classes:
+                tags = getattr(actor, "semantic_tags", None) or [VEHICLE_CLASSES["Car"]]
+                class_ids = tag_class_ids(tags)
+                self._classes[actor.id] = int(class_ids.max())
+        return np.array([self._classes[actor.id] for actor in actors], dtype=np.uint8)
+
+    def _visible_fraction(self, corners, depths):
+        """
+        Unoccluded fraction of each box: the convex hulls of the projected corners are
+        painted far to near into a raster downscaled by occlusion_scale, then the
+        pixels each box kept are counted.
+        """
+        projector = self.detector.projector
+        scale = self.occlusion_scale
+        raster = np.zeros((math.ceil(projector.height / scale), math.ceil(projector.width / scale)), np.int32)
+        u, v, _ = projector.project(corners)
+        points = (np.stack([u, v], axis=-1) / scale).astype(np.float32)
+        frame = np.array([[0, 0], [raster.shape[1], 0], [raster.shape[1], raster.shape[0]], [0, raster.shape[0]]],
+                         dtype=np.float32)
+        areas = np.ones(len(corners))
+        for i in np.argsort(-depths):
+            hull = cv2.convexHull(points[i])
+            cv2.fillConvexPoly(raster, hull.round().astype(np.int32), int(i) + 1)
+            areas[i] = max(cv2.intersectConvexConvex(hull, frame)[0], 1.0)  # part of the hull inside the image
+        kept = np.bincount(raster.ravel(), minlength=len(corners) + 1)[1:]
+        return np.minimum(kept / areas, 1.0)
+
+    def generate(self, frame=-1):
+        """Ground-truth boxes of the current snapshot as a DETECTION_DTYPE array."""
+        detector = self.detector
+        state = detector.state
+        pairs = state.vehicle_transforms() if state is not None and detector.ego_vehicle else []
+        if not pairs:
+            return np.zeros(0, dtype=DETECTION_DTYPE)
+        self.frames += 1
+
+        ego_transform = state.transform(detector.ego_vehicle)
+        actors, transforms = zip(*pairs)
+        locations, rotations = pose_arrays(transforms)
+        ego = np.array([ego_transform.location.x, ego_transform.location.y])
+        near = np.hypot(*(locations[:, :2] - ego).T) <= self.max_distance
+        if not self.include_ego:
+            near &= np.array([actor.id != detector.ego_vehicle.id for actor in actors])
+        actors = [actor for actor, keep in zip(actors, near) if keep]
+        locations, rotations = locations[near], rotations[near]
+        self.vehicles += len(actors)
+
+        detector.projector.set_pose(ego_transform, self.mount)
+        centers, extents = detector.box_geometry(actors)
+        corners = box_corners(locations, rotations, centers, extents)
+        boxes, depths, visible = detector.projector.project_boxes(corners)
+        class_ids = self._class_ids(actors)
+        visible &= class_ids > 0
+        actor_ids = np.array([actor.id for actor in actors], dtype=np.int32)[visible]
+        boxes, depths, corners, class_ids = boxes[visible], depths[visible], corners[visible], class_ids[visible]
+
+        x1, y1 = np.floor(boxes[:, 0]), np.floor(boxes[:, 1])
+        x2, y2 = np.ceil(boxes[:, 2]), np.ceil(boxes[:, 3])
+        areas = (x2 - x1) * (y2 - y1)
+        if self.occlusion_scale and len(actor_ids):
+            fraction = self._visible_fraction(corners, depths)
+            keep = fraction >= self.min_visible
+            self.occluded += int((~keep).sum())
+            areas = areas * fraction
+            x1, y1, x2, y2, areas = x1[keep], y1[keep], x2[keep], y2[keep], areas[keep]
+            class_ids, actor_ids, depths = class_ids[keep], actor_ids[keep], depths[keep]
+
+        detections = np.zeros(len(actor_ids), dtype=DETECTION_DTYPE)
+        detections["frame"] = frame
+        detections["x1"], detections["y1"], detections["x2"], detections["y2"] = x1, y1, x2, y2
+        detections["class_id"] = class_ids
+        detections["area"] = np.round(areas)
+        detections["actor_id"] = actor_ids
+        detections["depth"] = depths
+        self.boxes += len(detections)
+        return detections
+
+    def report(self):
+        if not self.frames:
+            return
+        print(f"📐 Ground truth: {self.boxes / self.frames:.1f} boxes/frame from "
+              f"{self.vehicles / self.frames:.1f} vehicles in range"
+              + (f", {self.occluded} occluded boxes dropped" if self.occlusion_scale else ""))
+
+
+class GroundTruthStage(DetectionStage):
+    """DetectionStage fed by GroundTruthGenerator, keyed by the snapshot frame instead of a sensor frame."""
+    name = "Ground-truth stage"
+
+    def __init__(self, generator, tracker=None):
+        """
+        generator: GroundTruthGenerator producing the boxes of each tick
+        tracker: Optional Sort tracker, updated once per new frame
+        """
+        super().__init__(None, generator.detector, tracker)
+        self.generator = generator
+
+    def update(self, semantic=None):
+        """Generate the boxes of the current tick if it is new. Returns its FrameResult."""
+        state = self.detector.state
+        frame = state.frame if state is not None else None
+        if frame is None or frame == self.result.frame:
+            self.fresh = False
+            self.skipped += 1
+            return self.result
+
+        start = time.perf_counter()
+        detections = self.generator.generate(frame)
+        self.result = FrameResult(frame, None, detections, self.track(detections))
+        self.fresh = True
+        self.processed += 1
+        self.process_time += time.perf_counter() - start
+        return self.result
+
+    def report(self):
+        super().report()
+        self.generator.report()
@@ -0,0 +1,121 @@
+# sem_labels.py
+"""
+Semantic label decoding. The semantic camera stores the CARLA class tag of
+every pixel in the R channel of the raw image, so the pipeline works on that
+label map directly: one lookup maps tags to vehicle class ids and a single
+connected-components pass extracts the blobs of every class. The CityScapes
+palette is only applied for display and recording.
+"""
+import cv2
+import numpy as np
+
+# CARLA semantic tags (0.9.14+) of the detected vehicle classes
+VEHICLE_CLASSES = {"Car": 14, "Truck": 15, "Bus": 16, "Motorcycle": 18}
+CLASS_NAMES = ["Background"] + list(VEHICLE_CLASSES)  # index = class id
+
+# CityScapes palette (RGB) by CARLA tag, as carla.ColorConverter.CityScapesPalette
+CITYSCAPES_PALETTE = np.zeros((256, 3), dtype=np.uint8)
+CITYSCAPES_PALETTE[:29] = [
+    (0, 0, 0), (128, 64, 128), (244, 35, 232), (70, 70, 70), (102, 102, 156),
+    (190, 153, 153), (153, 153, 153), (250, 170, 30), (220, 220, 0), (107, 142, 35),
+    (152, 251, 152), (70, 130, 180), (220, 20, 60), (255, 0, 0), (0, 0, 142),
+    (0, 0, 70), (0, 60, 100), (0, 80, 100), (0, 0, 230), (119, 11, 32),
+    (110, 190, 160), (170, 120, 50), (55, 90, 80), (45, 60, 150), (157, 234, 50),
+    (81, 0, 81), (150, 100, 100), (230, 150, 140), (180, 165, 180)]
+
+_CLASS_LUT = np.zeros(256, dtype=np.uint8)
+for _class_id, _tag in enumerate(VEHICLE_CLASSES.values(), 1):
+    _CLASS_LUT[_tag] = _class_id
+
+_KERNEL = np.ones((3, 3), np.uint8)
+
+
+def decode_labels(image):
+    """Tag map (H, W) uint8 from a raw (unconverted) carla semantic image."""
+    arr = np.frombuffer(image.raw_data, dtype=np.uint8).reshape((image.height, image.width, 4))
+    return arr[:, :, 2].copy()
+
+
+def decode_instances(image):
+    """Actor id map (H, W) uint16 from a raw instance segmentation image (G + 256 * B)."""
+    arr = np.frombuffer(image.raw_data, dtype=np.uint8).reshape((image.height, image.width, 4))
+    return arr[:, :, 1] | (arr[:, :, 0].astype(np.uint16) << 8)
+
+
+def labels_to_palette(labels):
+    """CityScapes-palette RGB image of a tag map (display / recording only)."""
+    return CITYSCAPES_PALETTE[labels]
+
+
+def class_id_map(labels):
+    """Vehicle class id per pixel (0 = background, see CLASS_NAMES)."""
+    return cv2.LUT(labels, _CLASS_LUT)
+
+
+def tag_class_ids(tags):
+    """Vehicle class id of each CARLA tag (0 = not a detected class)."""
+    return _CLASS_LUT[np.asarray(tags, dtype=np.uint8)]
+
+
+def extract_blobs(labels, min_size=8, open_mask=True):
+    """
+    Blobs of all vehicle classes in one connected-components pass.
+    Pixels next to a vehicle of another class are cleared first, so touching
+    blobs of different classes stay separate components. Blobs narrower or
+    lower than min_size pixels are dropped.
+    Returns (boxes (N, 4) as x1, y1, x2, y2, class ids (N,), areas (N,)).
+    """
+    classes = class_id_map(labels)
+    mask = (classes > 0).view(np.uint8)
+    if open_mask:
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, _KERNEL)
+
+    # Only the region that holds vehicle pixels is labelled
+    x0, y0, width, height = cv2.boundingRect(mask)
+    if not width:
+        return np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int32)
+    mask = mask[y0:y0 + height, x0:x0 + width]
+    classes = classes[y0:y0 + height, x0:x0 + width]
+
+    # Highest and lowest vehicle class in each 3x3 neighbourhood (background wraps to 255)
+    highest = cv2.dilate(classes, _KERNEL)
+    lowest = cv2.erode(classes - np.uint8(1), _KERNEL)
+    mask &= (cv2.subtract(highest, 1) == lowest).view(np.uint8)
+
+    count, components, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+        mask, 8, cv2.CV_32S, cv2.CCL_GRANA)
+    component_class = np.zeros(count, dtype=np.uint8)
+    on = mask > 0
+    component_class[components[on]] = classes[on]
+
+    stats = stats[1:]
+    keep = (stats[:, cv2.CC_STAT_WIDTH] >= min_size) & (stats[:, cv2.CC_STAT_HEIGHT] >= min_size)
+    stats = stats[keep]
+    x, y = stats[:, cv2.CC_STAT_LEFT] + x0, stats[:, cv2.CC_STAT_TOP] + y0
+    boxes = np.stack([x, y, x + stats[:, cv2.CC_STAT_WIDTH], y + stats[:, cv2.CC_STAT_HEIGHT]], axis=1)
+    return boxes, component_class[1:][keep], stats[:, cv2.CC_STAT_AREA]
+
+
+def extract_instance_blobs(labels, instances, min_size=8):
+    """
+    Vehicle blobs of an instance segmentation frame, one per actor id.
+    Vehicles that touch stay apart because every pixel carries its actor id;
+    boxes, areas and classes are reduced per id without any labelling pass.
+    Returns (boxes (N, 4) as x1, y1, x2, y2, class ids (N,), areas (N,), actor ids (N,)).
+    """
+    classes = class_id_map(labels)
+    ys, xs = np.nonzero(classes)
+    ids = instances[ys, xs]
+    order = np.argsort(ids, kind="stable")
+    ids, xs, ys = ids[order], xs[order], ys[order]
+    if not len(ids):
+        return (np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.uint8),
+                np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    boxes = np.stack([np.minimum.reduceat(xs, starts), np.minimum.reduceat(ys, starts),
+                      np.maximum.reduceat(xs, starts) + 1, np.maximum.reduceat(ys, starts) + 1], axis=1)
+    areas = np.diff(np.append(starts, len(ids)))
+    class_ids = classes[ys[starts], xs[starts]]
+
+    keep = (boxes[:, 2] - boxes[:, 0] >= min_size) & (boxes[:, 3] - boxes[:, 1] >= min_size)
+    return boxes[keep], class_ids[keep], areas[keep], ids[starts][keep].astype(np.int32)
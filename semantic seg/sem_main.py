@@ -1,47 +1,172 @@
 # sem_main.py
 import argparse
+import os
 import sys
 import signal
 import time
 import pygame
 
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "--fake-carla" in sys.argv:  # offline runs without a simulator; installed before carla is imported
+    import fake_carla
+    fake_carla.install()
+
+from startup import StartupOrchestrator, StartupTimeline
+from world_state import WorldStateCache
+from rpc_stats import RPCStats
+from traffic import TrafficConfig, TrafficBudgetManager
+from collection import CollectionBudget, enable_ego_autopilot
 from sem_connection import ConnectionManager
 from sem_spawn import SpawnManager
 from sem_sensors import SensorHandler
 from sem_control import ControlManager
 from sem_display import DisplayManager
+from sem_detect import DETECTION_DTYPE, SemanticDetector
+from sem_track import Sort
+from sem_pipeline import DetectionStage
+from sem_groundtruth import GroundTruthGenerator, GroundTruthStage
+from sem_bev import BEVGrid, OCCUPANCY_CHANNELS, VELOCITY_CHANNELS
 from sem_cleanup import CleanupManager
-from sem_record import DatasetRecorder  # optional for recording
+from sem_record import DatasetRecorder, ControlLogRecorder, DetectionLogRecorder, BEVRecorder  # optional for recording
+from sem_episode import EpisodeManager
+from sem_tick import TickPipeline
+from sem_weather import WeatherScheduler, load_ranges
+from scenario import ScenarioSnapshot
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", default="localhost")
     parser.add_argument("--port", type=int, default=2000)
     parser.add_argument("--episodes", type=int, default=1)
+    parser.add_argument("--episode-frames", type=int, default=0,
+                        help="Ticks per episode before resetting (0 = until the window is closed)")
     parser.add_argument("--vehicles", type=int, default=50)
     parser.add_argument("--record", action="store_true", help="Enable dataset recording")
+    parser.add_argument("--log-only", metavar="LOG_NAME", default=None,
+                        help="Record a server-side CARLA log plus the ego control stream instead of frames "
+                             "(regenerate frames later with sem_regenerate.py)")
+    parser.add_argument("--rpc-report", action="store_true", help="Print per-call-site simulator RPC statistics on exit")
+    parser.add_argument("--force-reload", action="store_true", help="Reload Town04 even if the server is already running it")
+    parser.add_argument("--clear-actors", action="store_true", help="Destroy leftover actors when reusing the running world")
+    parser.add_argument("--tm-port", type=int, default=8000, help="Traffic manager port")
+    parser.add_argument("--seed", type=int, default=0, help="Traffic manager / behavior seed")
+    parser.add_argument("--high-density", action="store_true",
+                        help="Hybrid physics around the ego for large NPC counts")
+    parser.add_argument("--hybrid-radius", type=float, default=70.0, help="Full-physics radius around the ego (m)")
+    parser.add_argument("--speed-offset", default="0,0", metavar="LOW,HIGH",
+                        help="Range of the per-NPC percentage below the speed limit, drawn per vehicle")
+    parser.add_argument("--lane-change-probability", type=float, default=1.0,
+                        help="Fraction of NPCs allowed to change lanes on their own")
+    parser.add_argument("--npc-budget", type=int, default=0,
+                        help="Keep this many NPCs near the ego by recycling far ones (0 = off)")
+    parser.add_argument("--npc-radius", type=float, default=60.0, help="Radius around the ego for --npc-budget (m)")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="Unattended collection: the ego drives via the traffic manager, no frame pacing")
+    parser.add_argument("--headless", action="store_true",
+                        help="No pygame/OpenCV windows (unattended workers, nodes without a display); needs --autopilot")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Simulate tick N+1 while tick N is processed (controls then act one tick later)")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="Strict lockstep ticking for reproducible runs (overrides --pipeline)")
+    parser.add_argument("--max-frames", type=int, default=0, help="Stop after this many ticks (0 = no limit)")
+    parser.add_argument("--max-sim-seconds", type=float, default=0.0,
+                        help="Stop after this much simulated time (0 = no limit)")
+    parser.add_argument("--max-wall-seconds", type=float, default=0.0,
+                        help="Stop after this much wall-clock time (0 = no limit)")
+    parser.add_argument("--randomize-weather", action="store_true",
+                        help="Sample weather and sun position per episode (low-discrepancy coverage)")
+    parser.add_argument("--weather-sampler", choices=["lhs", "halton", "random"], default="lhs",
+                        help="Design of the weather samples (lhs: one stratum per episode per parameter)")
+    parser.add_argument("--weather-ranges", default=None,
+                        help='JSON file of {"field": [low, high(, power)]} merged over the default ranges '
+                             '(null: keep the field at the world\'s current value)')
+    parser.add_argument("--instance-camera", action="store_true",
+                        help="Use the instance segmentation camera: actor ids come from the image, no projection matching")
+    parser.add_argument("--roi", default=None, metavar="X,Y,W,H",
+                        help="Only search this pixel region of the semantic frame for vehicles")
+    parser.add_argument("--detect-scale", type=int, default=1,
+                        help="Subsample the semantic frame by this factor before detection (boxes stay full-res)")
+    parser.add_argument("--profile-scales", default=None, metavar="S1,S2,...",
+                        help="On exit, time detection of the last frame at each of these scales")
+    parser.add_argument("--bev", action="store_true",
+                        help="Build an ego-centric occupancy + velocity grid per frame from the semantic camera "
+                             "(--record stores it in bev.hdf5); not available with --ground-truth")
+    parser.add_argument("--bev-cell", type=float, default=0.5, help="BEV cell size (m)")
+    parser.add_argument("--bev-size", type=int, default=128, help="BEV grid rows and columns")
+    parser.add_argument("--ground-truth", action="store_true",
+                        help="Boxes from actor bounding boxes through a virtual camera: no camera sensor, "
+                             "server in no-rendering mode (--record then stores the boxes)")
+    parser.add_argument("--occlusion-scale", type=int, default=4,
+                        help="Downscale of the --ground-truth occlusion raster (0 = no occlusion test)")
+    parser.add_argument("--out", default="sem_dataset", help="Output folder for recorded data")
+    parser.add_argument("--stats-file", default=None,
+                        help="Periodically write collection counters as JSON (heartbeat for sem_orchestrate.py)")
+    parser.add_argument("--stats-interval", type=float, default=5.0,
+                        help="Seconds between --stats-file writes")
+    parser.add_argument("--save-scenario", default=None, help="Write the spawned scenario to this file")
+    parser.add_argument("--load-scenario", default=None, help="Restore a saved scenario instead of spawning")
+    parser.add_argument("--fake-carla", action="store_true",
+                        help="Run against the in-process fake simulator (fake_carla.py) instead of a CARLA server")
     args = parser.parse_args()
+    if args.headless and not args.autopilot:
+        parser.error("--headless needs --autopilot (there is no window for keyboard control)")
+    if args.bev and args.ground_truth:
+        parser.error("--bev needs the semantic camera, which --ground-truth does not spawn")
 
+    timeline = StartupTimeline()
+    sensors = SensorHandler(instance_camera=args.instance_camera)
+    controls = ControlManager()
+    # Detection + tracking once per sensor frame, shared by display and recorder
+    roi = tuple(int(v) for v in args.roi.split(",")) if args.roi else None
+    detector = SemanticDetector(None, None, None, roi=roi, scale=args.detect_scale)
+    tracker = Sort(max_age=5, min_hits=1, iou_threshold=0.3)
+    if args.ground_truth:
+        stage = GroundTruthStage(GroundTruthGenerator(detector, occlusion_scale=args.occlusion_scale), tracker)
+    else:
+        stage = DetectionStage(sensors, detector, tracker)
+
+    # Load the world in the background while the windows are created
     print("[INFO] Connecting to CARLA...")
-    conn = ConnectionManager(args.host, args.port)
-    if not conn.connect():
-        print("❌ Could not connect")
-        return
+    rpc = RPCStats()
+    conn = ConnectionManager(args.host, args.port, rpc_stats=rpc,
+                             force_reload=args.force_reload, clear_actors=args.clear_actors,
+                             no_rendering=args.ground_truth)
+    results = StartupOrchestrator(timeline).run(
+        background={"connect + load world": conn.connect},
+        foreground={"display": lambda: DisplayManager(None, None, sensors, stage=stage, headless=args.headless)})
+    display = results["display"]
+    failed = [name for name, result in results.items() if result is None or result is False]
+    if failed:
+        print(f"❌ Startup failed in phase: {', '.join(failed)}")
+        conn.disconnect()  # the world may already be in synchronous mode
+        sys.exit(1)
     print("[INFO] Connected to CARLA")
 
-    spawner = SpawnManager(conn.world, conn.client, max_npc_speed=30.0)
-    sensors = SensorHandler()
-    controls = ControlManager()
-    display = DisplayManager(conn.world, spawner.vehicle, sensors)
+    with timeline.phase("traffic manager"):
+        traffic_config = TrafficConfig(tm_port=args.tm_port, seed=args.seed, synchronous=True,
+                                       hybrid_physics=args.high_density, hybrid_radius=args.hybrid_radius,
+                                       speed_offset=tuple(float(v) for v in args.speed_offset.split(",")),
+                                       lane_change_probability=args.lane_change_probability)
+        spawner = SpawnManager(conn.world, conn.client, max_npc_speed=30.0, catalog=conn.catalog,
+                               traffic_config=traffic_config)
+
+    ticker = None
 
     def cleanup_all():
+        if ticker:
+            ticker.close()
+        if args.rpc_report:
+            rpc.report()
         cleaner = CleanupManager(
             conn.world,
+            conn.client,
             vehicle=spawner.vehicle,
             semantic_camera=spawner.semantic_camera,
             vehicles=spawner.vehicles,
-            sensors=[sensors.semantic_image],
-            original_settings=conn.original_settings
+            original_settings=conn.original_settings,
+            traffic_manager=spawner.tm
         )
         cleaner.cleanup()
         sys.exit(0)
@@ -49,45 +174,159 @@ def main():
     signal.signal(signal.SIGINT, lambda s, f: cleanup_all())
     signal.signal(signal.SIGTERM, lambda s, f: cleanup_all())
 
+    # Actors are spawned once; later episodes reuse them (EpisodeManager.reset)
+    with timeline.phase("spawn"):
+        if args.load_scenario:
+            spawned = spawner.restore_scenario(ScenarioSnapshot.load(args.load_scenario))
+        else:
+            spawned = spawner.spawn_vehicle_and_camera(npc_vehicles=args.vehicles)
+    if not spawned:
+        print("❌ Vehicle or NPC spawn failed")
+        cleanup_all()
+    print("✅ Vehicle and NPCs spawned")
+    if args.save_scenario:
+        spawner.capture_scenario().save(args.save_scenario)
+        print(f"💾 Scenario saved to {args.save_scenario}")
+
+    if args.autopilot:
+        # Recorded controls are then the ones the TM applied (read back via get_control)
+        enable_ego_autopilot(spawner.vehicle, spawner.tm)
+        display.max_fps = 0
+        print("🤖 Ego on autopilot, frame pacing off")
+
+    state = WorldStateCache(conn.world)
+    display.attach(conn.world, spawner.vehicle, state)
+    if args.ground_truth:
+        print("📐 Ground-truth boxes from actor bounding boxes, no camera")
+    else:
+        with timeline.phase("semantic camera"):
+            spawner.semantic_camera = spawner.setup_semantic_camera(spawner.vehicle, sensors.on_semantic_image,
+                                                                    instance=args.instance_camera)
+        if not args.instance_camera:
+            stage.detector.bind_camera(spawner.semantic_camera)  # detections are matched to projected actors
+        print("📷 Semantic camera ready")
+        if args.bev:
+            attributes = spawner.semantic_camera.attributes
+            stage.bev = BEVGrid((int(attributes["image_size_x"]), int(attributes["image_size_y"])),
+                                float(attributes["fov"]), cell_size=args.bev_cell,
+                                grid_size=(args.bev_size, args.bev_size),
+                                dt=conn.world.get_settings().fixed_delta_seconds)
+    conn.catalog.report()
+
+    recorder = DatasetRecorder(folder=args.out, img_height=600, img_width=800) \
+                   if args.record and not args.log_only and not args.ground_truth else None
+    box_log = DetectionLogRecorder(folder=args.out, dtype=DETECTION_DTYPE) \
+                  if args.record and args.ground_truth else None
+    bev_log = BEVRecorder(folder=args.out, channels=OCCUPANCY_CHANNELS, velocity_channels=VELOCITY_CHANNELS,
+                          grid_size=(args.bev_size, args.bev_size), cell_size=args.bev_cell) \
+                  if args.record and stage.bev is not None else None
+
+    control_log = None
+    if args.log_only:
+        print(conn.client.start_recorder(args.log_only, True))
+        control_log = ControlLogRecorder(folder=args.out, carla_log=args.log_only,
+                                         fixed_delta_seconds=conn.world.get_settings().fixed_delta_seconds)
+
+    budget = TrafficBudgetManager(conn.client, conn.catalog.spawn_points, budget=args.npc_budget,
+                                  radius=args.npc_radius, seed=args.seed) if args.npc_budget > 0 else None
+
+    weather = WeatherScheduler(load_ranges(args.weather_ranges) if args.weather_ranges else None,
+                               seed=args.seed, episodes=args.episodes, sampler=args.weather_sampler) \
+                  if args.randomize_weather else None
+    episodes = EpisodeManager(conn.client, conn.world, spawner, sensors, conn.catalog, seed=args.seed,
+                              display=display, recorder=recorder, rpc_stats=rpc, weather=weather)
+    episodes.start()
+
+    collection = CollectionBudget(args.max_frames, args.max_sim_seconds, args.max_wall_seconds)
+    # Each tick hands over the snapshot and semantic frame of that frame id
+    ticker = TickPipeline(conn.world, sensors, lockstep=args.deterministic or not args.pipeline,
+                          wait_for_sensor=not args.ground_truth)
+
+    running = True
     for ep in range(args.episodes):
         print(f"[INFO] Starting episode {ep+1}/{args.episodes}")
+        if ep > 0:
+            ticker.drain()
+            episodes.reset(ep)
 
-        if not spawner.spawn_vehicle_and_camera(npc_vehicles=args.vehicles):
-            print("❌ Vehicle or NPC spawn failed")
-            break
-        print("✅ Vehicle and NPCs spawned")
+        frames = 0
+        while running:
+            _, snapshot, semantic = ticker.tick()
+            state.update(snapshot)
+            if budget:
+                budget.update(state, spawner.vehicle)
 
-    spawner.semantic_camera = spawner.setup_semantic_camera(spawner.vehicle, sensors.on_semantic_image)
-    print("📷 Semantic camera ready")
+            # Controls
+            if not args.headless:
+                running = controls.handle_events(spawner)
+            if not args.autopilot:
+                controls.process_keyboard(spawner.vehicle, state)
 
-    recorder = DatasetRecorder(folder="sem_dataset", img_height=600, img_width=800) \
-                   if args.record else None
+            # Spectator update
+            display.update_spectator(spawner.vehicle, conn.spectator)
 
-    running = True
-    while running:
-        conn.world.tick()
+            if control_log:
+                ctrl = state.control(spawner.vehicle)
+                control_log.record(state.frame, state.timestamp.elapsed_seconds, state.speed(spawner.vehicle),
+                                   ctrl.steer, ctrl.throttle, ctrl.brake)
 
-        # Controls
-        running = controls.handle_events(spawner)
-        controls.process_keyboard(spawner.vehicle)
+            # Draw semantic + bounding boxes (detection handled internally)
+            running, bbox_counts = display.draw_with_detection(recorder, semantic)
+            if box_log and stage.fresh:
+                box_log.record(stage.result.detections)
+            if bev_log and stage.fresh:
+                bev_log.record(stage.result.frame, stage.result.bev)
+            rpc.tick()
+            running = collection.step(state) and running
 
-        # Spectator update
-        display.update_spectator(spawner.vehicle, conn.spectator)
+            if stage.result.frame is not None and timeline.mark_first_frame():
+                timeline.report()
 
-        # Draw semantic + bounding boxes (detection handled internally)
-        running, bbox_counts = display.draw_with_detection(recorder)
+            frames += 1
+            if args.stats_file:
+                collection.write_stats_every(args.stats_file, args.stats_interval, episode=episodes.episode,
+                                             done=False)
+            if args.episode_frames and frames >= args.episode_frames:
+                break
+        if not running:
+            break
 
+    ticker.close()
     if recorder:
         recorder.close()
+    if box_log:
+        box_log.close()
+    if bev_log:
+        bev_log.close()
+    if control_log:
+        conn.client.stop_recorder()
+        control_log.close()
+
+    if args.rpc_report:
+        rpc.report()
+    if budget:
+        budget.report()
+    episodes.report()
+    ticker.report()
+    stage.report()
+    if args.profile_scales and sensors.semantic:
+        _, labels, instances = sensors.semantic
+        stage.detector.report_scales(labels, [int(v) for v in args.profile_scales.split(",")], instances)
+    if weather:
+        weather.report()
+    collection.report()
+    if args.stats_file:
+        collection.write_stats(args.stats_file, episode=episodes.episode, done=True)
 
     # Cleanup after episode
     cleaner = CleanupManager(
         conn.world,
+        conn.client,
         vehicle=spawner.vehicle,
         semantic_camera=spawner.semantic_camera,
         vehicles=spawner.vehicles,
-        sensors=[sensors.semantic_image],
-        original_settings=conn.original_settings
+        original_settings=conn.original_settings,
+        traffic_manager=spawner.tm
     )
     cleaner.cleanup()
     time.sleep(1)
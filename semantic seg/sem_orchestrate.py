@@ -0,0 +1,282 @@
+# sem_orchestrate.py
+"""
+Run several collection workers (sem_main.py) side by side, one per CARLA
+server. Every worker gets its own CARLA port, traffic manager port, seed and
+output shard. Workers are watched through the stats file they write
+(sem_main.py --stats-file, rewritten every --stats-interval seconds): a worker
+that exits with an error or stops updating it is restarted, up to
+--max-restarts times. Throughput and frame counts are aggregated over all
+workers.
+
+sem_main.py workers run --headless (no windows) unless --show-windows is
+given. The worker command is configurable (--worker), so the orchestrator
+can be exercised against a local stand-in instead of real CARLA servers.
+"""
+import argparse
+import json
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class WorkerSpec:
+    def __init__(self, index, port, tm_port, seed, shard):
+        self.index = index
+        self.port = port
+        self.tm_port = tm_port
+        self.seed = seed
+        self.shard = shard  # output folder of this worker
+
+
+class CollectionWorker:
+    """One collection process (and optionally the CARLA server it drives)."""
+
+    def __init__(self, spec, worker_cmd, worker_args=(), server_cmd=None):
+        """
+        spec: WorkerSpec with ports, seed and shard
+        worker_cmd: Command list of the collection script (ports/seed/output are appended)
+        worker_args: Extra arguments passed through to every worker
+        server_cmd: Optional server command template, formatted with {port} (e.g. "CarlaUE4.sh -carla-rpc-port={port}")
+        """
+        self.spec = spec
+        self.worker_cmd = list(worker_cmd)
+        self.worker_args = list(worker_args)
+        self.server_cmd = server_cmd
+        self.process = None
+        self.server = None
+        self.log = None
+        self.attempt = 0
+        self.restarts = 0
+        self.started = None
+        self.finished = False
+        self.failed = False
+        self.completed = []  # stats of finished/failed attempts
+        self.closed_attempt = 0
+
+    @property
+    def attempt_dir(self):
+        return os.path.join(self.spec.shard, f"attempt_{self.attempt}")
+
+    @property
+    def stats_path(self):
+        return os.path.join(self.attempt_dir, "stats.json")
+
+    def command(self):
+        return self.worker_cmd + [
+            "--port", str(self.spec.port),
+            "--tm-port", str(self.spec.tm_port),
+            "--seed", str(self.spec.seed),
+            "--out", self.attempt_dir,
+            "--stats-file", self.stats_path,
+        ] + self.worker_args
+
+    def start(self):
+        self.attempt += 1
+        os.makedirs(self.attempt_dir, exist_ok=True)
+        if self.server_cmd and (self.server is None or self.server.poll() is not None):
+            self.server = subprocess.Popen(shlex.split(self.server_cmd.format(port=self.spec.port)),
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.log = open(os.path.join(self.attempt_dir, "worker.log"), "w")
+        self.process = subprocess.Popen(self.command(), stdout=self.log, stderr=subprocess.STDOUT,
+                                        cwd=HERE)
+        self.started = time.time()
+        print(f"[Orchestrator] Worker {self.spec.index} started (attempt {self.attempt}, "
+              f"port {self.spec.port}, TM {self.spec.tm_port}, seed {self.spec.seed}, pid {self.process.pid})")
+
+    def stats(self):
+        try:
+            with open(self.stats_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def heartbeat_age(self):
+        """Seconds since the worker last wrote its stats (or since it started)."""
+        stats = self.stats()
+        last = stats["time"] if stats else self.started
+        return time.time() - last
+
+    def stop(self, timeout=10.0):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.close_attempt()
+
+    def stop_server(self):
+        if self.server and self.server.poll() is None:
+            self.server.terminate()
+            try:
+                self.server.wait(10.0)
+            except subprocess.TimeoutExpired:
+                self.server.kill()
+        self.server = None
+
+    def close_attempt(self):
+        if self.closed_attempt == self.attempt:
+            return
+        self.closed_attempt = self.attempt
+        if self.log:
+            self.log.close()
+            self.log = None
+        stats = self.stats()
+        if stats:
+            self.completed.append(stats)
+
+    def totals(self):
+        """Frames / simulated / wall seconds over all attempts, including the running one."""
+        runs = list(self.completed)
+        if self.process and self.process.poll() is None:
+            stats = self.stats()
+            if stats:
+                runs.append(stats)
+        return (sum(r["frames"] for r in runs),
+                sum(r["sim_seconds"] for r in runs),
+                sum(r["wall_seconds"] for r in runs))
+
+
+class Orchestrator:
+    def __init__(self, workers, max_restarts=3, heartbeat_timeout=120.0, poll_interval=2.0,
+                 report_interval=30.0):
+        """
+        workers: CollectionWorker list
+        max_restarts: Restarts per worker before it is given up
+        heartbeat_timeout: Restart a worker whose stats file is older than this (s)
+        """
+        self.workers = workers
+        self.max_restarts = max_restarts
+        self.heartbeat_timeout = heartbeat_timeout
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.start_time = None
+
+    def _restart(self, worker, reason):
+        worker.stop()
+        if worker.restarts >= self.max_restarts:
+            worker.failed = True
+            print(f"❌ [Orchestrator] Worker {worker.spec.index} {reason}, giving up after "
+                  f"{worker.restarts} restarts")
+            worker.stop_server()
+            return
+        worker.restarts += 1
+        print(f"🔁 [Orchestrator] Worker {worker.spec.index} {reason}, restarting "
+              f"({worker.restarts}/{self.max_restarts})")
+        if worker.server_cmd:
+            worker.stop_server()  # a hung worker usually means a hung server
+        worker.start()
+
+    def check(self, worker):
+        if worker.finished or worker.failed:
+            return
+        code = worker.process.poll()
+        if code is None:
+            if worker.heartbeat_age() > self.heartbeat_timeout:
+                self._restart(worker, f"sent no heartbeat for {self.heartbeat_timeout:.0f}s")
+            return
+        stats = worker.stats()
+        if code == 0 and stats and stats.get("done"):
+            worker.close_attempt()
+            worker.finished = True
+            worker.stop_server()
+            print(f"✅ [Orchestrator] Worker {worker.spec.index} finished: {stats['frames']} frames")
+        else:
+            self._restart(worker, f"exited with code {code}")
+
+    def run(self):
+        self.start_time = time.time()
+        for worker in self.workers:
+            worker.start()
+        last_report = time.time()
+        try:
+            while not all(w.finished or w.failed for w in self.workers):
+                time.sleep(self.poll_interval)
+                for worker in self.workers:
+                    self.check(worker)
+                if time.time() - last_report >= self.report_interval:
+                    self.report()
+                    last_report = time.time()
+        except KeyboardInterrupt:
+            print("\n🛑 [Orchestrator] Stopping workers")
+        finally:
+            for worker in self.workers:
+                worker.stop()
+                worker.stop_server()
+        self.report()
+        return all(w.finished for w in self.workers)
+
+    def report(self):
+        elapsed = time.time() - self.start_time
+        print(f"\n📊 Collection after {elapsed:.0f}s:")
+        total_frames = 0
+        total_sim = 0.0
+        for w in self.workers:
+            frames, sim, wall = w.totals()
+            total_frames += frames
+            total_sim += sim
+            status = "done" if w.finished else "FAILED" if w.failed else "running"
+            print(f"   worker {w.spec.index} :{w.spec.port} TM:{w.spec.tm_port} {status:<7} "
+                  f"{frames:7d} frames, {sim / max(wall, 1e-6):5.2f} sim-s/wall-s, "
+                  f"{w.restarts} restarts")
+        print(f"   Total: {total_frames} frames, {total_frames / max(elapsed, 1e-6):.1f} frames/s, "
+              f"{total_sim / max(elapsed, 1e-6):.2f} sim-s per wall-s")
+
+
+def build_workers(args, worker_args):
+    worker_cmd = shlex.split(args.worker) if args.worker else \
+        [sys.executable, os.path.join(HERE, "sem_main.py")] + ([] if args.show_windows else ["--headless"])
+    workers = []
+    for i in range(args.workers):
+        spec = WorkerSpec(index=i,
+                          port=args.base_port + i * args.port_stride,
+                          tm_port=args.base_tm_port + i,
+                          seed=args.seed + i,
+                          shard=os.path.join(os.path.abspath(args.out), f"worker_{i:02d}"))
+        workers.append(CollectionWorker(spec, worker_cmd, worker_args, server_cmd=args.server_cmd))
+    return workers
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run collection workers against several CARLA servers",
+                                     epilog="Arguments after -- are passed to every worker, "
+                                            "e.g. -- --autopilot --record --max-frames 2000")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--base-port", type=int, default=2000, help="CARLA port of worker 0")
+    parser.add_argument("--port-stride", type=int, default=10,
+                        help="Port distance between servers (CARLA also uses port+1, port+2)")
+    parser.add_argument("--base-tm-port", type=int, default=8000, help="Traffic manager port of worker 0")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of worker 0 (worker i gets seed+i)")
+    parser.add_argument("--out", default="sem_shards", help="Output root; worker i writes to worker_ii/")
+    parser.add_argument("--worker", default=None,
+                        help="Worker command (default: sem_main.py with this interpreter)")
+    parser.add_argument("--server-cmd", default=None,
+                        help="Launch a server per worker, e.g. 'CarlaUE4.sh -RenderOffScreen -carla-rpc-port={port}'")
+    parser.add_argument("--show-windows", action="store_true",
+                        help="Let sem_main.py workers open their windows (default: --headless)")
+    parser.add_argument("--max-restarts", type=int, default=3)
+    parser.add_argument("--heartbeat-timeout", type=float, default=120.0)
+    parser.add_argument("--report-interval", type=float, default=30.0)
+    args, worker_args = parser.parse_known_args()
+    if worker_args and worker_args[0] == "--":
+        worker_args = worker_args[1:]
+
+    orchestrator = Orchestrator(build_workers(args, worker_args), max_restarts=args.max_restarts,
+                                heartbeat_timeout=args.heartbeat_timeout,
+                                report_interval=args.report_interval)
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    sys.exit(0 if orchestrator.run() else 1)
+
+
+if __name__ == "__main__":
+    main()
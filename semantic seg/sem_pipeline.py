@@ -0,0 +1,108 @@
+# sem_pipeline.py
+"""
+Per-frame detection stage shared by display, tracker, recorder and analysis.
+Detection and tracking run once per sensor frame (keyed by frame id); asking
+again before a new frame has arrived returns the cached result untouched.
+"""
+import time
+import numpy as np
+from sem_detect import DETECTION_DTYPE
+from sem_labels import CLASS_NAMES, labels_to_palette
+from sem_track import Sort, Track
+
+
+class FrameResult:
+    """Detections and tracks of one sensor frame."""
+
+    def __init__(self, frame, labels, detections, tracks, bev=None):
+        self.frame = frame
+        self.labels = labels
+        self.detections = detections  # DETECTION_DTYPE array
+        self.tracks = tracks  # Sort output: [x1, y1, x2, y2, id, class name, heading]
+        self.bev = bev  # BEVGrid output (channels, rows, cols), if the stage builds one
+        self._palette = None
+
+    @property
+    def palette(self):
+        """CityScapes-palette RGB image of the frame (built once, on first use)."""
+        if self._palette is None:
+            self._palette = labels_to_palette(self.labels)
+        return self._palette
+
+    def counts(self):
+        """Detections per class name."""
+        per_class = np.bincount(self.detections["class_id"], minlength=len(CLASS_NAMES))
+        return {name: int(n) for name, n in zip(CLASS_NAMES[1:], per_class[1:])}
+
+
+EMPTY = FrameResult(None, None, np.zeros(0, dtype=DETECTION_DTYPE), [])
+
+
+class DetectionStage:
+    name = "Detection stage"
+
+    def __init__(self, sensors, detector, tracker=None, bev=None):
+        """
+        sensors: SensorHandler providing the latest (frame id, tag map, actor id map)
+        detector: SemanticDetector turning a tag map into detections
+        tracker: Optional Sort tracker, updated once per new frame
+        bev: Optional BEVGrid, built from the tag map and tracks once per new frame
+        """
+        self.sensors = sensors
+        self.detector = detector
+        self.tracker = tracker
+        self.bev = bev
+        self.result = EMPTY
+        self.fresh = False  # True if the last update() processed a new frame
+
+        # Statistics
+        self.processed = 0
+        self.skipped = 0
+        self.process_time = 0.0
+
+    def update(self, semantic=None):
+        """
+        Process a sensor frame if it is new. Returns its FrameResult.
+        semantic: (frame id, tag map, actor id map) handed over for this tick
+        (SensorHandler.wait_for_frame); default: the latest frame
+        """
+        latest = semantic if semantic is not None else self.sensors.semantic
+        if latest is None or latest[0] == self.result.frame:
+            self.fresh = False
+            self.skipped += 1
+            return self.result
+        frame, labels, instances = latest
+
+        start = time.perf_counter()
+        detections = self.detector.detect(labels, frame, instances)
+        tracks = self.track(detections)
+        bev = self.bev.build(labels, tracks) if self.bev is not None else None
+        self.result = FrameResult(frame, labels, detections, tracks, bev)
+        self.fresh = True
+        self.processed += 1
+        self.process_time += time.perf_counter() - start
+        return self.result
+
+    def track(self, detections):
+        """Sort tracks of a DETECTION_DTYPE array ([] without a tracker)."""
+        if self.tracker is None:
+            return []
+        return self.tracker.update([[x1, y1, x2, y2, CLASS_NAMES[class_id]] for x1, y1, x2, y2, class_id
+                                    in zip(detections["x1"].tolist(), detections["y1"].tolist(),
+                                           detections["x2"].tolist(), detections["y2"].tolist(),
+                                           detections["class_id"].tolist())])
+
+    def reset(self):
+        """Start from scratch (new episode): forget the last frame and restart tracking."""
+        self.result = EMPTY
+        self.fresh = False
+        if self.tracker is not None:
+            Track.reset_ids()
+            self.tracker = Sort(max_age=self.tracker.max_age, min_hits=self.tracker.min_hits,
+                                iou_threshold=self.tracker.iou_threshold)
+
+    def report(self):
+        if not self.processed:
+            return
+        print(f"🔎 {self.name}: {self.processed} frames processed "
+              f"({self.process_time / self.processed * 1000:.2f} ms avg), {self.skipped} repeated calls skipped")
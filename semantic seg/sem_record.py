@@ -6,25 +6,43 @@ import numpy as np
 import os
 
 class DatasetRecorder:
-    def __init__(self, folder="sem_dataset", img_height=240, img_width=320):
+    def __init__(self, folder="sem_dataset", img_height=240, img_width=320, verbose=True):
         os.makedirs(folder, exist_ok=True)
+        self.verbose = verbose
         filename = os.path.join(folder, "carla_dataset.hdf5")
         self.h5_file = h5py.File(filename, "w")
         self.img_height = img_height
         self.img_width = img_width
+        self.frame_count = 0  # frames in the current episode
+        self.total_frames = 0
+        self.episode_group = None
+
+        # Each episode gets its own group: episode_0000/observations/rgb, ...
+        self.new_episode(0)
+
+    def new_episode(self, index, metadata=None):
+        """Start writing to a fresh episode group; metadata is stored as group attributes."""
+        self.episode_group = self.h5_file.require_group(f"episode_{index:04d}")
+        self.set_metadata(metadata)
         self.frame_count = 0
 
-        self.rgb_ds = self.h5_file.create_dataset("observations/rgb",
+        img_height, img_width = self.img_height, self.img_width
+        self.rgb_ds = self.episode_group.create_dataset("observations/rgb",
             (0, img_height, img_width, 3), maxshape=(None, img_height, img_width, 3), dtype=np.uint8)
-        self.speed_ds = self.h5_file.create_dataset("observations/speed",
+        self.speed_ds = self.episode_group.create_dataset("observations/speed",
             (0, 1), maxshape=(None, 1), dtype=np.float32)
-        self.steer_ds = self.h5_file.create_dataset("actions/steer",
+        self.steer_ds = self.episode_group.create_dataset("actions/steer",
             (0, 1), maxshape=(None, 1), dtype=np.float32)
-        self.throttle_ds = self.h5_file.create_dataset("actions/throttle",
+        self.throttle_ds = self.episode_group.create_dataset("actions/throttle",
             (0, 1), maxshape=(None, 1), dtype=np.float32)
-        self.brake_ds = self.h5_file.create_dataset("actions/brake",
+        self.brake_ds = self.episode_group.create_dataset("actions/brake",
             (0, 1), maxshape=(None, 1), dtype=np.float32)
 
+    def set_metadata(self, metadata):
+        """Store metadata (e.g. weather) as attributes of the current episode group."""
+        for key, value in (metadata or {}).items():
+            self.episode_group.attrs[key] = value
+
     def record(self, img, speed, steer, throttle, brake):
         # Resize datasets dynamically
         for ds in [self.rgb_ds, self.speed_ds, self.steer_ds, self.throttle_ds, self.brake_ds]:
@@ -35,7 +53,146 @@ class DatasetRecorder:
         self.throttle_ds[self.frame_count] = [throttle]
         self.brake_ds[self.frame_count] = [brake]
         self.frame_count += 1
-        print(f"Recorded frame {self.frame_count}")
+        self.total_frames += 1
+        if self.verbose:
+            print(f"Recorded frame {self.frame_count}")
+
+    def close(self):
+        self.h5_file.close()
+
+
+class ControlLogRecorder:
+    """
+    Ego control stream stored next to a server-side CARLA recording, so a
+    collection run writes no pixels; frames are regenerated later with
+    sem_regenerate.py by replaying the log.
+    """
+    def __init__(self, folder="sem_dataset", carla_log="sem_run.log", fixed_delta_seconds=0.05,
+                 flush_every=500):
+        os.makedirs(folder, exist_ok=True)
+        self.filename = os.path.join(folder, "control_log.hdf5")
+        self.h5_file = h5py.File(self.filename, "w")
+        self.h5_file.attrs["carla_log"] = carla_log
+        self.h5_file.attrs["fixed_delta_seconds"] = fixed_delta_seconds
+        self.flush_every = flush_every
+        self.fields = {"frame": np.int64, "timestamp": np.float64, "speed": np.float32,
+                       "steer": np.float32, "throttle": np.float32, "brake": np.float32}
+        self.datasets = {name: self.h5_file.create_dataset(name, (0,), maxshape=(None,), dtype=dtype)
+                         for name, dtype in self.fields.items()}
+        self.buffer = {name: [] for name in self.fields}
+        self.frame_count = 0
+
+    def record(self, frame, timestamp, speed, steer, throttle, brake):
+        for name, value in zip(self.fields, (frame, timestamp, speed, steer, throttle, brake)):
+            self.buffer[name].append(value)
+        self.frame_count += 1
+        if len(self.buffer["frame"]) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        n = len(self.buffer["frame"])
+        if not n:
+            return
+        for name, ds in self.datasets.items():
+            start = ds.shape[0]
+            ds.resize((start + n,))
+            ds[start:] = np.asarray(self.buffer[name], dtype=self.fields[name])
+            self.buffer[name] = []
+        self.h5_file.flush()
+
+    def close(self):
+        self.flush()
+        self.h5_file.close()
+        print(f"Control log: {self.frame_count} frames → {self.filename}")
+
+
+class DetectionLogRecorder:
+    """
+    Per-frame boxes (DETECTION_DTYPE rows) appended to one HDF5 table, e.g. the
+    sensorless ground truth of sem_groundtruth.py.
+    """
+    def __init__(self, folder="sem_dataset", dtype=None, flush_every=500):
+        os.makedirs(folder, exist_ok=True)
+        self.filename = os.path.join(folder, "detections.hdf5")
+        self.h5_file = h5py.File(self.filename, "w")
+        self.dtype = dtype
+        self.flush_every = flush_every
+        self.dataset = self.h5_file.create_dataset("detections", (0,), maxshape=(None,), dtype=dtype)
+        self.buffer = []
+        self.frame_count = 0
+        self.row_count = 0
+
+    def record(self, detections):
+        self.buffer.append(detections)
+        self.frame_count += 1
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        rows = np.concatenate(self.buffer).astype(self.dtype)
+        start = self.dataset.shape[0]
+        self.dataset.resize((start + len(rows),))
+        self.dataset[start:] = rows
+        self.row_count += len(rows)
+        self.buffer = []
+        self.h5_file.flush()
+
+    def close(self):
+        self.flush()
+        self.h5_file.close()
+        print(f"Detection log: {self.row_count} boxes in {self.frame_count} frames → {self.filename}")
+
+
+class BEVRecorder:
+    """
+    Ego-centric BEV grids (sem_bev.py) as a compact dataset of their own:
+    occupancy fractions quantized to uint8, velocities as float16, both
+    chunked per frame and gzip-compressed.
+    """
+    def __init__(self, folder="sem_dataset", channels=(), velocity_channels=(), grid_size=(128, 128),
+                 cell_size=0.5, flush_every=100):
+        os.makedirs(folder, exist_ok=True)
+        self.filename = os.path.join(folder, "bev.hdf5")
+        self.h5_file = h5py.File(self.filename, "w")
+        self.h5_file.attrs["occupancy_channels"] = list(channels)
+        self.h5_file.attrs["velocity_channels"] = list(velocity_channels)
+        self.h5_file.attrs["cell_size"] = cell_size
+        self.n_occupancy = len(channels)
+        self.flush_every = flush_every
+        rows, cols = grid_size
+        self.frame_ds = self.h5_file.create_dataset("frame", (0,), maxshape=(None,), dtype=np.int64)
+        self.occupancy_ds = self.h5_file.create_dataset(
+            "occupancy", (0, len(channels), rows, cols), maxshape=(None, len(channels), rows, cols),
+            dtype=np.uint8, chunks=(1, len(channels), rows, cols), compression="gzip")
+        self.velocity_ds = self.h5_file.create_dataset(
+            "velocity", (0, len(velocity_channels), rows, cols), maxshape=(None, len(velocity_channels), rows, cols),
+            dtype=np.float16, chunks=(1, len(velocity_channels), rows, cols), compression="gzip")
+        self.buffer = []
+        self.frame_count = 0
+
+    def record(self, frame, grid):
+        self.buffer.append((frame, grid))
+        self.frame_count += 1
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        n = len(self.buffer)
+        if not n:
+            return
+        grids = np.stack([grid for _, grid in self.buffer])
+        start = self.frame_ds.shape[0]
+        for ds in (self.frame_ds, self.occupancy_ds, self.velocity_ds):
+            ds.resize((start + n, *ds.shape[1:]))
+        self.frame_ds[start:] = [frame for frame, _ in self.buffer]
+        self.occupancy_ds[start:] = np.round(grids[:, :self.n_occupancy] * 255).astype(np.uint8)
+        self.velocity_ds[start:] = grids[:, self.n_occupancy:].astype(np.float16)
+        self.buffer = []
+        self.h5_file.flush()
 
     def close(self):
+        self.flush()
         self.h5_file.close()
+        print(f"BEV grids: {self.frame_count} frames → {self.filename}")
@@ -0,0 +1,170 @@
+# sem_regenerate.py
+"""
+Regenerate sensor data offline from a server-side CARLA recording.
+Replays the log in synchronous mode, re-attaches a camera rig of any
+resolution/FOV/type to the ego ("hero") vehicle and writes frames plus the
+recorded ego controls. Segments of the log are spread over several servers.
+"""
+import argparse
+import os
+import queue
+import sys
+import time
+from multiprocessing import Pool
+
+import h5py
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if "--fake-carla" in sys.argv:  # replay a log recorded by the fake simulator
+    import fake_carla
+    fake_carla.install()
+import carla
+
+from sem_record import DatasetRecorder
+
+CAMERA_TYPES = {
+    "semantic": "sensor.camera.semantic_segmentation",
+    "rgb": "sensor.camera.rgb",
+}
+
+
+def load_control_log(path):
+    with h5py.File(path, "r") as f:
+        log = {name: f[name][:] for name in ("frame", "timestamp", "speed", "steer", "throttle", "brake")}
+        log["carla_log"] = f.attrs["carla_log"]
+        log["fixed_delta_seconds"] = float(f.attrs["fixed_delta_seconds"])
+    return log
+
+
+def image_to_array(image, camera):
+    if camera == "semantic":
+        image.convert(carla.ColorConverter.CityScapesPalette)
+    arr = np.frombuffer(image.raw_data, dtype=np.uint8).reshape((image.height, image.width, 4))
+    return arr[:, :, :3][:, :, ::-1]
+
+
+def find_hero(world):
+    for actor in world.get_actors().filter("vehicle.*"):
+        if actor.attributes.get("role_name") == "hero":
+            return actor
+    return None
+
+
+def regenerate_segment(client, world, log, segment, args):
+    """Replay frames [first, first + count) of the log and write them."""
+    index, first, count = segment
+    dt = log["fixed_delta_seconds"]
+    # Half a step early so the replay starts exactly on frame `first`
+    start = max(float(log["timestamp"][first] - log["timestamp"][0]) - dt / 2, 0.0)
+    client.replay_file(log["carla_log"], start, count * dt + dt / 2, 0, False)
+
+    # The replayer spawns the log's actors at the start pose; no settle tick,
+    # so the n-th tick below shows log frame first + n
+    hero = find_hero(world)
+    if hero is None:
+        raise RuntimeError("No hero vehicle found in the replay (was the ego spawned with role_name=hero?)")
+
+    bp = world.get_blueprint_library().find(CAMERA_TYPES[args.camera])
+    bp.set_attribute("image_size_x", str(args.width))
+    bp.set_attribute("image_size_y", str(args.height))
+    bp.set_attribute("fov", str(args.fov))
+    cam_tf = carla.Transform(carla.Location(z=args.z), carla.Rotation(pitch=args.pitch))
+    camera = world.spawn_actor(bp, cam_tf, attach_to=hero)
+    images = queue.Queue()
+    camera.listen(images.put)
+
+    recorder = DatasetRecorder(folder=os.path.join(args.out, f"segment_{index:03d}"),
+                               img_height=args.height, img_width=args.width, verbose=False)
+    frames = 0
+    try:
+        for i in range(first, first + count):
+            frame = world.tick()
+            image = images.get(timeout=5.0)
+            while image.frame < frame:
+                image = images.get(timeout=5.0)
+
+            # Controls of the same frame of the original run
+            recorder.record(image_to_array(image, args.camera), log["speed"][i],
+                            log["steer"][i], log["throttle"][i], log["brake"][i])
+            frames += 1
+    finally:
+        camera.stop()
+        camera.destroy()
+        recorder.close()
+        client.stop_replayer(False)
+    return frames
+
+
+def run_worker(job):
+    """One process per server: regenerate that server's segments in turn."""
+    port, segments, args = job
+    client = carla.Client(args.host, port)
+    client.set_timeout(30.0)
+    world = client.get_world()
+    log = load_control_log(args.controls)
+
+    original_settings = world.get_settings()
+    settings = world.get_settings()
+    settings.synchronous_mode = True
+    settings.fixed_delta_seconds = log["fixed_delta_seconds"]
+    world.apply_settings(settings)
+
+    results = []
+    try:
+        for segment in segments:
+            start_time = time.perf_counter()
+            frames = regenerate_segment(client, world, log, segment, args)
+            elapsed = time.perf_counter() - start_time
+            results.append((segment[0], port, frames, elapsed))
+            print(f"🎞️ Segment {segment[0]} on :{port}: {frames} frames in {elapsed:.1f}s "
+                  f"({frames / max(elapsed, 1e-6):.1f} fps)")
+    finally:
+        world.apply_settings(original_settings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate camera data from a CARLA recording")
+    parser.add_argument("--controls", default="sem_dataset/control_log.hdf5",
+                        help="Control log written by sem_main.py --log-only")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--ports", default="2000", help="Comma-separated CARLA ports, one worker each")
+    parser.add_argument("--segments", type=int, default=0, help="Number of replay segments (default: one per port)")
+    parser.add_argument("--camera", choices=sorted(CAMERA_TYPES), default="semantic")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--fov", type=float, default=90.0)
+    parser.add_argument("--z", type=float, default=50.0, help="Camera height above the ego (m)")
+    parser.add_argument("--pitch", type=float, default=-90.0)
+    parser.add_argument("--out", default="sem_regenerated")
+    parser.add_argument("--fake-carla", action="store_true",
+                        help="Replay against the in-process fake simulator (fake_carla.py)")
+    args = parser.parse_args()
+
+    log = load_control_log(args.controls)
+    n_frames = len(log["frame"])
+    duration = n_frames * log["fixed_delta_seconds"]
+    ports = [int(p) for p in args.ports.split(",")]
+    n_segments = args.segments if args.segments > 0 else len(ports)
+    # (index, first frame, frame count); the last segment takes the remainder
+    length = n_frames // n_segments
+    segments = [(i, i * length, length if i < n_segments - 1 else n_frames - i * length)
+                for i in range(n_segments)]
+    jobs = [(port, segments[i::len(ports)], args) for i, port in enumerate(ports)]
+
+    print(f"[INFO] {duration:.1f}s of log in {n_segments} segments on {len(ports)} servers")
+    start_time = time.perf_counter()
+    with Pool(len(jobs)) as pool:
+        results = [r for worker in pool.map(run_worker, jobs) for r in worker]
+    elapsed = time.perf_counter() - start_time
+
+    frames = sum(r[2] for r in results)
+    if frames != n_frames:
+        print(f"⚠️ Regenerated {frames} frames but the log has {n_frames}")
+    print(f"✅ Regenerated {frames} frames in {elapsed:.1f}s: {frames / max(elapsed, 1e-6):.1f} frames/s, "
+          f"{duration / max(elapsed, 1e-6):.2f} simulated s per wall s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,114 @@
+import threading
+import time
 import numpy as np
 import carla
+from sem_labels import decode_instances, decode_labels, labels_to_palette
 
 class SensorHandler:
-    def __init__(self):
-        self.semantic_image = None
+    def __init__(self, instance_camera=False):
+        self.instance_camera = instance_camera  # frames come from sensor.camera.instance_segmentation
+        self.semantic = None  # (frame id, tag map, actor id map or None) of the latest frame, replaced as one object
         self.imu_data = None  # Store latest IMU data
+        self.min_frame = 0  # frames older than this are dropped (see flush)
+        self._palette = (None, None)  # (labels, palette image) cache for semantic_image
+        self.buffer_frames = 2  # frames kept for wait_for_frame: the one being processed + the next
+        self._frames = {}  # frame id -> (frame id, tag map, actor id map)
+        self._arrived = threading.Condition()
+        self.failed_frame = -1  # newest frame whose decoding failed
+
+        # Handoff statistics (wait_for_frame)
+        self.handoffs = 0
+        self.stale = 0  # requested frame not delivered yet when asked
+        self.timeouts = 0
+        self.dropped = 0  # requested frame already superseded and out of the buffer
+        self.failed = 0  # requested frame could not be decoded
+        self.wait_time = 0.0
+
+    def flush(self, min_frame=0):
+        """Drop buffered data and ignore sensor frames older than min_frame."""
+        with self._arrived:
+            self.min_frame = min_frame
+            self.semantic = None
+            self._frames = {}
+            self.failed_frame = -1
+        self.imu_data = None
+
+    @property
+    def semantic_frame(self):
+        semantic = self.semantic
+        return semantic[0] if semantic else None
+
+    @property
+    def semantic_labels(self):
+        """CARLA tag per pixel (R channel of the raw image) of the latest frame."""
+        semantic = self.semantic
+        return semantic[1] if semantic else None
+
+    @property
+    def semantic_instances(self):
+        """Actor id per pixel of the latest frame (instance camera only)."""
+        semantic = self.semantic
+        return semantic[2] if semantic else None
+
+    @property
+    def semantic_image(self):
+        """CityScapes-palette RGB image of the latest labels, built on first use (display only)."""
+        labels = self.semantic_labels
+        if labels is None:
+            return None
+        if self._palette[0] is not labels:
+            self._palette = (labels, labels_to_palette(labels))
+        return self._palette[1]
 
     def on_semantic_image(self, image: carla.Image):
+        if image.frame < self.min_frame:
+            return
         try:
-            image.convert(carla.ColorConverter.CityScapesPalette)
-            arr = np.frombuffer(image.raw_data, dtype=np.uint8)
-            arr = arr.reshape((image.height, image.width, 4))[:, :, :3][:, :, ::-1]
-            self.semantic_image = arr.copy()
+            # No palette conversion on the sensor thread; only the tag channel is kept
+            instances = decode_instances(image) if self.instance_camera else None
+            semantic = (image.frame, decode_labels(image), instances)
         except Exception as e:
             print(f"⚠️ Sensor error: {e}")
-            self.semantic_image = None
+            with self._arrived:
+                self.semantic = None
+                self.failed_frame = max(self.failed_frame, image.frame)
+                self._arrived.notify_all()
+            return
+        with self._arrived:
+            if image.frame < self.min_frame:
+                return
+            self._frames[image.frame] = semantic
+            for frame in sorted(self._frames)[:-self.buffer_frames]:
+                del self._frames[frame]
+            self.semantic = semantic
+            self._arrived.notify_all()
+
+    def wait_for_frame(self, frame, timeout=2.0):
+        """
+        Block until the semantic frame `frame` (or a later one) has been decoded.
+        Returns the (frame id, tag map, actor id map) of exactly that frame while it
+        is still buffered, else the newest one; None on timeout or if that frame
+        failed to decode.
+        """
+        start = time.perf_counter()
+        with self._arrived:
+            self.handoffs += 1
+            arrived = lambda: (self.semantic is not None and self.semantic[0] >= frame) or \
+                self.failed_frame >= frame
+            if not arrived():
+                self.stale += 1
+                if not self._arrived.wait_for(arrived, timeout):
+                    self.timeouts += 1
+                    self.wait_time += time.perf_counter() - start
+                    return None
+            semantic = self._frames.get(frame)
+            if semantic is None and self.failed_frame == frame:
+                self.failed += 1
+            elif semantic is None:
+                self.dropped += 1
+                semantic = self.semantic
+        self.wait_time += time.perf_counter() - start
+        return semantic
 
     def on_imu(self, imu: carla.IMUMeasurement):
         try:
@@ -1,59 +1,102 @@
 import random
 import carla
+from carla_batch import BatchSpawner
+from world_catalog import WorldCatalog
+from traffic import TrafficConfig, configure_traffic_manager, sample_vehicle_behaviors, apply_vehicle_behaviors
+from scenario import ScenarioSnapshot
 
 class SpawnManager:
-    def __init__(self, world, client, max_npc_speed=20.0, tm_port=8000):
+    def __init__(self, world, client, max_npc_speed=20.0, tm_port=8000, catalog=None, traffic_config=None):
         """
         world: carla.World object
         client: carla.Client object
         max_npc_speed: Maximum NPC speed in km/h
-        tm_port: Traffic Manager port
+        tm_port: Traffic Manager port (ignored if traffic_config is given)
+        catalog: WorldCatalog with the map, spawn points and blueprint pools
+        traffic_config: TrafficConfig (seed, synchronous TM, hybrid physics, behaviors)
         """
         self.world = world
         self.client = client
+        self.catalog = catalog if catalog else WorldCatalog(world)
         self.vehicle = None
         self.vehicles = []
         self.semantic_camera = None
         self.max_npc_speed = max_npc_speed
+        self.npc_spawner = None
+        self.behaviors = ({}, {})  # per-NPC (speed difference, auto lane change) by actor id
 
-        # Get traffic manager via client
-        self.tm = self.client.get_trafficmanager(tm_port)
-        self.tm.set_global_distance_to_leading_vehicle(2.5)  # safe distance
+        # Get traffic manager via client (safe distance, seed, sync/hybrid physics)
+        self.traffic_config = traffic_config if traffic_config else TrafficConfig(tm_port=tm_port)
+        if self.traffic_config.global_speed_difference is None:
+            # Limit speed by setting percentage speed difference
+            speed_percentage = max(0, int((self.max_npc_speed / 100) * 100))
+            self.traffic_config.global_speed_difference = 100 - speed_percentage
+        self.tm = configure_traffic_manager(self.client, self.traffic_config)
+
+        # Seeded so two runs with the same seed see the same traffic
+        self.rng = random.Random(self.traffic_config.seed)
 
     def spawn_vehicle_and_camera(self, npc_vehicles=50):
         try:
-            bp_lib = self.world.get_blueprint_library()
-            vehicle_bp = bp_lib.filter("vehicle.tesla.model3")[0]
-
-            spawn_points = self.world.get_map().get_spawn_points()
+            vehicle_bp = self.catalog.ego_blueprint
+            vehicle_bp.set_attribute("role_name", "hero")  # hybrid physics is centred on the hero
+            spawn_points = self.catalog.spawn_points
 
             # Spawn ego vehicle
-            self.vehicle = self.world.try_spawn_actor(vehicle_bp, random.choice(spawn_points))
+            ego_sp = self.rng.choice(spawn_points)
+            self.vehicle = self.world.try_spawn_actor(vehicle_bp, ego_sp)
             if not self.vehicle:
                 return False
             self.vehicle.set_autopilot(False)
 
-            spawned = 0
-            for sp in spawn_points:
-                if spawned >= npc_vehicles:
-                    break
-                npc_bp = random.choice(bp_lib.filter("vehicle.*"))
-                npc = self.world.try_spawn_actor(npc_bp, sp)
-                if npc:
-                    # Enable autopilot via traffic manager
-                    npc.set_autopilot(True, self.tm.get_port())
-                    # Limit speed by setting percentage speed difference
-                    speed_percentage = max(0, int((self.max_npc_speed / 100) * 100))
-                    self.tm.vehicle_percentage_speed_difference(npc, 100 - speed_percentage)
-                    self.vehicles.append(npc)
-                    spawned += 1
+            # Spawn all NPCs with autopilot in one batch (blueprint pool filtered once)
+            if self.npc_spawner is None:
+                self.npc_spawner = BatchSpawner(self.client, self.world, self.tm.get_port(),
+                                                blueprints=self.catalog.vehicle_blueprints,
+                                                blueprint_library=self.catalog.blueprint_library)
+            npc_points = [sp for sp in spawn_points if sp is not ego_sp]
+            npcs = self.npc_spawner.spawn_npcs(npc_points, npc_vehicles,
+                                               do_tick=self.world.get_settings().synchronous_mode,
+                                               rng=self.rng)
+            self.npc_spawner.report_errors()
+
+            # Per-NPC behavior on top of the global speed limit set on the TM
+            self.behaviors = sample_vehicle_behaviors(npcs, self.traffic_config, self.rng)
+            apply_vehicle_behaviors(self.tm, npcs, self.traffic_config, *self.behaviors)
+            self.vehicles.extend(npcs)
             return True
         except Exception as e:
             print(f"Spawn error: {e}")
             return False
 
-    def setup_semantic_camera(self, vehicle, callback):
-        bp = self.world.get_blueprint_library().find("sensor.camera.semantic_segmentation")
+    def capture_scenario(self, state=None):
+        return ScenarioSnapshot.capture(self.world, self.catalog, self.vehicle, self.vehicles,
+                                        self.traffic_config.seed, self.traffic_config,
+                                        self.behaviors, state)
+
+    def restore_scenario(self, snapshot):
+        """Spawn the ego and NPCs of a saved scenario in one batch (instead of spawn_vehicle_and_camera)."""
+        try:
+            self.vehicle, npcs, self.tm, self.traffic_config, self.behaviors = snapshot.restore(
+                self.client, self.world, self.catalog,
+                do_tick=self.world.get_settings().synchronous_mode,
+                tm_port=self.traffic_config.tm_port)
+            if not self.vehicle:
+                return False
+            self.rng = random.Random(self.traffic_config.seed)
+            self.vehicles.extend(npcs)
+            return True
+        except Exception as e:
+            print(f"Scenario restore error: {e}")
+            return False
+
+    def setup_semantic_camera(self, vehicle, callback, instance=False):
+        """
+        instance: Use the instance segmentation camera (R = semantic tag, G/B = actor id)
+        instead of the semantic one; the tag channel is the same for both.
+        """
+        bp = self.catalog.camera_blueprint("sensor.camera.instance_segmentation" if instance
+                                           else "sensor.camera.semantic_segmentation")
         bp.set_attribute("image_size_x", "800")
         bp.set_attribute("image_size_y", "600")
         bp.set_attribute("fov", "90")
@@ -0,0 +1,95 @@
+# sem_tick.py
+"""
+Tick-synchronized frame delivery for the synchronous main loop. Every tick
+hands the loop the world snapshot and the semantic frame of that exact frame
+id, waiting for the sensor callback instead of reading whatever arrived last.
+In pipelined mode the next tick is issued from a worker thread as soon as the
+current one returns, so the server simulates and renders tick N+1 while the
+client detects, tracks and records tick N; controls applied while processing
+N then take effect one tick later. Lockstep mode issues a tick only when the
+previous one has been fully processed, which keeps runs reproducible.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TickPipeline:
+    def __init__(self, world, sensors, lockstep=True, wait_for_sensor=True, timeout=2.0):
+        """
+        world: carla.World in synchronous mode
+        sensors: SensorHandler whose semantic frames are handed over per tick
+        lockstep: Tick only after the previous frame was processed (deterministic)
+        wait_for_sensor: Wait for the semantic frame of each tick (False without a camera)
+        timeout: Seconds to wait for a sensor frame before handing over None
+        """
+        self.world = world
+        self.sensors = sensors
+        self.lockstep = lockstep
+        self.wait_for_sensor = wait_for_sensor
+        self.timeout = timeout
+        self._executor = None if lockstep else ThreadPoolExecutor(max_workers=1, thread_name_prefix="tick")
+        self._in_flight = None  # future of the tick running ahead (pipelined mode)
+
+        # Statistics
+        self.ticks = 0
+        self.ready = 0  # pipelined ticks already finished when the loop asked for them
+        self.tick_wait = 0.0  # time the loop spent blocked on world.tick()
+        self.last_handoff = 0.0
+        self.busy_time = 0.0  # time between handoffs (loop processing one frame)
+
+    def _tick(self):
+        frame = self.world.tick()
+        # No other tick is issued before this returns, so the snapshot is the one of `frame`
+        return frame, self.world.get_snapshot()
+
+    def tick(self):
+        """
+        Advance one tick. Returns (frame id, world snapshot of that frame,
+        semantic frame of that tick or None).
+        """
+        start = time.perf_counter()
+        if self.last_handoff:
+            self.busy_time += start - self.last_handoff
+        if self.lockstep:
+            frame, snapshot = self._tick()
+        else:
+            if self._in_flight is None:
+                self._in_flight = self._executor.submit(self._tick)
+            elif self._in_flight.done():
+                self.ready += 1
+            frame, snapshot = self._in_flight.result()
+            # Simulate the next tick while this one is processed
+            self._in_flight = self._executor.submit(self._tick)
+        self.tick_wait += time.perf_counter() - start
+        self.ticks += 1
+
+        semantic = self.sensors.wait_for_frame(frame, self.timeout) if self.wait_for_sensor else None
+        self.last_handoff = time.perf_counter()
+        return frame, snapshot, semantic
+
+    def drain(self):
+        """Let the tick running ahead finish (before ticking the world elsewhere, e.g. episode resets)."""
+        if self._in_flight is not None:
+            self._in_flight.result()
+            self._in_flight = None
+        self.last_handoff = 0.0
+
+    def close(self):
+        self.drain()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def report(self):
+        if not self.ticks:
+            return
+        sensors = self.sensors
+        mode = "lockstep" if self.lockstep else \
+            f"pipelined, {self.ready}/{self.ticks - 1} ticks ready before the previous frame was done"
+        print(f"⏱️ Frame delivery: {self.ticks} ticks ({mode}), "
+              f"avg tick wait {self.tick_wait / self.ticks * 1000:.2f} ms, "
+              f"avg processing {self.busy_time / max(self.ticks - 1, 1) * 1000:.2f} ms")
+        if self.wait_for_sensor and sensors.handoffs:
+            print(f"   📷 Sensor handoff: {sensors.stale}/{sensors.handoffs} frames not there yet when "
+                  f"the tick returned (stale if read directly), avg wait "
+                  f"{sensors.wait_time / sensors.handoffs * 1000:.2f} ms, "
+                  f"{sensors.timeouts} timeouts, {sensors.dropped} superseded, {sensors.failed} failed")
@@ -6,6 +6,11 @@ class Track:
     free_ids = []
     next_id = 0
 
+    @classmethod
+    def reset_ids(cls):
+        cls.free_ids = []
+        cls.next_id = 0
+
     def __init__(self, bbox, cls_name):
         # Assign ID
         if Track.free_ids:
@@ -0,0 +1,104 @@
+# sem_weather.py
+"""
+Per-episode weather / lighting randomization. Parameters are drawn from
+configurable ranges with a space-filling design, so a handful of episodes
+already spreads over the whole condition space instead of clustering like
+independent random draws: an optimized Latin hypercube when the number of
+episodes is known (every range is split into one stratum per episode), a
+scrambled Halton sequence otherwise. Weather is applied with a single
+set_weather call; no map reload.
+"""
+import json
+import numpy as np
+from scipy.stats import qmc
+from scenario import dict_to_weather
+
+# field: (low, high[, power]); power > 1 skews samples towards low
+DEFAULT_RANGES = {
+    "cloudiness": (0.0, 100.0),
+    "precipitation": (0.0, 100.0, 2.0),
+    "precipitation_deposits": (0.0, 100.0, 2.0),
+    "wind_intensity": (0.0, 100.0),
+    "wetness": (0.0, 100.0, 2.0),
+    "fog_density": (0.0, 60.0, 3.0),
+    "sun_azimuth_angle": (0.0, 360.0),
+    "sun_altitude_angle": (-20.0, 90.0),
+}
+
+def load_ranges(path):
+    """
+    Read {field: [low, high(, power)]} from a JSON file, merged over DEFAULT_RANGES.
+    A field set to null is not sampled (it keeps the world's current value).
+    """
+    ranges = dict(DEFAULT_RANGES)
+    with open(path) as f:
+        for name, values in json.load(f).items():
+            if values is None:
+                ranges.pop(name, None)
+            else:
+                ranges[name] = tuple(values)
+    return ranges
+
+
+class WeatherScheduler:
+    def __init__(self, ranges=None, seed=0, episodes=None, sampler=None):
+        """
+        ranges: {field: (low, high[, power])} of carla.WeatherParameters fields
+        seed: Seeds the design (or the draws for sampler="random")
+        episodes: Planned number of episodes (enables the Latin hypercube design)
+        sampler: "lhs", "halton" or "random" (default: lhs if episodes is known, else halton)
+        """
+        self.ranges = dict(ranges if ranges else DEFAULT_RANGES)
+        self.fields = list(self.ranges)
+        self.sampler = sampler if sampler else ("lhs" if episodes else "halton")
+        self.rng = np.random.default_rng(seed)
+        dims = len(self.fields)
+        if self.sampler == "lhs":
+            if not episodes:
+                raise ValueError("Latin hypercube sampling needs the number of episodes")
+            self.design = qmc.LatinHypercube(dims, optimization="random-cd", seed=self.rng).random(episodes)
+        elif self.sampler == "halton":
+            self.halton = qmc.Halton(dims, scramble=True, seed=self.rng)
+            self.design = np.empty((0, dims))
+        self.history = []  # (episode, params, unit sample)
+
+    def unit_sample(self, episode):
+        if self.sampler == "random":
+            return self.rng.random(len(self.fields))
+        if self.sampler == "halton" and episode >= len(self.design):
+            # Extensible: draw further points of the sequence on demand
+            self.design = np.vstack([self.design, self.halton.random(episode + 1 - len(self.design))])
+        return self.design[episode % len(self.design)]
+
+    def sample(self, episode):
+        """Weather parameters for `episode`. Returns (params, unit sample)."""
+        u = self.unit_sample(episode)
+        params = {}
+        for name, value in zip(self.fields, u):
+            low, high, *power = self.ranges[name]
+            params[name] = float(low + (high - low) * value ** (power[0] if power else 1.0))
+        return params, u
+
+    def apply(self, world, episode):
+        """
+        Sample weather for `episode`, apply it in one call and return the parameters.
+        Fields without a range keep the world's current value.
+        """
+        params, u = self.sample(episode)
+        world.set_weather(dict_to_weather(params, world.get_weather()))
+        self.history.append((episode, params, u))
+        return params
+
+    def report(self):
+        if not self.history:
+            return
+        n = len(self.history)
+        values = np.array([[p[name] for name in self.fields] for _, p, _ in self.history])
+        units = np.array([u for _, _, u in self.history])
+        discrepancy = qmc.discrepancy(units) if n > 1 else 0.0
+        print(f"🌦️ Weather: {n} episodes ({self.sampler} sampling, centered L2 discrepancy {discrepancy:.3f})")
+        for name, column, u in zip(self.fields, values.T, units.T):
+            # Share of n equal-probability strata hit by at least one episode
+            strata = len(np.unique(np.minimum((u * n).astype(int), n - 1)))
+            print(f"   {name:<24} {column.min():7.1f} … {column.max():7.1f}  "
+                  f"({strata}/{n} strata)")
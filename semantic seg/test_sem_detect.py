@@ -0,0 +1,51 @@
+# test_sem_detect.py
+"""
+Subsampled detection against the full-resolution result on synthetic labels:
+vehicles of 8, 12 and 20 pixels, one of them against the image edge.
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    import carla  # noqa: F401
+except ImportError:
+    import fake_carla
+    fake_carla.install()
+
+from sem_detect import SemanticDetector
+from sem_labels import VEHICLE_CLASSES
+
+ROAD_TAG = 1
+CARS = [(101, 203, 8), (300, 150, 12), (500, 420, 20), (790, 10, 10)]  # x, y, size; the last one touches x = 800
+
+
+def _labels():
+    labels = np.full((600, 800), ROAD_TAG, dtype=np.uint8)
+    for x, y, size in CARS:
+        labels[y:y + size, x:x + size] = VEHICLE_CLASSES["Car"]
+    return labels
+
+
+def _boxes(detections):
+    boxes = np.stack([detections["x1"], detections["y1"], detections["x2"], detections["y2"]], axis=1)
+    return boxes[np.argsort(boxes[:, 0])]
+
+
+@pytest.mark.parametrize("roi", [None, (95, 5, 650, 500)])
+@pytest.mark.parametrize("scale", [2, 3, 4])
+def test_subsampled_boxes_match_full_resolution(scale, roi):
+    labels = _labels()
+    full = _boxes(SemanticDetector(None, None, None, roi=roi).detect(labels))
+    assert len(full) == (len(CARS) if roi is None else 3)
+
+    boxes = _boxes(SemanticDetector(None, None, None, roi=roi, scale=scale).detect(labels))
+    assert len(boxes) == len(full)
+    # A subsampled pixel covers scale x scale pixels, so edges are off by less than that
+    assert np.abs(boxes - full).max() < scale
+
+    x0, y0, width, height = roi if roi is not None else (0, 0, 800, 600)
+    assert (boxes[:, [0, 2]] >= x0).all() and (boxes[:, [0, 2]] <= min(x0 + width, 800)).all()
+    assert (boxes[:, [1, 3]] >= y0).all() and (boxes[:, [1, 3]] <= min(y0 + height, 600)).all()
@@ -0,0 +1,103 @@
+# test_sem_orchestrate.py
+"""
+Orchestrator restart and aggregation against stand-in workers: two local
+processes that write the sem_main.py stats file, one of them killed mid-run.
+One more run drives a real sem_main.py worker against the fake simulator.
+"""
+import json
+import os
+import re
+import signal
+import sys
+import textwrap
+import threading
+import time
+from types import SimpleNamespace
+from sem_orchestrate import CollectionWorker, Orchestrator, WorkerSpec, build_workers
+
+FRAMES = 40
+
+# Writes the stats file like sem_main.py --stats-file, one frame every 20 ms
+STAND_IN = textwrap.dedent("""
+    import argparse, json, os, time
+    parser = argparse.ArgumentParser()
+    for name in ("--port", "--tm-port", "--seed", "--out", "--stats-file"):
+        parser.add_argument(name)
+    parser.add_argument("--max-frames", type=int)
+    args = parser.parse_args()
+
+    def write(frames, done):
+        data = {"frames": frames, "sim_seconds": frames * 0.05, "wall_seconds": frames * 0.02,
+                "time": time.time(), "pid": os.getpid(), "done": done}
+        with open(args.stats_file + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(args.stats_file + ".tmp", args.stats_file)
+
+    for frame in range(1, args.max_frames + 1):
+        time.sleep(0.02)
+        write(frame, False)
+    write(args.max_frames, True)
+""")
+
+
+def _kill_after(worker, frames, timeout=10.0):
+    """SIGKILL the worker's first attempt once its stats show `frames` frames."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = worker.stats()
+        if stats and stats["frames"] >= frames:
+            os.kill(worker.process.pid, signal.SIGKILL)
+            return
+        time.sleep(0.01)
+
+
+def test_killed_worker_restarts_and_report_aggregates(tmp_path, capsys):
+    script = tmp_path / "stand_in.py"
+    script.write_text(STAND_IN)
+    workers = [CollectionWorker(WorkerSpec(i, 2000 + 10 * i, 8000 + i, i, str(tmp_path / f"worker_{i:02d}")),
+                                [sys.executable, str(script)], ["--max-frames", str(FRAMES)])
+               for i in range(2)]
+    orchestrator = Orchestrator(workers, max_restarts=2, heartbeat_timeout=10.0, poll_interval=0.05,
+                                report_interval=60.0)
+
+    killer = threading.Thread(target=_kill_after, args=(workers[0], 10))
+    killer.start()
+    assert orchestrator.run()
+    killer.join()
+
+    killed, healthy = workers
+    assert killed.restarts == 1 and killed.attempt == 2
+    assert healthy.restarts == 0 and healthy.attempt == 1
+    assert killed.finished and healthy.finished
+
+    # The killed attempt's last heartbeat counts towards the worker's totals
+    with open(os.path.join(killed.spec.shard, "attempt_1", "stats.json")) as f:
+        partial = json.load(f)["frames"]
+    assert 10 <= partial < FRAMES
+    assert killed.totals()[0] == partial + FRAMES
+    assert healthy.totals()[0] == FRAMES
+
+    out = capsys.readouterr().out
+    assert "restarting (1/2)" in out
+    total = re.findall(r"Total: (\d+) frames", out)[-1]
+    assert int(total) == partial + 2 * FRAMES
+
+
+def test_sem_main_worker_runs_headless(tmp_path, monkeypatch):
+    # No display: the worker must not open any window
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv("SDL_VIDEODRIVER", raising=False)
+    args = SimpleNamespace(worker=None, show_windows=False, workers=1, base_port=2000, port_stride=10,
+                           base_tm_port=8000, seed=0, out=str(tmp_path), server_cmd=None)
+    worker_args = ["--fake-carla", "--autopilot", "--ground-truth", "--vehicles", "5", "--max-frames", str(FRAMES)]
+    workers = build_workers(args, worker_args)
+    assert "--headless" in workers[0].command()
+
+    orchestrator = Orchestrator(workers, max_restarts=0, heartbeat_timeout=60.0, poll_interval=0.1,
+                                report_interval=60.0)
+    ok = orchestrator.run()
+    with open(os.path.join(workers[0].attempt_dir, "worker.log")) as f:
+        log = f.read()
+    assert ok, log
+    assert workers[0].restarts == 0
+    assert workers[0].totals()[0] == FRAMES
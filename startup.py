@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Startup orchestration for the CARLA entry points.
+Runs independent setup phases (world loading, model load/warm-up, window init)
+concurrently and keeps a per-phase timeline up to the first processed frame.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class StartupTimeline:
+    """Wall-clock timeline of startup phases, relative to process start."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = []  # (name, start, end, ok, thread name)
+        self.first_frame = None
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end, ok=True):
+        with self._lock:
+            self.phases.append((name, start - self.t0, end - self.t0, ok,
+                                threading.current_thread().name))
+
+    @contextmanager
+    def phase(self, name):
+        """Time a sequential phase: `with timeline.phase("spawn"): ...`"""
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(name, start, time.perf_counter(), ok)
+
+    def mark_first_frame(self):
+        """Mark the first processed frame. Returns True only on the first call."""
+        if self.first_frame is not None:
+            return False
+        with self._lock:
+            if self.first_frame is not None:
+                return False
+            self.first_frame = time.perf_counter() - self.t0
+            return True
+
+    def report(self):
+        print("\n⏱️ Startup timeline:")
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+        for name, start, end, ok, thread in phases:
+            status = "" if ok else "  (FAILED)"
+            print(f"   {name:<22} {start*1000:8.0f} → {end*1000:8.0f} ms "
+                  f"({(end-start)*1000:7.0f} ms) [{thread}]{status}")
+        if phases:
+            busy = sum(end - start for _, start, end, _, _ in phases)
+            span = max(p[2] for p in phases) - min(p[1] for p in phases)
+            print(f"   Sum of phases: {busy*1000:.0f} ms, wall span: {span*1000:.0f} ms")
+        if self.first_frame is not None:
+            print(f"   🎞️ Time to first processed frame: {self.first_frame*1000:.0f} ms")
+        else:
+            print("   🎞️ No frame processed yet")
+
+
+class StartupOrchestrator:
+    """
+    Runs groups of independent startup phases concurrently.
+    Background phases go to a thread pool; foreground phases run on the calling
+    thread (pygame/OpenCV windows must be created on the main thread).
+    """
+
+    def __init__(self, timeline=None, max_workers=4):
+        self.timeline = timeline if timeline else StartupTimeline()
+        self.max_workers = max_workers
+
+    def _timed(self, name, fn):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self.timeline.record(name, start, time.perf_counter(), ok=False)
+            print(f"[StartupOrchestrator] Phase '{name}' failed: {e}")
+            return None
+        self.timeline.record(name, start, time.perf_counter(), ok=result is not False)
+        return result
+
+    def run(self, background=None, foreground=None):
+        """
+        background / foreground: dicts of phase name -> zero-argument callable.
+        Waits for all phases and returns a dict of phase name -> result
+        (None if the phase raised).
+        """
+        background = background or {}
+        foreground = foreground or {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(background) or 1)),
+                                thread_name_prefix="startup") as pool:
+            futures = {name: pool.submit(self._timed, name, fn)
+                       for name, fn in background.items()}
+            for name, fn in foreground.items():
+                results[name] = self._timed(name, fn)
+            for name, fut in futures.items():
+                results[name] = fut.result()
+        return results
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Traffic manager configuration for dense CARLA traffic.
+High-density mode enables hybrid physics around the ego ("hero") vehicle,
+runs the TM in lockstep with a synchronous world, seeds it deterministically
+and applies per-vehicle behavior (speed offsets, lane changes) in bulk.
+TrafficBudgetManager keeps NPCs near the ego by recycling far-away ones.
+Run as a script to benchmark ticks/s across NPC counts and check that the
+budget manager keeps its NPCs in range.
+"""
+
+import argparse
+import random
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+import carla
+from carla_batch import BatchSpawner, destroy_actors
+from world_state import WorldStateCache
+from world_catalog import load_or_reuse_world
+
+
+# Traffic manager defaults of the per-vehicle settings; setter calls that would
+# only restate them are skipped
+TM_SPEED_DIFFERENCE_DEFAULT = 0.0
+TM_AUTO_LANE_CHANGE_DEFAULT = True
+
+
+class TrafficConfig:
+    """Traffic manager settings shared by the spawners."""
+
+    def __init__(self, tm_port=8000, seed=0, synchronous=True, hybrid_physics=False,
+                 hybrid_radius=70.0, distance_to_leading=2.5, speed_offset=(0.0, 0.0),
+                 lane_change_probability=1.0, random_lane_change_percentage=0.0,
+                 global_speed_difference=None):
+        """
+        tm_port: Traffic Manager port
+        seed: Seed for the TM random device and the per-vehicle behavior sampling
+        synchronous: Run the TM in lockstep with a synchronous world
+        hybrid_physics: Only simulate full physics within hybrid_radius (m) of the hero vehicle
+        distance_to_leading: Global safe distance to the leading vehicle (m)
+        speed_offset: (low, high) range of per-vehicle percentage speed difference
+        lane_change_probability: Fraction of vehicles allowed to change lanes on their own
+        random_lane_change_percentage: Chance per decision of an unforced left/right lane change
+        global_speed_difference: Percentage below the speed limit all NPCs drive at (None = TM default)
+        """
+        self.tm_port = tm_port
+        self.seed = seed
+        self.synchronous = synchronous
+        self.hybrid_physics = hybrid_physics
+        self.hybrid_radius = hybrid_radius
+        self.distance_to_leading = distance_to_leading
+        self.speed_offset = speed_offset
+        self.lane_change_probability = lane_change_probability
+        self.random_lane_change_percentage = random_lane_change_percentage
+        self.global_speed_difference = global_speed_difference
+
+
+def configure_traffic_manager(client, config):
+    """Create (or fetch) the traffic manager on config.tm_port and apply the global settings."""
+    tm = client.get_trafficmanager(config.tm_port)
+    tm.set_global_distance_to_leading_vehicle(config.distance_to_leading)
+    tm.set_random_device_seed(config.seed)
+    tm.set_synchronous_mode(config.synchronous)
+    tm.set_hybrid_physics_mode(config.hybrid_physics)
+    if config.hybrid_physics:
+        tm.set_hybrid_physics_radius(config.hybrid_radius)
+    if config.global_speed_difference is not None:
+        tm.global_percentage_speed_difference(config.global_speed_difference)
+    return tm
+
+
+def sample_vehicle_behaviors(actors, config, rng=None):
+    """
+    Draw per-vehicle speed offsets and lane-change permissions from the config.
+    Returns dicts of actor id -> value, ready for apply_vehicle_behaviors; vehicles
+    that keep the TM default are left out, so the defaults cost no setter calls.
+    """
+    rng = rng if rng else random.Random(config.seed)
+    low, high = config.speed_offset
+    speed = {a.id: rng.uniform(low, high) for a in actors} \
+        if (low, high) != (TM_SPEED_DIFFERENCE_DEFAULT, TM_SPEED_DIFFERENCE_DEFAULT) else {}
+    lane_change = {}
+    if config.lane_change_probability < 1.0:
+        for a in actors:
+            allowed = rng.random() < config.lane_change_probability
+            if allowed != TM_AUTO_LANE_CHANGE_DEFAULT:
+                lane_change[a.id] = allowed
+    return speed, lane_change
+
+
+def apply_vehicle_behaviors(tm, actors, config, speed=None, lane_change=None):
+    """Apply per-vehicle TM behavior in one pass (TM setters run in this process)."""
+    for actor in actors:
+        if speed and actor.id in speed:
+            tm.vehicle_percentage_speed_difference(actor, speed[actor.id])
+        if lane_change and lane_change.get(actor.id, TM_AUTO_LANE_CHANGE_DEFAULT) != TM_AUTO_LANE_CHANGE_DEFAULT:
+            tm.auto_lane_change(actor, lane_change[actor.id])
+        if config.random_lane_change_percentage:
+            tm.random_left_lanechange_percentage(actor, config.random_lane_change_percentage)
+            tm.random_right_lanechange_percentage(actor, config.random_lane_change_percentage)
+
+
+class TrafficBudgetManager:
+    """
+    Keeps up to `budget` NPCs within `radius` metres of the ego.
+    Every `interval` ticks, NPCs outside the radius are teleported (one batched
+    command) to free spawn points ahead of the ego, found through a KD-tree
+    built once over the map's spawn points.
+    """
+
+    def __init__(self, client, spawn_points, budget=30, radius=60.0, interval=20,
+                 min_spawn_distance=30.0, clearance=8.0, min_clearance=5.0, seed=0):
+        """
+        client: carla.Client object
+        spawn_points: Map spawn points (carla.Transform list)
+        budget: Number of NPCs to keep within radius of the ego
+        radius: Range around the ego that counts as "useful" (m)
+        interval: Ticks between recycling passes
+        min_spawn_distance: Preferred minimum distance of teleport targets from the ego (avoids pop-in)
+        clearance: Minimum distance from a spawn point to any vehicle for it to count as free (m)
+        min_clearance: Relaxed clearance used when the preferred ring runs short (m)
+        """
+        self.client = client
+        self.spawn_points = list(spawn_points)
+        self.budget = budget
+        self.radius = radius
+        self.interval = interval
+        self.min_spawn_distance = min_spawn_distance
+        self.clearance = clearance
+        self.min_clearance = min_clearance
+        self.rng = np.random.default_rng(seed)
+
+        self.spawn_xy = np.array([[sp.location.x, sp.location.y] for sp in self.spawn_points], dtype=float)
+        self.spawn_tree = cKDTree(self.spawn_xy) if len(self.spawn_xy) else None
+
+        # Statistics
+        self.ticks = 0
+        self.passes = 0
+        self.recycled = 0
+        self.fallbacks = 0  # targets taken from the fallback points
+        self.in_range_samples = []  # (in range, total NPCs) per pass
+
+    def _candidate_spawns(self, ego_xy, forward_xy, occupied_tree, wanted):
+        """
+        Spawn point indices to teleport to, best first, and how many of them are preferred:
+        free points in the [min_spawn_distance, radius] ring, ahead of the ego first. When
+        fewer than `wanted` of those exist, the remaining points within the radius that are
+        free at min_clearance follow, nearest to the ring (farthest from the ego) first.
+        """
+        idx = np.array(self.spawn_tree.query_ball_point(ego_xy, self.radius), dtype=int)
+        if idx.size == 0:
+            return idx, 0
+        offsets = self.spawn_xy[idx] - ego_xy
+        dist = np.hypot(offsets[:, 0], offsets[:, 1])
+        nearest, _ = occupied_tree.query(self.spawn_xy[idx])
+        preferred = (dist >= self.min_spawn_distance) & (nearest > self.clearance)
+        ahead = offsets @ forward_xy > 0
+        # Shuffle within each group so repeated passes don't stack the same points
+        ring = np.concatenate([self.rng.permutation(idx[preferred & ahead]),
+                               self.rng.permutation(idx[preferred & ~ahead])])
+        if ring.size >= wanted:
+            return ring, ring.size
+        fallback = ~preferred & (nearest > self.min_clearance)
+        order = np.argsort(-dist[fallback], kind="stable")
+        return np.concatenate([ring, idx[fallback][order]]), ring.size
+
+    def update(self, state, ego):
+        """
+        Run a recycling pass every `interval` ticks.
+        state: WorldStateCache updated for this tick
+        ego: Ego vehicle actor
+        Returns the number of NPCs teleported this call.
+        """
+        self.ticks += 1
+        if self.spawn_tree is None or self.ticks % self.interval:
+            return 0
+        self.passes += 1
+
+        ego_tf = state.transform(ego)
+        ego_xy = np.array([ego_tf.location.x, ego_tf.location.y])
+        fwd = ego_tf.get_forward_vector()
+        forward_xy = np.array([fwd.x, fwd.y])
+
+        npcs = [(actor, tf) for actor, tf in state.vehicle_transforms() if actor.id != ego.id]
+        if not npcs:
+            return 0
+        npc_xy = np.array([[tf.location.x, tf.location.y] for _, tf in npcs])
+        dist = np.hypot(npc_xy[:, 0] - ego_xy[0], npc_xy[:, 1] - ego_xy[1])
+        in_range = int(np.count_nonzero(dist <= self.radius))
+        self.in_range_samples.append((in_range, len(npcs)))
+
+        wanted = min(self.budget - in_range, int(np.count_nonzero(dist > self.radius)))
+        if wanted <= 0:
+            return 0
+
+        occupied = cKDTree(np.vstack([npc_xy, ego_xy]))
+        candidates, n_preferred = self._candidate_spawns(ego_xy, forward_xy, occupied, wanted)
+        targets = []
+        for rank, sp_index in enumerate(candidates):
+            if len(targets) >= wanted:
+                break
+            # Keep the chosen points clear of each other as well
+            clearance = self.clearance if rank < n_preferred else self.min_clearance
+            if all(np.hypot(*(self.spawn_xy[sp_index] - self.spawn_xy[t])) > clearance for t in targets):
+                targets.append(sp_index)
+                self.fallbacks += rank >= n_preferred
+        # Farthest NPCs are recycled first
+        movers = np.argsort(-dist)[:len(targets)]
+
+        batch = []
+        for npc_index, sp_index in zip(movers, targets):
+            actor_id = npcs[npc_index][0].id
+            batch.append(carla.command.ApplyTransform(actor_id, self.spawn_points[sp_index]))
+            batch.append(carla.command.ApplyTargetVelocity(actor_id, carla.Vector3D()))
+        if batch:
+            self.client.apply_batch(batch)
+        self.recycled += len(targets)
+        return len(targets)
+
+    def report(self):
+        if not self.in_range_samples:
+            print("🚦 Traffic budget: no recycling passes yet")
+            return
+        in_range = np.array(self.in_range_samples, dtype=float)
+        share = in_range[:, 0].sum() / max(in_range[:, 1].sum(), 1.0) * 100
+        print(f"🚦 Traffic budget: {self.recycled} NPCs recycled over {self.passes} passes "
+              f"({self.fallbacks} to fallback points), "
+              f"{self.average_in_range():.1f} NPCs within {self.radius:.0f} m on average "
+              f"({share:.0f}% of all NPCs, budget {self.budget})")
+
+    def average_in_range(self):
+        """Average number of NPCs within the radius over the recycling passes."""
+        if not self.in_range_samples:
+            return 0.0
+        return float(np.mean([in_range for in_range, _ in self.in_range_samples]))
+
+
+def benchmark_tick_rate(world, ticks=200, warmup=20):
+    """Ticks/s of a synchronous world over `ticks` ticks (after `warmup` ticks)."""
+    for _ in range(warmup):
+        world.tick()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        world.tick()
+    return ticks / (time.perf_counter() - start)
+
+
+def benchmark_traffic_budget(client, world, tm, ego, spawn_points, budget, ticks=1000, warmup=100, **kwargs):
+    """
+    Drive the ego on autopilot with a TrafficBudgetManager for `ticks` ticks (after
+    `warmup` ticks that bring the first NPCs into range). Returns the manager.
+    """
+    manager = TrafficBudgetManager(client, spawn_points, budget=budget, **kwargs)
+    state = WorldStateCache(world)
+    ego.set_autopilot(True, tm.get_port())
+    for tick in range(warmup + ticks):
+        if tick == warmup:
+            manager.in_range_samples = []
+        world.tick()
+        state.update()
+        manager.update(state, ego)
+    return manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ticks/s across NPC counts")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=2000)
+    parser.add_argument("--tm-port", type=int, default=8000)
+    parser.add_argument("--counts", default="0,25,50,100,200", help="Comma-separated NPC counts")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hybrid-radius", type=float, default=70.0)
+    parser.add_argument("--budget", type=int, default=10,
+                        help="Also check that TrafficBudgetManager keeps this many NPCs in range (0 = skip)")
+    parser.add_argument("--budget-npcs", type=int, default=100, help="NPCs spawned for the --budget check")
+    parser.add_argument("--budget-ticks", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = carla.Client(args.host, args.port)
+    client.set_timeout(20.0)
+    world, catalog, _ = load_or_reuse_world(client, "Town04")
+    original_settings = world.get_settings()
+    settings = world.get_settings()
+    settings.synchronous_mode = True
+    settings.fixed_delta_seconds = 0.05
+    world.apply_settings(settings)
+
+    counts = [int(c) for c in args.counts.split(",")]
+    results = []
+    try:
+        for hybrid in (False, True):
+            config = TrafficConfig(tm_port=args.tm_port, seed=args.seed, hybrid_physics=hybrid,
+                                   hybrid_radius=args.hybrid_radius)
+            tm = configure_traffic_manager(client, config)
+            spawner = BatchSpawner(client, world, config.tm_port, blueprints=catalog.car_blueprints,
+                                   blueprint_library=catalog.blueprint_library)
+            for count in counts:
+                rng = random.Random(args.seed)
+                ego_bp = catalog.ego_blueprint
+                ego_bp.set_attribute("role_name", "hero")
+                ego = world.spawn_actor(ego_bp, catalog.spawn_points[0])
+                npcs = spawner.spawn_npcs(catalog.spawn_points[1:], count, do_tick=True, rng=rng)
+                apply_vehicle_behaviors(tm, npcs, config, *sample_vehicle_behaviors(npcs, config))
+                rate = benchmark_tick_rate(world, args.ticks)
+                results.append((hybrid, len(npcs), rate))
+                print(f"🚦 hybrid={'on ' if hybrid else 'off'} NPCs={len(npcs):4d}: {rate:7.1f} ticks/s")
+                destroy_actors(client, world, actors=npcs + [ego], do_tick=True)
+
+        if args.budget > 0:
+            config = TrafficConfig(tm_port=args.tm_port, seed=args.seed)
+            tm = configure_traffic_manager(client, config)
+            spawner = BatchSpawner(client, world, config.tm_port, blueprints=catalog.car_blueprints,
+                                   blueprint_library=catalog.blueprint_library)
+            ego_bp = catalog.ego_blueprint
+            ego_bp.set_attribute("role_name", "hero")
+            ego = world.spawn_actor(ego_bp, catalog.spawn_points[0])
+            npcs = spawner.spawn_npcs(catalog.spawn_points[1:], args.budget_npcs, do_tick=True,
+                                      rng=random.Random(args.seed))
+            apply_vehicle_behaviors(tm, npcs, config, *sample_vehicle_behaviors(npcs, config))
+            try:
+                manager = benchmark_traffic_budget(client, world, tm, ego, catalog.spawn_points, args.budget,
+                                                   ticks=args.budget_ticks, seed=args.seed)
+            finally:
+                destroy_actors(client, world, actors=npcs + [ego], do_tick=True)
+            manager.report()
+            target = 0.8 * min(args.budget, len(npcs))
+            assert manager.average_in_range() >= target, \
+                f"only {manager.average_in_range():.1f} NPCs in range on average, expected >= {target:.1f}"
+    finally:
+        client.get_trafficmanager(args.tm_port).set_synchronous_mode(False)
+        world.apply_settings(original_settings)
+
+    print("\n📊 Ticks/s by NPC count:")
+    for hybrid, count, rate in results:
+        print(f"   {'hybrid' if hybrid else 'full  '} {count:4d} NPCs  {rate:7.1f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
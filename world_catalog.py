@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Session-level catalog of per-map data for CARLA.
+world.get_map() serializes the whole OpenDRIVE map on every call, so the map,
+spawn points, waypoint topology and filtered blueprint pools are fetched once
+per loaded map and shared by every spawner and camera setup.
+"""
+
+import time
+from carla_batch import vehicle_blueprint_pool
+
+# Episode id (world.id) -> map name; outlives catalogs, so reconnecting to a
+# running world doesn't fetch the map just to compare its name
+_MAP_NAMES = {}
+
+
+class WorldCatalog:
+    """Lazily built, map-scoped cache; invalidated when the episode (loaded map) changes."""
+
+    def __init__(self, world, ego_blueprint="vehicle.tesla.model3"):
+        """
+        world: carla.World object
+        ego_blueprint: Blueprint id of the ego vehicle
+        """
+        self.ego_blueprint_id = ego_blueprint
+        self.world = None
+        self.episode_id = None
+        self._items = {}
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.build_times = {}  # item -> seconds spent building it (this map)
+        self.invalidations = 0
+
+        self.bind(world)
+
+    def bind(self, world):
+        """Point the catalog at a (possibly new) world; drops the cache if the map changed."""
+        self.world = world
+        if world is not None and world.id != self.episode_id:
+            if self.episode_id is not None:
+                self.invalidations += 1
+            self.invalidate()
+            self.episode_id = world.id
+        return self
+
+    def invalidate(self):
+        self._items = {}
+        self.build_times = {}
+
+    def _get(self, key, builder):
+        if key in self._items:
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        start = time.perf_counter()
+        value = builder()
+        self.build_times[key] = time.perf_counter() - start
+        self._items[key] = value
+        return value
+
+    @property
+    def map(self):
+        return self._get("map", self._build_map)
+
+    def _build_map(self):
+        carla_map = self.world.get_map()
+        _MAP_NAMES[self.episode_id] = carla_map.name
+        return carla_map
+
+    @property
+    def map_name(self):
+        """Name of the loaded map; fetches the map only if this episode's name isn't known yet."""
+        name = _MAP_NAMES.get(self.episode_id)
+        return name if name is not None else self.map.name
+
+    @property
+    def spawn_points(self):
+        return self._get("spawn_points", self.map.get_spawn_points)
+
+    @property
+    def topology(self):
+        """List of (entry waypoint, exit waypoint) pairs for every road segment."""
+        return self._get("topology", self.map.get_topology)
+
+    @property
+    def blueprint_library(self):
+        return self._get("blueprint_library", self.world.get_blueprint_library)
+
+    @property
+    def vehicle_blueprints(self):
+        """Every vehicle blueprint, two-wheelers included."""
+        return self._get("vehicle_blueprints",
+                         lambda: vehicle_blueprint_pool(self.blueprint_library, exclude_two_wheelers=False))
+
+    @property
+    def car_blueprints(self):
+        """Vehicle blueprints without bicycles and motorcycles."""
+        return self._get("car_blueprints",
+                         lambda: vehicle_blueprint_pool(self.blueprint_library, exclude_two_wheelers=True))
+
+    @property
+    def ego_blueprint(self):
+        """The ego model, falling back to the first car if it is missing on this server."""
+        def build():
+            matches = self.blueprint_library.filter(self.ego_blueprint_id)
+            return matches[0] if matches else self.car_blueprints[0]
+        return self._get("ego_blueprint", build)
+
+    def camera_blueprint(self, type_id="sensor.camera.rgb"):
+        return self._get(type_id, lambda: self.blueprint_library.find(type_id))
+
+    def report(self):
+        built = ", ".join(f"{k}={v*1000:.0f}ms" for k, v in self.build_times.items())
+        print(f"📚 World catalog: {self.hits} hits, {self.misses} misses, "
+              f"{self.invalidations} map changes" + (f" | built: {built}" if built else ""))
+
+
+def map_basename(map_name):
+    """'Carla/Maps/Town04' and 'Town04' both name Town04."""
+    return map_name.split('/')[-1]
+
+
+def load_or_reuse_world(client, town, catalog=None, force_reload=False):
+    """
+    Return the world running `town`, calling load_world only if the server is
+    on a different map (or force_reload is set).
+    Returns (world, catalog bound to that world, True if the running world was reused).
+    """
+    world = client.get_world()
+    if catalog is None:
+        catalog = WorldCatalog(world)
+    else:
+        catalog.bind(world)
+
+    # Free if this episode's map name is already known; otherwise the map is fetched
+    # once and the catalog keeps it for the spawners if the world is reused
+    if not force_reload and map_basename(catalog.map_name) == map_basename(town):
+        return world, catalog, True
+
+    world = client.load_world(town)
+    catalog.bind(world)
+    return world, catalog, False
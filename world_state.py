@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Per-tick world state cache for CARLA.
+Reads ego and actor state from the WorldSnapshot the server broadcasts every
+tick, so consumers (spectator, status, display, detector) share one view of
+the world instead of each querying actors individually.
+"""
+
+
+class WorldStateCache:
+    """
+    Snapshot-backed cache of actor transforms, velocities and the vehicle list.
+    Call update() once per tick; the actor list is only re-fetched when the set
+    of actor ids in the snapshot changes (actors spawned or destroyed).
+    """
+
+    def __init__(self, world, actor_filter="vehicle.*"):
+        """
+        world: carla.World object
+        actor_filter: Blueprint filter for the cached actor list
+        """
+        self.world = world
+        self.actor_filter = actor_filter
+        self.snapshot = None
+        self.frame = None
+        self._actor_ids = frozenset()
+        self._vehicles = []
+        self._controls = {}  # actor id -> last VehicleControl applied by this client
+
+        # Statistics
+        self.updates = 0
+        self.actor_refreshes = 0
+
+    def update(self, snapshot=None):
+        """
+        Pull the latest snapshot (client-side, no RPC), or use `snapshot` when the
+        caller captured the one of a specific tick. Returns the frame number.
+        """
+        if snapshot is None:
+            snapshot = self.world.get_snapshot()
+        if self.snapshot is not None and snapshot.frame == self.frame:
+            return self.frame
+        self.snapshot = snapshot
+        self.frame = snapshot.frame
+        self.updates += 1
+
+        ids = frozenset(actor_snapshot.id for actor_snapshot in snapshot)
+        if ids != self._actor_ids:
+            self._refresh_actors(ids)
+        return self.frame
+
+    def _refresh_actors(self, ids):
+        self._vehicles = list(self.world.get_actors().filter(self.actor_filter))
+        self._actor_ids = ids
+        self.actor_refreshes += 1
+
+    def invalidate_actors(self):
+        """Force the actor list to be re-fetched on the next update()."""
+        self._actor_ids = frozenset()
+
+    def _actor_snapshot(self, actor):
+        if self.snapshot is None:
+            self.update()
+        return self.snapshot.find(actor.id)
+
+    def transform(self, actor):
+        actor_snapshot = self._actor_snapshot(actor)
+        return actor_snapshot.get_transform() if actor_snapshot else actor.get_transform()
+
+    def location(self, actor):
+        return self.transform(actor).location
+
+    def velocity(self, actor):
+        actor_snapshot = self._actor_snapshot(actor)
+        return actor_snapshot.get_velocity() if actor_snapshot else actor.get_velocity()
+
+    def speed(self, actor):
+        v = self.velocity(actor)
+        return (v.x**2 + v.y**2 + v.z**2)**0.5
+
+    def vehicles(self):
+        """Vehicle actors alive in the current snapshot."""
+        if self.snapshot is None:
+            self.update()
+        return self._vehicles
+
+    def vehicle_transforms(self):
+        """(actor, transform) for every cached vehicle present in the snapshot."""
+        if self.snapshot is None:
+            self.update()
+        result = []
+        for actor in self._vehicles:
+            actor_snapshot = self.snapshot.find(actor.id)
+            if actor_snapshot:
+                result.append((actor, actor_snapshot.get_transform()))
+        return result
+
+    def record_control(self, actor, control):
+        """Remember the control applied to an actor so readers don't have to ask the server."""
+        self._controls[actor.id] = control
+
+    def control(self, actor):
+        control = self._controls.get(actor.id)
+        return control if control is not None else actor.get_control()
+
+    @property
+    def timestamp(self):
+        return self.snapshot.timestamp if self.snapshot is not None else None